@@ -0,0 +1,86 @@
+"""Shared SQLAlchemy engines, configured from the environment."""
+
+import os
+import threading
+
+from sqlalchemy import Engine, create_engine, make_url
+
+DEFAULT_POOL_SIZE = 5
+
+_engines: dict[tuple, Engine] = dict()
+_lock = threading.Lock()
+
+
+def get_engine(
+    url: str | None = None,
+    *,
+    pool_size: int | None = None,
+    pool_pre_ping: bool | None = None,
+    statement_timeout: int | None = None,
+    echo: bool | None = None,
+) -> Engine:
+    """Get an engine for the database, reusing its connection pool across callers.
+
+    Settings not given fall back to the SQLALCHEMY_URL, SQLALCHEMY_POOL_SIZE, SQLALCHEMY_POOL_PRE_PING,
+    SQLALCHEMY_STATEMENT_TIMEOUT (in milliseconds) and SQLALCHEMY_ECHO environment variables. No connection
+    is made until the engine is first used.
+    """
+
+    url = url or os.getenv("SQLALCHEMY_URL")
+
+    if not url:
+        raise ValueError(
+            "No database URL provided. Consider setting SQLALCHEMY_URL environment variable."
+        )
+
+    settings = (
+        url,
+        pool_size or int(os.getenv("SQLALCHEMY_POOL_SIZE", DEFAULT_POOL_SIZE)),
+        pool_pre_ping
+        if pool_pre_ping is not None
+        else _get_bool_env("SQLALCHEMY_POOL_PRE_PING", True),
+        statement_timeout or int(os.getenv("SQLALCHEMY_STATEMENT_TIMEOUT", 0)),
+        echo if echo is not None else _get_bool_env("SQLALCHEMY_ECHO", False),
+    )
+
+    with _lock:
+        if settings not in _engines:
+            _engines[settings] = _create_engine(*settings)
+
+        return _engines[settings]
+
+
+def dispose_engines() -> None:
+    """Close all pooled connections, e.g., before forking worker processes."""
+
+    with _lock:
+        for engine in _engines.values():
+            engine.dispose()
+
+        _engines.clear()
+
+
+def _create_engine(
+    url: str, pool_size: int, pool_pre_ping: bool, statement_timeout: int, echo: bool
+) -> Engine:
+    connect_args = dict()
+
+    if statement_timeout > 0 and make_url(url).get_backend_name() == "postgresql":
+        connect_args["options"] = f"-c statement_timeout={statement_timeout}"
+
+    return create_engine(
+        url,
+        pool_size=pool_size,
+        pool_pre_ping=pool_pre_ping,
+        echo=echo,
+        connect_args=connect_args,
+    )
+
+
+def _get_bool_env(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+
+    if value is None:
+        return default
+
+    return value.lower() in ("1", "true", "yes", "on")
@@ -6,10 +6,11 @@ import pathlib
 import sqlalchemy
 import typer
 from alembic import command, config
-from sqlalchemy import create_engine, select
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from sqlalchemy_utils import create_database, database_exists, drop_database
 
+from .engine import get_engine
 from .model import Base, File
 
 # this is the Alembic Config object, which provides
@@ -25,13 +26,14 @@ env_override_url = os.getenv("SQLALCHEMY_URL")
 if env_override_url is not None and len(env_override_url) > 0:
     url = config.set_main_option("sqlalchemy.url", env_override_url)
 
+# engines are created on first use by each command, so importing this module does not connect
 url = config.get_main_option("sqlalchemy.url")
-engine = create_engine(url, echo=True)  # echo for dev to outputing SQL
 
 
 @app.command()
 def create_db(with_schema: bool = False, with_data: bool = False):
     print("sql sqlalchemy version: " + sqlalchemy.__version__)
+    engine = get_engine(url)
 
     if not database_exists(engine.url):
         print("Creating db")
@@ -55,6 +57,8 @@ def create_db(with_schema: bool = False, with_data: bool = False):
 
 @app.command()
 def drop_db():
+    engine = get_engine(url)
+
     if database_exists(engine.url):
         print("Dropping db")
         drop_database(engine.url)
@@ -64,7 +68,7 @@ def drop_db():
 
 @app.command()
 def query_db():
-    session = Session(engine)
+    session = Session(get_engine(url))
 
     # stmt = select(File).where(File.name.in_(["file1.txt"]))
     stmt = select(File).where(File.name is not None)
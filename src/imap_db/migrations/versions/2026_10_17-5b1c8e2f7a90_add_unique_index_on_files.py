@@ -0,0 +1,28 @@
+"""Add unique index on files name and path.
+
+Revision ID: 5b1c8e2f7a90
+Revises: d0457f3e98c8
+Create Date: 2026-10-17 09:12:44.318207
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "5b1c8e2f7a90"
+down_revision = "d0457f3e98c8"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # remove duplicates left by earlier inserts, keeping the first copy of each file
+    op.execute(
+        "DELETE FROM files WHERE id NOT IN "
+        "(SELECT MIN(id) FROM files GROUP BY name, path)"
+    )
+    op.create_index("ix_files_name_path", "files", ["name", "path"], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_files_name_path", table_name="files")
@@ -0,0 +1,84 @@
+"""Add file catalogue columns.
+
+Revision ID: 9e4d2a6b3c71
+Revises: 5b1c8e2f7a90
+Create Date: 2026-10-17 14:37:05.942716
+
+"""
+
+import re
+from datetime import datetime
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "9e4d2a6b3c71"
+down_revision = "5b1c8e2f7a90"
+branch_labels = None
+depends_on = None
+
+SCIENCE_FILE_PATTERN = re.compile(
+    r"^imap_(?P<instrument>[a-z]+)_(?P<level>[a-z0-9]+)_(?P<descriptor>[^_]+)_"
+    r"(?P<start_date>\d{8})_v(?P<version>\d{3})\."
+)
+
+
+def upgrade() -> None:
+    op.add_column("files", sa.Column("instrument", sa.String(length=16), nullable=True))
+    op.add_column("files", sa.Column("level", sa.String(length=8), nullable=True))
+    op.add_column("files", sa.Column("descriptor", sa.String(length=64), nullable=True))
+    op.add_column("files", sa.Column("start_date", sa.Date(), nullable=True))
+    op.add_column("files", sa.Column("version", sa.Integer(), nullable=True))
+    op.add_column("files", sa.Column("size", sa.BigInteger(), nullable=True))
+    op.add_column("files", sa.Column("checksum", sa.String(length=64), nullable=True))
+    op.add_column("files", sa.Column("ingest_time", sa.DateTime(), nullable=True))
+    op.create_index(
+        "ix_files_science_lookup",
+        "files",
+        ["instrument", "level", "descriptor", "start_date", "version"],
+        unique=False,
+    )
+
+    # fill in the catalogue columns of existing science files from their names
+    files = sa.table(
+        "files",
+        sa.column("id", sa.Integer),
+        sa.column("name", sa.String),
+        sa.column("instrument", sa.String),
+        sa.column("level", sa.String),
+        sa.column("descriptor", sa.String),
+        sa.column("start_date", sa.Date),
+        sa.column("version", sa.Integer),
+    )
+    connection = op.get_bind()
+
+    for id, name in connection.execute(sa.select(files.c.id, files.c.name)):
+        match = SCIENCE_FILE_PATTERN.match(name)
+
+        if match is None:
+            continue
+
+        connection.execute(
+            files.update()
+            .where(files.c.id == id)
+            .values(
+                instrument=match["instrument"],
+                level=match["level"],
+                descriptor=match["descriptor"],
+                start_date=datetime.strptime(match["start_date"], "%Y%m%d").date(),
+                version=int(match["version"]),
+            )
+        )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_files_science_lookup", table_name="files")
+    op.drop_column("files", "ingest_time")
+    op.drop_column("files", "checksum")
+    op.drop_column("files", "size")
+    op.drop_column("files", "version")
+    op.drop_column("files", "start_date")
+    op.drop_column("files", "descriptor")
+    op.drop_column("files", "level")
+    op.drop_column("files", "instrument")
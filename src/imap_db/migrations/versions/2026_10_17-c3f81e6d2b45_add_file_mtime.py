@@ -0,0 +1,25 @@
+"""Add file modification time.
+
+Revision ID: c3f81e6d2b45
+Revises: 9e4d2a6b3c71
+Create Date: 2026-10-17 16:48:21.507113
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "c3f81e6d2b45"
+down_revision = "9e4d2a6b3c71"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # nanoseconds since the epoch, so unchanged files are found without hashing them
+    op.add_column("files", sa.Column("mtime", sa.BigInteger(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("files", "mtime")
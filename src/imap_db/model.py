@@ -1,4 +1,6 @@
-from sqlalchemy import String
+from datetime import date, datetime
+
+from sqlalchemy import BigInteger, Date, DateTime, Index, Integer, String
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 
 
@@ -8,9 +10,30 @@ class Base(DeclarativeBase):
 
 class File(Base):
     __tablename__ = "files"
+    __table_args__ = (
+        Index("ix_files_name_path", "name", "path", unique=True),
+        Index(
+            "ix_files_science_lookup",
+            "instrument",
+            "level",
+            "descriptor",
+            "start_date",
+            "version",
+        ),
+    )
+
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str] = mapped_column(String(128))
     path: Mapped[str] = mapped_column(String(256))
+    instrument: Mapped[str | None] = mapped_column(String(16))
+    level: Mapped[str | None] = mapped_column(String(8))
+    descriptor: Mapped[str | None] = mapped_column(String(64))
+    start_date: Mapped[date | None] = mapped_column(Date)
+    version: Mapped[int | None] = mapped_column(Integer)
+    size: Mapped[int | None] = mapped_column(BigInteger)
+    mtime: Mapped[int | None] = mapped_column(BigInteger)
+    checksum: Mapped[str | None] = mapped_column(String(64))
+    ingest_time: Mapped[datetime | None] = mapped_column(DateTime)
 
     def __repr__(self) -> str:
         return f"<File {self.id} (name={self.name}, path={self.path})>"
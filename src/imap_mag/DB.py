@@ -1,38 +1,64 @@
-import os
+from datetime import date, datetime
+from pathlib import Path
 
+from imap_db.engine import get_engine
 from imap_db.model import File
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session, sessionmaker
 
+from . import appUtils
 
-class DB:
-    def __init__(self, db_url=None):
-        env_url = os.getenv("SQLALCHEMY_URL")
-        if db_url is None and env_url is not None:
-            db_url = env_url
+INSERT_BATCH_SIZE = 5000
+
+
+def create_file_record(file: Path) -> File:
+    """Create a file record, with catalogue details parsed from science file names."""
+
+    stat = file.stat()
 
-        if db_url is None:
-            raise ValueError(
-                "No database URL provided. Consider setting SQLALCHEMY_URL environment variable."
-            )
+    return File(
+        name=file.name,
+        path=file.absolute().as_posix(),
+        size=stat.st_size,
+        mtime=stat.st_mtime_ns,
+        checksum=appUtils.getFileChecksum(file),
+        ingest_time=datetime.now(),
+        **(appUtils.parseScienceFileName(file.name) or dict()),
+    )
 
-        self.engine = create_engine(db_url)
+
+class DB:
+    def __init__(self, db_url=None):
+        # engines are shared, so every DB instance reuses the same connection pool
+        self.engine = get_engine(db_url)
         self.Session = sessionmaker(bind=self.engine)
 
     def insert_files(self, files: list[File]):
+        """Insert files in one batch, skipping those already in the database."""
+
+        columns = [
+            column.key for column in File.__table__.columns if column.key != "id"
+        ]
+
+        # drop duplicates within the batch too
+        rows = list(
+            {
+                (file.name, file.path): {
+                    column: getattr(file, column) for column in columns
+                }
+                for file in files
+            }.values()
+        )
+
+        if not rows:
+            return
+
         session = self.Session()
         try:
-            for file in files:
-                # check file does not already exist
-                existing_file = (
-                    session.query(File)
-                    .filter_by(name=file.name, path=file.path)
-                    .first()
-                )
-                if existing_file is not None:
-                    continue
-
-                session.add(file)
+            # batch rows to stay within the bound parameter limits of the database
+            for start in range(0, len(rows), INSERT_BATCH_SIZE):
+                self.__insert_rows(session, rows[start : start + INSERT_BATCH_SIZE])
 
             session.commit()
         except Exception as e:
@@ -40,3 +66,67 @@ class DB:
             raise e
         finally:
             session.close()
+
+    def __insert_rows(self, session: Session, rows: list[dict]):
+        match self.engine.dialect.name:
+            case "postgresql":
+                session.execute(
+                    postgresql.insert(File)
+                    .values(rows)
+                    .on_conflict_do_nothing(index_elements=["name", "path"])
+                )
+            case "sqlite":
+                session.execute(
+                    sqlite.insert(File)
+                    .values(rows)
+                    .on_conflict_do_nothing(index_elements=["name", "path"])
+                )
+            case _:
+                existing = set(
+                    session.execute(
+                        select(File.name, File.path).where(
+                            File.name.in_([row["name"] for row in rows])
+                        )
+                    ).tuples()
+                )
+                rows = [
+                    row for row in rows if (row["name"], row["path"]) not in existing
+                ]
+
+                if rows:
+                    session.execute(insert(File).values(rows))
+
+    def get_files(self, **filters) -> list[File]:
+        session = self.Session()
+        try:
+            return session.query(File).filter_by(**filters).all()
+        finally:
+            session.close()
+
+    def get_latest_file(
+        self,
+        instrument: str,
+        level: str,
+        descriptor: str,
+        start_date: date,
+        version: int | None = None,
+    ) -> File | None:
+        """Find the latest version of a science file, or a specific version, using the catalogue index."""
+
+        statement = select(File).where(
+            File.instrument == instrument,
+            File.level == level,
+            File.descriptor == descriptor,
+            File.start_date == start_date,
+        )
+
+        if version is not None:
+            statement = statement.where(File.version == version)
+
+        statement = statement.order_by(File.version.desc(), File.ingest_time.desc())
+
+        session = self.Session()
+        try:
+            return session.scalars(statement.limit(1)).first()
+        finally:
+            session.close()
@@ -1,12 +1,33 @@
 """App configuration module."""
 
+import importlib.util
+from datetime import datetime
 from pathlib import Path
-from typing import Optional
-
-from pydantic import BaseModel
+from typing import Literal, Optional
+
+from pydantic import (
+    BaseModel,
+    NonNegativeFloat,
+    NonNegativeInt,
+    PositiveInt,
+    field_validator,
+    model_validator,
+)
 from pydantic.aliases import AliasGenerator
 from pydantic.config import ConfigDict
 
+# commands that can be given the time range of each pipeline run
+WINDOWED_COMMANDS = ["fetch-binary", "fetch-science"]
+
+# imap-db commands that can run in a pipeline, which take no configuration file
+DATABASE_COMMANDS = ["query-db"]
+
+# output formats needing optional dependencies, with the module and the extra installing it
+FORMAT_DEPENDENCIES = {
+    "parquet": ("pyarrow", "parquet"),
+    "netcdf": ("netCDF4", "netcdf"),
+}
+
 
 def hyphenize(field: str):
     return field.replace("_", "-")
@@ -14,12 +35,34 @@ def hyphenize(field: str):
 
 class Source(BaseModel):
     folder: Path
+    # look science files up in the database catalogue before listing the folder
+    catalogue: bool = False
+    # how input files are made available in the work folder; "auto" only copies from network mounts
+    staging: Literal["auto", "copy", "reflink", "hardlink", "symlink", "in-place"] = (
+        "auto"
+    )
 
 
 class Destination(BaseModel):
     folder: Path = Path(".")
     filename: str
     export_to_database: bool = True
+    format: Literal["csv", "parquet", "cdf", "netcdf"] = "csv"
+
+    @field_validator("format")
+    @classmethod
+    def checkFormatIsInstalled(cls, format: str) -> str:
+        # fail when loading the configuration, rather than after processing
+        if format in FORMAT_DEPENDENCIES:
+            (module, extra) = FORMAT_DEPENDENCIES[format]
+
+            if importlib.util.find_spec(module) is None:
+                raise ValueError(
+                    f"Output format {format} requires {module}. "
+                    f"Install it with `pip install imap-mag[{extra}]`."
+                )
+
+        return format
 
 
 class PacketDefinition(BaseModel):
@@ -29,6 +72,24 @@ class PacketDefinition(BaseModel):
 class API(BaseModel):
     webpoda_url: Optional[str] = None
     sdc_url: Optional[str] = None
+    max_concurrent_requests: PositiveInt = 4
+    # pooled connections per host, and retries with exponential backoff on connection and server errors
+    pool_size: PositiveInt = 10
+    max_retries: NonNegativeInt = 3
+    retry_backoff: NonNegativeFloat = 1.0
+    # in incremental mode, seconds before the last ingested time to fetch from again, for late data
+    incremental_overlap: NonNegativeInt = 3600
+
+
+class Processing(BaseModel):
+    hk_decoding: Literal["columnar", "packet"] = "columnar"
+    # decode HK files this many packets at a time, to bound memory use; CDF and netCDF outputs are still
+    # written whole, so only CSV and Parquet outputs are bounded
+    hk_chunk_size: Optional[PositiveInt] = None
+    # apply calibrations this many records at a time, rather than loading whole files
+    calibration_chunk_size: Optional[PositiveInt] = None
+    # bytes of loaded CDF variables to cache in the work folder, for later commands loading the same files
+    cdf_cache_size: NonNegativeInt = 1024**3
 
 
 class AppConfig(BaseModel):
@@ -37,6 +98,7 @@ class AppConfig(BaseModel):
     destination: Destination
     packet_definition: Optional[PacketDefinition] = None
     api: Optional[API] = None
+    processing: Processing = Processing()
 
     def __init__(self, **kwargs):
         # Replace hypens with underscores so that you can build config from constructor args,
@@ -50,3 +112,54 @@ class AppConfig(BaseModel):
             validation_alias=hyphenize, serialization_alias=hyphenize
         )
     )
+
+
+class PipelineStep(BaseModel):
+    # an imap-mag or imap-db command, and the command line arguments to run it with, e.g., ["--apid", "1063"]
+    command: Literal[
+        "fetch-binary", "process", "fetch-science", "calibrate", "apply", "query-db"
+    ]
+    config: Optional[Path] = None
+    args: list[str] = []
+    # give the step --start-date and --end-date of each run, unless set in its arguments
+    window: bool = False
+
+    @model_validator(mode="after")
+    def checkWindowIsSupported(self) -> "PipelineStep":
+        if self.window and self.command not in WINDOWED_COMMANDS:
+            raise ValueError(
+                f"Only {' and '.join(WINDOWED_COMMANDS)} steps can be given the time range of a run."
+            )
+
+        return self
+
+    @model_validator(mode="after")
+    def checkConfigIsGiven(self) -> "PipelineStep":
+        if (self.config is None) != (self.command in DATABASE_COMMANDS):
+            raise ValueError(
+                f"Step {self.command} needs a config file."
+                if self.config is None
+                else f"Step {self.command} takes no config file."
+            )
+
+        return self
+
+
+class PipelineConfig(BaseModel):
+    steps: list[PipelineStep]
+    work_folder: Path = Path(".work")
+    # seconds between the start of consecutive runs
+    interval: PositiveInt = 3600
+    # start of the first run, and end of every run if set, rather than now
+    start_date: Optional[datetime] = None
+    end_date: Optional[datetime] = None
+
+    def __init__(self, **kwargs):
+        kwargs = dict((key.replace("_", "-"), value) for (key, value) in kwargs.items())
+        super().__init__(**kwargs)
+
+    model_config = ConfigDict(
+        alias_generator=AliasGenerator(
+            validation_alias=hyphenize, serialization_alias=hyphenize
+        )
+    )
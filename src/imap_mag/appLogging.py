@@ -93,6 +93,8 @@ def set_up_logging(
         fmt=console_log_line_template, color=console_log_color
     )
     console_handler.setFormatter(console_formatter)
+    for handler in logger.handlers:
+        handler.close()  # close log files of earlier set-ups
     logger.handlers.clear()  # clear default handler
     logger.addHandler(console_handler)
 
@@ -1,11 +1,16 @@
+import hashlib
+import json
 import logging
 import os
+import re
 import shutil
+import tempfile
+from collections.abc import Callable
+from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import Any, BinaryIO, Optional
 
 import numpy as np
-import pandas as pd
 import typer
 
 from . import appConfig
@@ -13,6 +18,12 @@ from . import appConfig
 IMAP_EPOCH = np.datetime64("2010-01-01T00:00:00", "ns")
 J2000_EPOCH = np.datetime64("2000-01-01T11:58:55.816", "ns")
 
+# e.g., imap_mag_l1b_norm-mago_20250502_v000.cdf, where the version is optional in patterns
+SCIENCE_FILE_PATTERN = re.compile(
+    r"^imap_(?P<instrument>[a-z]+)_(?P<level>[a-z0-9]+)_(?P<descriptor>[^_]+)_"
+    r"(?P<start_date>\d{8})(?:_v(?P<version>\d{3})\.)?"
+)
+
 APID_TO_PACKET = {
     1028: "MAG_HSK_SID1",
     1055: "MAG_HSK_SID2",
@@ -47,8 +58,70 @@ def getPacketFromApID(apid: int) -> str:
     return APID_TO_PACKET[apid]
 
 
+def getPacketsFromApIDs(apids: list[str]) -> dict[int, str]:
+    """Get packet names from ApIDs, where "all" selects every known packet."""
+
+    if any(apid.lower() == "all" for apid in apids):
+        return dict(APID_TO_PACKET)
+
+    packets: dict[int, str] = dict()
+
+    for apid in apids:
+        try:
+            packets[int(apid)] = getPacketFromApID(int(apid))
+        except ValueError:
+            logging.critical(f"ApID {apid} is not a number.")
+            raise typer.Abort()
+
+    return packets
+
+
+def parseScienceFileName(name: str) -> dict | None:
+    """Get instrument, level, descriptor, start date and version from a science file name, if it is one."""
+
+    match = SCIENCE_FILE_PATTERN.match(name)
+
+    if match is None:
+        return None
+
+    return {
+        "instrument": match["instrument"],
+        "level": match["level"],
+        "descriptor": match["descriptor"],
+        "start_date": datetime.strptime(match["start_date"], "%Y%m%d").date(),
+        "version": int(match["version"]) if match["version"] else None,
+    }
+
+
+def getLevelFileName(name: str, level: str) -> str:
+    """Get the name of a file at another processing level, e.g., l1b to l2, from the name of a science file."""
+
+    match = SCIENCE_FILE_PATTERN.match(name)
+
+    if match is None:
+        path = Path(name)
+        return f"{path.stem}_{level}{path.suffix}"
+
+    return name[: match.start("level")] + level + name[match.end("level") :]
+
+
+def getFileChecksum(file: Path) -> str:
+    """Compute the SHA-256 checksum of a file."""
+
+    hash = hashlib.sha256()
+
+    with open(file, "rb") as f:
+        while chunk := f.read(1024 * 1024):
+            hash.update(chunk)
+
+    return hash.hexdigest()
+
+
 def convertToDatetime(string: str) -> np.datetime64:
     """Convert string to datetime."""
+
+    import pandas as pd
+
     try:
         return pd.to_datetime(string)
     except Exception as e:
@@ -56,7 +129,11 @@ def convertToDatetime(string: str) -> np.datetime64:
         raise typer.Abort()
 
 
-def copyFileToDestination(filePath: Path, destination: appConfig.Destination) -> None:
+def copyFileToDestination(
+    filePath: Path,
+    destination: appConfig.Destination,
+    filename: Optional[str] = None,
+) -> None:
     """Copy file to destination folder."""
 
     destinationFile = Path(destination.folder)
@@ -65,9 +142,63 @@ def copyFileToDestination(filePath: Path, destination: appConfig.Destination) ->
         logging.debug(f"Creating destination folder {destinationFile}.")
         os.makedirs(destinationFile)
 
-    if destination.filename:
-        destinationFile = destinationFile / destination.filename
+    if filename or destination.filename:
+        destinationFile = destinationFile / (filename or destination.filename)
 
     logging.info(f"Copying {filePath} to {destinationFile.absolute()}")
     completed = shutil.copy2(filePath, destinationFile)
     logging.info(f"Copy complete: {completed}")
+
+
+def copyFilesToDestination(
+    filePaths: list[Path], destination: appConfig.Destination
+) -> None:
+    """Copy files to destination folder.
+
+    A single file is renamed to the destination file name, while multiple files keep their own names.
+    """
+
+    if len(filePaths) == 1:
+        copyFileToDestination(filePaths[0], destination)
+        return
+
+    for filePath in filePaths:
+        copyFileToDestination(filePath, destination, Path(filePath).name)
+
+
+def writeFileAtomically(
+    file: Path, data: str | bytes | Callable[[BinaryIO], None]
+) -> None:
+    """Write a file, given its content or a function writing it, so it is never seen partly written.
+
+    The content goes to a temporary file in the same folder first, which then replaces the file. Readers,
+    concurrent runs and interrupted writes therefore only ever see the old or the new file.
+    """
+
+    file.parent.mkdir(parents=True, exist_ok=True)
+    (handle, temporaryFile) = tempfile.mkstemp(dir=file.parent, suffix=".tmp")
+
+    try:
+        with os.fdopen(handle, "wb") as f:
+            if callable(data):
+                data(f)
+            else:
+                f.write(data.encode() if isinstance(data, str) else data)
+
+        os.replace(temporaryFile, file)
+    except BaseException:
+        os.remove(temporaryFile)
+        raise
+
+
+def readJsonFile(file: Path) -> Any | None:
+    """Read a JSON file written by writeFileAtomically, or None if it is missing or unreadable."""
+
+    if not file.exists():
+        return None
+
+    try:
+        return json.loads(file.read_text())
+    except (OSError, ValueError) as e:
+        logging.warning(f"Ignoring unreadable {file}: {e}")
+        return None
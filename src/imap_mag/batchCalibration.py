@@ -0,0 +1,103 @@
+"""Apply a calibration to many files in one invocation, on a pool of worker processes."""
+
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from mag_toolkit.calibration.CalibrationApplicator import CalibrationApplicator
+from mag_toolkit.calibration.calibrationFormat import CalibrationFormat
+from mag_toolkit.CDFCache import CDFCache
+
+from . import appConfig, appUtils, fileStaging
+from .batchProcessing import BatchSummary, forwardWorkerLogs, initializeWorkerLogging
+
+APPLY_FOLDER_NAME = "apply"
+SUMMARY_FILE_NAME = "apply-summary.json"
+OUTPUT_LEVEL = "l2"
+
+# set up once in every worker process
+_config: appConfig.AppConfig | None = None
+_calibration: CalibrationFormat | None = None
+
+
+def applyToFiles(
+    files: list[Path],
+    calibration: CalibrationFormat,
+    config: appConfig.AppConfig,
+    workers: int | None = None,
+) -> BatchSummary:
+    """Apply a calibration to files in parallel, copying each output to the destination.
+
+    The calibration is parsed once, and handed to every worker process when it starts. Outputs are named
+    after their input at the output level, e.g., l1b to l2, so they do not collide.
+    """
+
+    summary = BatchSummary()
+    workers = min(workers or os.cpu_count() or 1, max(len(files), 1))
+
+    logging.info(f"Applying calibration to {len(files)} files with {workers} workers.")
+
+    # spawn rather than fork workers, as forking a process running threads can deadlock
+    context = multiprocessing.get_context("spawn")
+
+    with (
+        forwardWorkerLogs(context) as logQueue,
+        ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=context,
+            initializer=_initializeWorker,
+            initargs=(config, calibration, logQueue),
+        ) as executor,
+    ):
+        futures = {executor.submit(_applyToFile, file): file for file in files}
+
+        for i, future in enumerate(as_completed(futures), start=1):
+            file = futures[future]
+
+            try:
+                result: Path = future.result()
+            except Exception as e:
+                logging.error(f"Failed to apply calibration to {file}: {e}")
+                summary.failures[file.name] = str(e)
+                continue
+
+            appUtils.copyFileToDestination(result, config.destination, result.name)
+
+            summary.outputs[file.name] = [result.name]
+            logging.info(f"Calibrated {file.name} ({i}/{len(files)}).")
+
+    return summary
+
+
+def _initializeWorker(
+    config: appConfig.AppConfig,
+    calibration: CalibrationFormat,
+    logQueue: multiprocessing.Queue,
+) -> None:
+    global _config, _calibration
+
+    initializeWorkerLogging(logQueue)
+
+    _config = config
+    _calibration = calibration
+
+
+def _applyToFile(file: Path) -> Path:
+    # keep inputs apart from outputs, in case an input is already at the output level
+    inputFolder = _config.work_folder / APPLY_FOLDER_NAME / "inputs"
+    outputFolder = _config.work_folder / APPLY_FOLDER_NAME / "outputs"
+
+    inputFolder.mkdir(parents=True, exist_ok=True)
+    outputFolder.mkdir(parents=True, exist_ok=True)
+
+    workFile = fileStaging.stageFile(file, inputFolder, _config.source.staging)
+    outputFile = outputFolder / appUtils.getLevelFileName(file.name, OUTPUT_LEVEL)
+
+    applicator = CalibrationApplicator(
+        chunkSize=_config.processing.calibration_chunk_size,
+        cache=CDFCache(_config.work_folder, _config.processing.cdf_cache_size),
+    )
+
+    return Path(applicator.applyCalibration(_calibration, workFile, outputFile))
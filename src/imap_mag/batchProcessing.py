@@ -0,0 +1,140 @@
+"""Process many files in one invocation, on a pool of worker processes."""
+
+import json
+import logging
+import logging.handlers
+import multiprocessing
+import os
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from . import appConfig, appUtils, fileStaging, imapProcessing
+
+BATCH_FOLDER_NAME = "batch"
+SUMMARY_FILE_NAME = "process-summary.json"
+
+# set up once in every worker process
+_config: appConfig.AppConfig | None = None
+_processors: dict[type, imapProcessing.FileProcessor] = dict()
+
+
+@dataclass
+class BatchSummary:
+    """Outputs of every file processed, and errors of those that failed."""
+
+    outputs: dict[str, list[str]] = field(default_factory=dict)
+    failures: dict[str, str] = field(default_factory=dict)
+
+    def write(self, file: Path) -> Path:
+        file.parent.mkdir(parents=True, exist_ok=True)
+        file.write_text(
+            json.dumps({"outputs": self.outputs, "failures": self.failures}, indent=2)
+        )
+
+        return file
+
+
+@contextmanager
+def forwardWorkerLogs(context) -> Iterator[multiprocessing.Queue]:
+    """Log the records of worker processes with the handlers of this process, e.g., to the run's log file."""
+
+    queue = context.Queue()
+    listener = logging.handlers.QueueListener(
+        queue, *logging.getLogger().handlers, respect_handler_level=True
+    )
+    listener.start()
+
+    try:
+        yield queue
+    finally:
+        listener.stop()
+
+
+def initializeWorkerLogging(queue: multiprocessing.Queue) -> None:
+    """Send every record logged in a worker process to the process forwarding them."""
+
+    logger = logging.getLogger()
+    logger.handlers.clear()
+    logger.addHandler(logging.handlers.QueueHandler(queue))
+    logger.setLevel(logging.DEBUG)
+
+
+def processFiles(
+    files: list[Path], config: appConfig.AppConfig, workers: int | None = None
+) -> BatchSummary:
+    """Process files in parallel, copying the outputs of each to its own folder in the destination.
+
+    Every worker process initialises one processor per file type, and reuses it for all its files.
+    """
+
+    summary = BatchSummary()
+    workers = min(workers or os.cpu_count() or 1, max(len(files), 1))
+
+    logging.info(f"Processing {len(files)} files with {workers} workers.")
+
+    # spawn rather than fork workers, as forking a process running threads can deadlock
+    context = multiprocessing.get_context("spawn")
+
+    with (
+        forwardWorkerLogs(context) as logQueue,
+        ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=context,
+            initializer=_initializeWorker,
+            initargs=(config, logQueue),
+        ) as executor,
+    ):
+        futures = {executor.submit(_processFile, file): file for file in files}
+
+        for i, future in enumerate(as_completed(futures), start=1):
+            file = futures[future]
+
+            try:
+                results: list[Path] = future.result()
+            except Exception as e:
+                logging.error(f"Failed to process {file}: {e}")
+                summary.failures[file.name] = str(e)
+                continue
+
+            # outputs of different inputs often share names, so keep them apart
+            destination = config.destination.model_copy(
+                update={"folder": Path(config.destination.folder) / file.stem}
+            )
+
+            for result in results:
+                appUtils.copyFileToDestination(result, destination, result.name)
+
+            summary.outputs[file.name] = [result.name for result in results]
+            logging.info(f"Processed {file.name} ({i}/{len(files)}).")
+
+    return summary
+
+
+def _initializeWorker(
+    config: appConfig.AppConfig, logQueue: multiprocessing.Queue
+) -> None:
+    global _config
+
+    initializeWorkerLogging(logQueue)
+
+    _config = config
+    _processors.clear()
+
+
+def _processFile(file: Path) -> list[Path]:
+    # stage every file in its own folder, so inputs of the same name do not collide
+    workFolder = _config.work_folder / BATCH_FOLDER_NAME / file.stem
+    workFolder.mkdir(parents=True, exist_ok=True)
+
+    workFile = fileStaging.stageFile(file, workFolder, _config.source.staging)
+
+    processor = imapProcessing.dispatchFile(workFile)
+
+    if type(processor) not in _processors:
+        processor.initialize(_config)
+        _processors[type(processor)] = processor
+
+    return _processors[type(processor)].process(workFile)
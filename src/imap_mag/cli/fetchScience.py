@@ -1,6 +1,9 @@
 """Program to retrieve and process MAG CDF files."""
 
+import logging
 import typing
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta
 from enum import Enum
 from pathlib import Path
 
@@ -9,6 +12,10 @@ import typing_extensions
 
 from .. import appUtils
 from ..client.sdcDataAccess import ISDCDataAccess
+from ..downloadManifest import IDownloadManifest
+from ..watermarks import Watermarks
+
+DEFAULT_MAX_WORKERS = 4
 
 
 class MAGMode(str, Enum):
@@ -35,51 +42,193 @@ class FetchScience:
 
     __modes: list[MAGMode]
     __sensor: list[MAGSensor]
+    __max_workers: int
 
     __data_access: ISDCDataAccess
+    __manifest: IDownloadManifest | None
+    __watermarks: Watermarks | None
+    __overlap: timedelta
 
     def __init__(
         self,
         data_access: ISDCDataAccess,
         modes: list[MAGMode] = ["norm", "burst"],
         sensors: list[MAGSensor] = ["magi", "mago"],
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        manifest: IDownloadManifest | None = None,
+        watermarks: Watermarks | None = None,
+        overlap: timedelta = timedelta(),
     ) -> None:
-        """Initialize SDC interface."""
+        """Initialize SDC interface.
+
+        With watermarks, each descriptor is only queried from the day of its latest file downloaded before,
+        less the overlap.
+        """
 
         self.__data_access = data_access
         self.__modes = modes
         self.__sensor = sensors
+        self.__max_workers = max_workers
+        self.__manifest = manifest
+        self.__watermarks = watermarks
+        self.__overlap = overlap
 
     def download_latest_science(
         self, **options: typing_extensions.Unpack[FetchScienceOptions]
-    ) -> list[Path]:
-        """Retrieve SDC data."""
+    ) -> tuple[list[Path], dict[str, datetime]]:
+        """Retrieve SDC data.
+
+        Each descriptor is queried once over the whole date range, and the latest version of every file is
+        picked locally. Queries and downloads run concurrently, but files are returned in mode, date and
+        sensor order. With watermarks, the time each descriptor is ingested up to is returned too, to be
+        recorded once the files are stored.
+        """
+
+        date_range: pd.DatetimeIndex = pd.date_range(
+            start=appUtils.convertToDatetime(options["start_date"]),
+            end=appUtils.convertToDatetime(options["end_date"]),
+            freq="D",
+            normalize=True,
+        )
+
+        if date_range.empty:
+            return ([], dict())
+
+        dates: list[str] = [date.strftime("%Y%m%d") for date in date_range]
+        descriptors: list[str] = [
+            str(mode) + "-" + str(sensor)
+            for mode in self.__modes
+            for sensor in self.__sensor
+        ]
+
+        starts: dict[str, datetime] = {
+            descriptor: self.__get_start(
+                options["level"], descriptor, date_range[0].to_pydatetime()
+            )
+            for descriptor in descriptors
+        }
+
+        with ThreadPoolExecutor(max_workers=self.__max_workers) as executor:
+            queries: list[Future] = [
+                executor.submit(
+                    self.__query,
+                    options["level"],
+                    descriptor,
+                    starts[descriptor],
+                    date_range[-1].to_pydatetime(),
+                )
+                for descriptor in descriptors
+                if starts[descriptor] <= date_range[-1]
+                and not self.__is_up_to_date(
+                    options["level"], descriptor, date_range[-1].to_pydatetime()
+                )
+            ]
+
+            latest: dict[tuple[str, str], dict[str, str]] = dict()
+
+            for query in queries:
+                for file in query.result():
+                    key = (file["descriptor"], file["start_date"])
+
+                    if (
+                        file["start_date"] in dates
+                        and file["start_date"]
+                        >= starts[file["descriptor"]].strftime("%Y%m%d")
+                    ) and (
+                        key not in latest
+                        or self.__version(file) > self.__version(latest[key])
+                    ):
+                        latest[key] = file
+
+            files: list[dict[str, str]] = [
+                latest[(str(mode) + "-" + str(sensor), date)]
+                for mode in self.__modes
+                for date in dates
+                for sensor in self.__sensor
+                if (str(mode) + "-" + str(sensor), date) in latest
+            ]
+
+            logging.info(
+                f"Found {len(files)} matching files:\n"
+                + ", ".join(file["file_path"] for file in files)
+            )
 
-        downloaded = []
+            downloaded: list[Path] = list(executor.map(self.__download, files))
 
-        for mode in self.__modes:
-            date_range: pd.DatetimeIndex = pd.date_range(
-                start=appUtils.convertToDatetime(options["start_date"]),
-                end=appUtils.convertToDatetime(options["end_date"]),
-                freq="D",
-                normalize=True,
-            )
+        ingested: dict[str, datetime] = dict()
+
+        if self.__watermarks is not None:
+            # a day is ingested up to its end, once any of its files is downloaded
+            for file in files:
+                key = self.__watermark_key(options["level"], file["descriptor"])
+                time = datetime.strptime(file["start_date"], "%Y%m%d") + timedelta(
+                    days=1
+                )
 
-            for date in date_range.to_pydatetime():
-                for sensor in self.__sensor:
-                    file_details = self.__data_access.get_filename(
-                        level=options["level"],
-                        descriptor=str(mode) + "-" + str(sensor),
-                        start_date=date,
-                        end_date=None,
-                        version="latest",
-                        extension="cdf",
-                    )
-
-                    if file_details is not None:
-                        for file in file_details:
-                            downloaded += [
-                                self.__data_access.download(file["file_path"])
-                            ]
+                if key not in ingested or ingested[key] < time:
+                    ingested[key] = time
+
+        logging.debug(
+            f"Downloaded {len(downloaded)} files from {len(queries)} queries."
+        )
+
+        return (downloaded, ingested)
+
+    def __get_start(self, level: str, descriptor: str, start: datetime) -> datetime:
+        if self.__watermarks is None:
+            return start
+
+        # query whole days, from the day the overlap reaches back to
+        return pd.Timestamp(
+            self.__watermarks.getStart(
+                self.__watermark_key(level, descriptor), start, self.__overlap
+            )
+        ).normalize()
+
+    def __is_up_to_date(self, level: str, descriptor: str, end: datetime) -> bool:
+        if self.__watermarks is None:
+            return False
+
+        watermark = self.__watermarks.get(self.__watermark_key(level, descriptor))
+
+        # watermarks are at the end of the day of the latest file, and days within the overlap are queried
+        # again, for new versions of their files
+        return watermark is not None and watermark - self.__overlap >= end + timedelta(
+            days=1
+        )
+
+    @staticmethod
+    def __watermark_key(level: str, descriptor: str) -> str:
+        return f"science/{level}/{descriptor}"
+
+    def __query(
+        self, level: str, descriptor: str, start_date: datetime, end_date: datetime
+    ) -> list[dict[str, str]]:
+        # the SDC end date is exclusive, so query one more day and filter locally
+        return self.__data_access.query(
+            level=level,
+            descriptor=descriptor,
+            start_date=start_date,
+            end_date=end_date + timedelta(days=1),
+            version=None,
+            extension="cdf",
+        )
+
+    def __download(self, file: dict[str, str]) -> Path:
+        if self.__manifest is not None:
+            existing = self.__manifest.find(file["file_path"], file["version"])
+
+            if existing is not None:
+                logging.info(f"Skipping download of unchanged {file['file_path']}.")
+                return existing
+
+        downloaded = self.__data_access.download(file["file_path"])
+
+        if self.__manifest is not None:
+            self.__manifest.record(file["file_path"], file["version"], downloaded)
 
         return downloaded
+
+    @staticmethod
+    def __version(file: dict[str, str]) -> int:
+        return int(file["version"].lstrip("v"))
@@ -3,14 +3,28 @@
 import abc
 import logging
 import os
+import shutil
+import time
 import typing
 import urllib.parse
-from datetime import datetime
+from datetime import datetime, timedelta
 from pathlib import Path
 
 import requests
 from typing_extensions import Unpack
 
+from .httpSession import (
+    DEFAULT_MAX_RETRIES,
+    DEFAULT_POOL_SIZE,
+    DEFAULT_RETRY_BACKOFF,
+    createSession,
+)
+
+CHUNK_SIZE = 1024 * 1024
+DEFAULT_WINDOW = timedelta(days=1)
+# seconds to connect, and between bytes received
+REQUEST_TIMEOUT = 60
+
 
 class DownloadOptions(typing.TypedDict):
     """Options for download."""
@@ -30,14 +44,31 @@ class IWebPODA(abc.ABC):
 
 
 class WebPODA(IWebPODA):
-    """Class for downloading raw packets from WebPODA."""
+    """Class for downloading raw packets from WebPODA.
+
+    Downloads are split into time windows, each streamed to its own file in a parts folder. If a download is
+    interrupted, windows already complete are not downloaded again next time, unless they end after the time
+    of download, as their data may still have been arriving. All requests share one
+    keep-alive session, which retries connection errors and server errors.
+    """
 
     __webpoda_url: str
     __auth_code: str
     __output_dir: Path
+    __window: timedelta
+    __max_retries: int
+    __retry_backoff: float
+    __session: requests.Session
 
     def __init__(
-        self, auth_code: str, output_dir: Path, webpoda_url: str | None = None
+        self,
+        auth_code: str,
+        output_dir: Path,
+        webpoda_url: str | None = None,
+        window: timedelta = DEFAULT_WINDOW,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        retry_backoff: float = DEFAULT_RETRY_BACKOFF,
     ) -> None:
         """Initialize WebPODA interface."""
 
@@ -46,11 +77,20 @@ class WebPODA(IWebPODA):
         self.__webpoda_url = (
             webpoda_url or "https://lasp.colorado.edu/ops/imap/poda/dap2/"
         )
+        self.__window = window
+        self.__max_retries = max_retries
+        self.__retry_backoff = retry_backoff
+        self.__session = createSession(pool_size, max_retries, retry_backoff)
+
+    def close(self) -> None:
+        """Close all pooled connections."""
+        self.__session.close()
 
     def download(self, **options: Unpack[DownloadOptions]) -> Path:
         """Download packet data from WebPODA."""
 
         file_path: Path = self.__output_dir / (options["packet"] + ".bin")
+        parts_dir: Path = self.__output_dir / (options["packet"] + ".bin.parts")
 
         logging.info(
             f"Downloading {options['packet']} from "
@@ -58,22 +98,79 @@ class WebPODA(IWebPODA):
             f"into {file_path}."
         )
 
-        if not self.__output_dir.exists():
-            os.makedirs(self.__output_dir)
+        os.makedirs(parts_dir, exist_ok=True)
 
-        response: requests.Response = self.__download_from_webpoda(
-            options["packet"],
-            "bin",
-            options["start_date"],
-            options["end_date"],
-            "project(packet)",
-        )
+        parts: list[Path] = []
+        window_start: datetime = options["start_date"]
+        # windows ending after now may still be receiving data, so are never reused
+        downloaded_at: datetime = datetime.now(options["end_date"].tzinfo)
+
+        while window_start < options["end_date"]:
+            window_end: datetime = min(
+                window_start + self.__window, options["end_date"]
+            )
+            complete: bool = window_end <= downloaded_at
+            part: Path = parts_dir / (
+                f"{window_start:%Y%m%dT%H%M%S}-{window_end:%Y%m%dT%H%M%S}"
+                + (".bin" if complete else ".incomplete.bin")
+            )
+
+            if complete and part.exists():
+                logging.debug(f"Reusing window already downloaded in {part}.")
+            else:
+                self.__download_window(
+                    options["packet"], window_start, window_end, part
+                )
 
-        with open(file_path, "wb") as f:
-            f.write(response.content)
+            parts.append(part)
+            window_start = window_end
+
+        # join windows into a temporary file, so the output only ever appears complete
+        temporary_path: Path = file_path.with_name(file_path.name + ".tmp")
+
+        with open(temporary_path, "wb") as f:
+            for part in parts:
+                with open(part, "rb") as p:
+                    shutil.copyfileobj(p, f)
+
+        os.replace(temporary_path, file_path)
+        shutil.rmtree(parts_dir)
 
         return file_path
 
+    def __download_window(
+        self, packet: str, start_date: datetime, end_date: datetime, part: Path
+    ) -> None:
+        """Stream one time window to disk, retrying if the stream is interrupted."""
+
+        temporary_path: Path = part.with_name(part.name + ".tmp")
+
+        for attempt in range(self.__max_retries + 1):
+            # the session already retries failures to connect and server errors
+            response: requests.Response = self.__download_from_webpoda(
+                packet, "bin", start_date, end_date, "project(packet)"
+            )
+
+            try:
+                with response, open(temporary_path, "wb") as f:
+                    for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                        f.write(chunk)
+
+                os.replace(temporary_path, part)
+                return
+            except (
+                requests.exceptions.ChunkedEncodingError,
+                requests.exceptions.ConnectionError,
+            ) as e:
+                if attempt == self.__max_retries:
+                    raise
+
+                logging.warning(
+                    f"Download of {packet} from {start_date} to {end_date} was "
+                    f"interrupted (retry {attempt + 1} of {self.__max_retries}): {e}"
+                )
+                time.sleep(self.__retry_backoff * 2**attempt)
+
     def __download_from_webpoda(
         self,
         packet: str,
@@ -102,9 +199,11 @@ class WebPODA(IWebPODA):
         logging.debug(f"Downloading from: {url}")
 
         try:
-            response: requests.Response = requests.get(
+            response: requests.Response = self.__session.get(
                 url,
                 headers=headers,
+                stream=True,
+                timeout=REQUEST_TIMEOUT,
             )
             response.raise_for_status()
         except requests.exceptions.RequestException as e:
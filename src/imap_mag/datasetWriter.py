@@ -0,0 +1,189 @@
+"""Write processed datasets in the configured output format."""
+
+import logging
+import os
+from collections.abc import Iterable
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+from cdflib import xarray as cdfxarray
+
+FILE_EXTENSIONS = {
+    "csv": ".csv",
+    "parquet": ".parquet",
+    "cdf": ".cdf",
+    "netcdf": ".nc",
+}
+
+CDF_COMPRESSION_LEVEL = 6
+NETCDF_COMPRESSION_LEVEL = 4
+PARQUET_COMPRESSION = "zstd"
+
+
+def getOutputFile(file: Path, format: str) -> Path:
+    """Get the output file path for the given format."""
+    return file.with_suffix(FILE_EXTENSIONS[format])
+
+
+def writeDataset(dataset: xr.Dataset, file: Path, format: str) -> Path:
+    """Write dataset to file, replacing the file extension to match the format."""
+
+    outputFile = getOutputFile(file, format)
+    logging.debug(f"Writing {format} dataset to {outputFile}.")
+
+    match format:
+        case "csv":
+            dataset.to_dataframe().to_csv(outputFile)
+        case "parquet":
+            _writeParquet(dataset, outputFile)
+        case "cdf":
+            # cdflib refuses to overwrite an existing file
+            outputFile.unlink(missing_ok=True)
+
+            # epoch is already in nanoseconds since J2000, i.e., CDF TT2000
+            cdfxarray.xarray_to_cdf(
+                dataset,
+                str(outputFile),
+                istp=False,
+                compression=CDF_COMPRESSION_LEVEL,
+            )
+        case "netcdf":
+            dataset.to_netcdf(
+                outputFile,
+                encoding={
+                    name: {"zlib": True, "complevel": NETCDF_COMPRESSION_LEVEL}
+                    for name in dataset.data_vars
+                },
+            )
+        case _:
+            raise ValueError(f"Unsupported output format {format}.")
+
+    return outputFile
+
+
+def writeRecordBlocks(
+    blocks: Iterable[np.ndarray],
+    file: Path,
+    format: str,
+    columns: list[str],
+    count: int,
+) -> Path:
+    """Write blocks of epoch-sorted records to file incrementally.
+
+    CSV and Parquet are appended to block by block, so only one block is in memory at once. CDF and netCDF
+    cannot be appended to, so the blocks are gathered in a memory-mapped file first, and then written
+    whole. Their writers read every column into memory, so memory use grows with the size of the output
+    rather than of the blocks. Use CSV or Parquet to process files too large to fit in memory.
+    """
+
+    outputFile = getOutputFile(file, format)
+    logging.debug(f"Writing {count} records as {format} to {outputFile}.")
+
+    match format:
+        case "csv":
+            with open(outputFile, "w", newline="") as f:
+                for i, block in enumerate(blocks):
+                    _recordsToDataFrame(block, columns).to_csv(f, header=(i == 0))
+        case "parquet":
+            _writeParquetBlocks(blocks, outputFile, columns)
+        case "cdf" | "netcdf":
+            _writeGatheredBlocks(blocks, file, format, columns, count)
+        case _:
+            raise ValueError(f"Unsupported output format {format}.")
+
+    return outputFile
+
+
+def _recordsToDataFrame(records: np.ndarray, columns: list[str]) -> pd.DataFrame:
+    return pd.DataFrame(
+        {name: records[name] for name in columns},
+        index=pd.Index(records["epoch"], name="epoch"),
+    )
+
+
+def _writeParquetBlocks(
+    blocks: Iterable[np.ndarray], outputFile: Path, columns: list[str]
+) -> None:
+    (pa, pq) = _importPyArrow()
+    writer = None
+
+    try:
+        for block in blocks:
+            table = pa.table(
+                {name: pa.array(block[name]) for name in ["epoch", *columns]}
+            )
+
+            if writer is None:
+                writer = pq.ParquetWriter(
+                    outputFile, table.schema, compression=PARQUET_COMPRESSION
+                )
+
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def _writeGatheredBlocks(
+    blocks: Iterable[np.ndarray],
+    file: Path,
+    format: str,
+    columns: list[str],
+    count: int,
+) -> None:
+    gatheredFile = file.with_suffix(".gathered.npy")
+    gathered: np.memmap | None = None
+    dataset: xr.Dataset | None = None
+    position = 0
+
+    try:
+        for block in blocks:
+            if gathered is None:
+                gathered = np.lib.format.open_memmap(
+                    gatheredFile, mode="w+", dtype=block.dtype, shape=(count,)
+                )
+
+            gathered[position : position + len(block)] = block
+            position += len(block)
+
+        if gathered is None:
+            return
+
+        # the CDF and netCDF writers read the columns into memory, so memory is only bounded up to here
+        dataset = xr.Dataset(
+            {name: ("epoch", gathered[name]) for name in columns},
+            coords={"epoch": gathered["epoch"]},
+        )
+        writeDataset(dataset, file, format)
+    finally:
+        # release the memory map before removing its file
+        del dataset, gathered
+
+        if gatheredFile.exists():
+            os.remove(gatheredFile)
+
+
+def _importPyArrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError(
+            "Writing Parquet files requires pyarrow. Install it with `pip install imap-mag[parquet]`."
+        ) from e
+
+    return (pa, pq)
+
+
+def _writeParquet(dataset: xr.Dataset, outputFile: Path) -> None:
+    (pa, pq) = _importPyArrow()
+
+    # build Arrow columns straight from the dataset arrays, keeping their types
+    columns = {
+        name: pa.array(dataset[name].values)
+        for name in [*dataset.coords, *dataset.data_vars]
+    }
+
+    pq.write_table(pa.table(columns), outputFile, compression=PARQUET_COMPRESSION)
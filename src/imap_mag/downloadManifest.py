@@ -0,0 +1,129 @@
+"""Keep track of files already downloaded, so they are not downloaded again."""
+
+import abc
+import json
+import logging
+import threading
+from pathlib import Path
+
+from . import DB
+from .appUtils import getFileChecksum, readJsonFile, writeFileAtomically
+
+MANIFEST_FILE_NAME = "download_manifest.json"
+
+
+class IDownloadManifest(abc.ABC):
+    """Interface for download manifests."""
+
+    @abc.abstractmethod
+    def find(self, remotePath: str, version: str) -> Path | None:
+        """Get the local copy of a remote file, if it was downloaded before and is unchanged."""
+        pass
+
+    @abc.abstractmethod
+    def record(self, remotePath: str, version: str, localPath: Path) -> None:
+        """Record that a remote file was downloaded to a local path."""
+        pass
+
+
+class FileDownloadManifest(IDownloadManifest):
+    """Download manifest saved as a JSON file in the work folder.
+
+    Entries are keyed on the remote file path, and hold the version, size, modification time and checksum of
+    the local copy.
+    """
+
+    __file: Path
+    __entries: dict[str, dict]
+    __lock: threading.Lock
+
+    def __init__(self, folder: Path) -> None:
+        self.__file = folder / MANIFEST_FILE_NAME
+        self.__entries = readJsonFile(self.__file) or dict()
+        self.__lock = threading.Lock()
+
+    def find(self, remotePath: str, version: str) -> Path | None:
+        with self.__lock:
+            entry = self.__entries.get(remotePath)
+
+        if entry is None or entry["version"] != version:
+            return None
+
+        localPath = Path(entry["path"])
+
+        # entries recorded before modification times were kept have none
+        if not _isUnchanged(
+            localPath, entry["size"], entry.get("mtime"), entry["checksum"]
+        ):
+            logging.debug(f"Local copy of {remotePath} is missing or changed.")
+            return None
+
+        mtime = localPath.stat().st_mtime_ns
+
+        # files touched but not changed are only hashed once
+        if entry.get("mtime") != mtime:
+            with self.__lock:
+                entry["mtime"] = mtime
+                self.__save()
+
+        return localPath
+
+    def record(self, remotePath: str, version: str, localPath: Path) -> None:
+        stat = localPath.stat()
+        entry = {
+            "version": version,
+            "path": localPath.absolute().as_posix(),
+            "size": stat.st_size,
+            "mtime": stat.st_mtime_ns,
+            "checksum": getFileChecksum(localPath),
+        }
+
+        # files may be downloaded concurrently
+        with self.__lock:
+            self.__entries[remotePath] = entry
+            self.__save()
+
+    def __save(self) -> None:
+        writeFileAtomically(self.__file, json.dumps(self.__entries, indent=2))
+
+
+class DatabaseDownloadManifest(IDownloadManifest):
+    """Download manifest backed by the files table of the database."""
+
+    __db: DB.DB
+
+    def __init__(self, db: DB.DB) -> None:
+        self.__db = db
+
+    def find(self, remotePath: str, version: str) -> Path | None:
+        # file names include the version, so matching on name matches the version too
+        for file in self.__db.get_files(name=Path(remotePath).name):
+            localPath = Path(file.path)
+
+            # files registered before the catalogue was added have no size, modification time or checksum
+            if _isUnchanged(localPath, file.size, file.mtime, file.checksum):
+                return localPath
+
+        return None
+
+    def record(self, remotePath: str, version: str, localPath: Path) -> None:
+        # downloaded files are added to the database once all downloads complete
+        pass
+
+
+def _isUnchanged(
+    localPath: Path, size: int | None, mtime: int | None, checksum: str | None
+) -> bool:
+    try:
+        stat = localPath.stat()
+    except FileNotFoundError:
+        return False
+
+    if size is not None and stat.st_size != size:
+        return False
+
+    # only hash files whose modification time changed, as hashing costs about as much as downloading
+    if mtime is not None and stat.st_mtime_ns == mtime:
+        return True
+
+    return checksum is None or getFileChecksum(localPath) == checksum
@@ -0,0 +1,142 @@
+"""Out-of-core sorting of structured arrays, by spilling sorted runs to disk."""
+
+import logging
+import os
+from collections.abc import Iterator
+from pathlib import Path
+
+import numpy as np
+
+INDEX_FIELD = "_index"
+MIN_RUN_BLOCK_SIZE = 1024
+
+# kinds of numpy data types that promote to each other, i.e., booleans and numbers
+NUMERIC_KINDS = "biufc"
+
+
+class ExternalSorter:
+    """Sort records larger than memory by a key field.
+
+    Every run added is sorted and saved to disk. Runs are then merged back lazily from memory-mapped files, in
+    blocks of bounded size. Ties on the key keep the order in which records were added, as in a stable sort.
+    """
+
+    __folder: Path
+    __key: str
+    __runs: list[Path]
+    __count: int
+
+    def __init__(self, folder: Path, key: str = "epoch") -> None:
+        self.__folder = folder
+        self.__key = key
+        self.__runs = []
+        self.__count = 0
+
+        os.makedirs(self.__folder, exist_ok=True)
+
+    @property
+    def count(self) -> int:
+        return self.__count
+
+    def addRun(self, records: np.ndarray) -> None:
+        """Sort records and spill them to disk as a new run."""
+
+        if len(records) == 0:
+            return
+
+        # the running index makes every sort key unique, so the merge is stable
+        indexed = np.empty(
+            len(records), dtype=[(INDEX_FIELD, np.int64), *records.dtype.descr]
+        )
+        indexed[INDEX_FIELD] = np.arange(self.__count, self.__count + len(records))
+
+        for name in records.dtype.names:
+            indexed[name] = records[name]
+
+        indexed = indexed[np.lexsort((indexed[INDEX_FIELD], indexed[self.__key]))]
+
+        runFile = self.__folder / f"run_{len(self.__runs):06d}.npy"
+        np.save(runFile, indexed, allow_pickle=False)
+
+        logging.debug(f"Saved sorted run of {len(records)} records to {runFile}.")
+
+        self.__runs.append(runFile)
+        self.__count += len(records)
+
+    def merge(self, blockSize: int) -> Iterator[np.ndarray]:
+        """Merge all runs into blocks of records sorted by key."""
+
+        runs = [np.load(run, mmap_mode="r") for run in self.__runs]
+
+        if not runs:
+            return
+
+        dtype = self.__getCommonDtype(runs)
+        positions = [0] * len(runs)
+
+        # share the block size between runs, so memory use does not grow with the number of runs,
+        # but read enough of each run at a time for the merge to stay efficient
+        runBlockSize = max(MIN_RUN_BLOCK_SIZE, blockSize // len(runs))
+
+        while any(position < len(run) for position, run in zip(positions, runs)):
+            blocks = [
+                np.asarray(run[position : position + runBlockSize]).astype(dtype)
+                for position, run in zip(positions, runs)
+            ]
+
+            # only records up to the smallest last key of any partially read run are safe to emit
+            bounds = [
+                (block[self.__key][-1], block[INDEX_FIELD][-1])
+                for block, position, run in zip(blocks, positions, runs)
+                if position + len(block) < len(run)
+            ]
+
+            taken = []
+
+            for i, block in enumerate(blocks):
+                if bounds:
+                    (key, index) = min(bounds)
+                    count = np.count_nonzero(
+                        (block[self.__key] < key)
+                        | ((block[self.__key] == key) & (block[INDEX_FIELD] <= index))
+                    )
+                else:
+                    count = len(block)
+
+                taken.append(block[:count])
+                positions[i] += count
+
+            merged = np.concatenate(taken)
+            merged = merged[np.lexsort((merged[INDEX_FIELD], merged[self.__key]))]
+
+            yield merged
+
+    def __getCommonDtype(self, runs: list[np.ndarray]) -> np.dtype:
+        names = runs[0].dtype.names
+
+        for runFile, run in zip(self.__runs, runs):
+            if set(run.dtype.names) != set(names):
+                raise ValueError(
+                    f"Run {runFile} has fields {', '.join(run.dtype.names)}, "
+                    f"but the first run has {', '.join(names)}."
+                )
+
+        fields = []
+
+        for name in names:
+            types = [run.dtype[name] for run in runs]
+            error = (
+                f"Field {name} has incompatible types across runs: "
+                f"{', '.join(sorted({str(type) for type in types}))}."
+            )
+
+            # numbers would otherwise be promoted to strings
+            if len({type.kind in NUMERIC_KINDS for type in types}) > 1:
+                raise ValueError(error)
+
+            try:
+                fields.append((name, np.result_type(*types)))
+            except TypeError as e:
+                raise ValueError(error) from e
+
+        return np.dtype(fields)
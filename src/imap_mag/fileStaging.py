@@ -0,0 +1,151 @@
+"""Stage input files into the work folder, avoiding copies where possible."""
+
+import errno
+import logging
+import os
+import shutil
+from pathlib import Path
+
+# Linux ioctl to clone a file with copy-on-write, on filesystems such as Btrfs and XFS
+FICLONE = 0x40049409
+
+REMOTE_FILE_SYSTEMS = {
+    "9p",
+    "afs",
+    "cifs",
+    "davfs",
+    "fuse.rclone",
+    "fuse.s3fs",
+    "fuse.sshfs",
+    "nfs",
+    "nfs4",
+    "smb3",
+    "smbfs",
+}
+
+
+def isRemoteFileSystem(path: Path) -> bool:
+    """Check whether a path is on a network mount, as far as the mount table tells."""
+
+    absolutePath = path.absolute().as_posix()
+
+    # UNC paths, e.g., \\RDS.IMPERIAL.AC.UK\rds\project
+    if absolutePath.startswith("//") or str(path).startswith("\\\\"):
+        return True
+
+    try:
+        with open("/proc/mounts") as f:
+            mounts = [line.split()[1:3] for line in f]
+    except OSError:
+        return False
+
+    # the longest mount point containing the path is the one it is on
+    fileSystem = max(
+        (
+            (mountPoint, fileSystem)
+            for mountPoint, fileSystem in mounts
+            if absolutePath == mountPoint
+            or absolutePath.startswith(mountPoint.rstrip("/") + "/")
+        ),
+        key=lambda mount: len(mount[0]),
+        default=(None, None),
+    )[1]
+
+    return fileSystem in REMOTE_FILE_SYSTEMS
+
+
+def stageFile(source: Path, workFolder: Path, strategy: str = "auto") -> Path:
+    """Make a file available in the work folder, using the given strategy.
+
+    "auto" copies files on network mounts, and otherwise tries a copy-on-write clone and a symbolic link
+    in turn. Hard links are never used by default, as writing to the work file would change the source. "in-place" uses the source file directly. A file already staged and unchanged
+    since is not staged again.
+    """
+
+    if strategy == "in-place":
+        logging.debug(f"Using {source} in place.")
+        return source
+
+    workFile = workFolder / source.name
+
+    if _isStaged(source, workFile):
+        logging.debug(f"{workFile} is already staged and unchanged.")
+        return workFile
+
+    if workFile.is_symlink() or workFile.exists():
+        workFile.unlink()
+
+    if strategy == "auto":
+        strategies = ["copy"] if isRemoteFileSystem(source) else ["reflink", "symlink"]
+    else:
+        strategies = [strategy]
+
+    for attempt in strategies:
+        if attempt == "copy":
+            continue
+
+        try:
+            _stage(source, workFile, attempt)
+        except OSError as e:
+            logging.debug(f"Cannot {attempt} {source} to {workFile}: {e}")
+            continue
+
+        logging.debug(f"Staged {source} to {workFile} with {attempt}.")
+        return workFile
+
+    logging.debug(f"Copying {source} to {workFile}.")
+    _stage(source, workFile, "copy")
+
+    return workFile
+
+
+def _isStaged(source: Path, workFile: Path) -> bool:
+    if not workFile.exists():
+        return False
+
+    if workFile.is_symlink():
+        return workFile.resolve() == source.resolve()
+
+    if os.path.samefile(source, workFile):
+        return True
+
+    # copies keep the size and modification time of their source
+    sourceStat = source.stat()
+    workStat = workFile.stat()
+
+    return (sourceStat.st_size, sourceStat.st_mtime_ns) == (
+        workStat.st_size,
+        workStat.st_mtime_ns,
+    )
+
+
+def _stage(source: Path, workFile: Path, strategy: str) -> None:
+    match strategy:
+        case "copy":
+            shutil.copy2(source, workFile)
+        case "hardlink":
+            os.link(source, workFile)
+        case "symlink":
+            os.symlink(source.absolute(), workFile)
+        case "reflink":
+            _reflink(source, workFile)
+        case _:
+            raise ValueError(f"Unknown staging strategy {strategy}.")
+
+
+def _reflink(source: Path, workFile: Path) -> None:
+    try:
+        import fcntl
+    except ImportError as e:
+        raise OSError(
+            errno.EOPNOTSUPP, "Reflink is not supported on this platform."
+        ) from e
+
+    try:
+        with open(source, "rb") as src, open(workFile, "wb") as dst:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+
+        shutil.copystat(source, workFile)
+    except OSError:
+        workFile.unlink(missing_ok=True)
+        raise
@@ -0,0 +1,142 @@
+"""Cached index of the files in a source folder, to avoid listing slow network shares."""
+
+import bisect
+import fnmatch
+import hashlib
+import json
+import logging
+import os
+import re
+from pathlib import Path
+
+from . import appUtils
+
+INDEX_FOLDER_NAME = "folder_index"
+WILDCARDS = re.compile(r"[*?\[]")
+
+
+class FolderIndex:
+    """Index of file names, sizes and modification times in a folder, saved in the work folder.
+
+    The folder is only listed again when its own modification time changes, i.e., when files are added,
+    removed or renamed, and then only new files are inspected. Files modified in place do not change the
+    folder, so the files matched are inspected again when found.
+    """
+
+    __folder: Path
+    __indexFile: Path
+    __folderMTime: int | None
+    __files: dict[str, tuple[int, int]]
+    __names: list[str]
+
+    def __init__(self, folder: Path, workFolder: Path) -> None:
+        self.__folder = folder
+        self.__folderMTime = None
+        self.__files = dict()
+        self.__names = []
+
+        key = hashlib.sha256(folder.absolute().as_posix().encode()).hexdigest()[:16]
+        self.__indexFile = workFolder / INDEX_FOLDER_NAME / f"{key}.json"
+
+        self.__load()
+
+    def refresh(self) -> None:
+        """Bring the index up to date with the folder."""
+
+        # read the folder time before listing, so changes made while listing are picked up next time
+        folderMTime = self.__folder.stat().st_mtime_ns
+
+        if folderMTime == self.__folderMTime:
+            logging.debug(f"Index of {self.__folder} is up to date.")
+            return
+
+        files: dict[str, tuple[int, int]] = dict()
+        added = 0
+
+        with os.scandir(self.__folder) as entries:
+            for entry in entries:
+                if entry.name in self.__files:
+                    files[entry.name] = self.__files[entry.name]
+                elif entry.is_file():
+                    stat = entry.stat()
+                    files[entry.name] = (stat.st_size, stat.st_mtime_ns)
+                    added += 1
+
+        logging.debug(
+            f"Indexed {added} new files in {self.__folder}, "
+            f"{len(self.__files) + added - len(files)} removed."
+        )
+
+        self.__folderMTime = folderMTime
+        self.__files = files
+        self.__names = sorted(files, key=os.path.normcase)
+
+        self.__save()
+
+    def find(self, pattern: str) -> list[Path]:
+        """Find files with names matching a glob pattern, most recently modified first."""
+
+        self.refresh()
+
+        # only names starting with the literal prefix of the pattern can match it, ignoring case
+        # where the file system does, as Path.match does
+        prefix = os.path.normcase(WILDCARDS.split(pattern, maxsplit=1)[0])
+        start = bisect.bisect_left(self.__names, prefix, key=os.path.normcase)
+        matches: list[str] = []
+
+        for i in range(start, len(self.__names)):
+            name = self.__names[i]
+
+            if not os.path.normcase(name).startswith(prefix):
+                break
+
+            if fnmatch.fnmatch(name, pattern):
+                matches.append(name)
+
+        matches = self.__restat(matches)
+        matches.sort(key=lambda name: self.__files[name][1], reverse=True)
+
+        return [self.__folder / name for name in matches]
+
+    def __restat(self, names: list[str]) -> list[str]:
+        # update the sizes and modification times of files modified in place, and drop removed files
+        found: list[str] = []
+        changed = False
+
+        for name in names:
+            try:
+                stat = (self.__folder / name).stat()
+            except FileNotFoundError:
+                del self.__files[name]
+                changed = True
+                continue
+
+            entry = (stat.st_size, stat.st_mtime_ns)
+
+            if self.__files[name] != entry:
+                self.__files[name] = entry
+                changed = True
+
+            found.append(name)
+
+        if changed:
+            self.__names = sorted(self.__files, key=os.path.normcase)
+            self.__save()
+
+        return found
+
+    def __load(self) -> None:
+        index = appUtils.readJsonFile(self.__indexFile)
+
+        if index is None:
+            return
+
+        self.__folderMTime = index["folder_mtime"]
+        self.__files = {name: tuple(entry) for name, entry in index["files"].items()}
+        self.__names = sorted(self.__files, key=os.path.normcase)
+
+    def __save(self) -> None:
+        appUtils.writeFileAtomically(
+            self.__indexFile,
+            json.dumps({"folder_mtime": self.__folderMTime, "files": self.__files}),
+        )
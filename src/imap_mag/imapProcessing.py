@@ -1,14 +1,29 @@
 import abc
 import collections
+import io
 import logging
 import os
 import re
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import BinaryIO
 
+import numpy as np
 import xarray as xr
 from space_packet_parser import parser, xtcedef
 
-from . import appConfig, appUtils
+from . import (
+    appConfig,
+    appUtils,
+    datasetWriter,
+    externalSort,
+    packetDecoder,
+    xtceCache,
+)
+
+# processors write outputs to a folder per input file here, in the work folder
+OUTPUT_FOLDER_NAME = "process"
 
 
 class FileProcessor(abc.ABC):
@@ -19,7 +34,7 @@ class FileProcessor(abc.ABC):
         pass
 
     @abc.abstractmethod
-    def process(self, file: Path) -> Path:
+    def process(self, file: Path) -> list[Path]:
         pass
 
 
@@ -27,14 +42,25 @@ class ScienceProcessor(FileProcessor):
     def initialize(self, config: appConfig.AppConfig) -> None:
         pass
 
-    def process(self, file: Path) -> Path:
-        return file
+    def process(self, file: Path) -> list[Path]:
+        return [file]
 
 
 class HKProcessor(FileProcessor):
     xtcePacketDefinition: Path
+    cacheFolder: Path | None = None
+    workFolder: Path = Path(".work")
+    decoding: str = "columnar"
+    format: str = "csv"
+    chunkSize: int | None = None
 
     def initialize(self, config: appConfig.AppConfig) -> None:
+        self.cacheFolder = config.work_folder
+        self.workFolder = config.work_folder
+        self.decoding = config.processing.hk_decoding
+        self.format = config.destination.format
+        self.chunkSize = config.processing.hk_chunk_size
+
         # first try the file path as is, then in the same directory as the module, then fallback to a default
         pythonModuleRelativePath = Path(
             os.path.join(os.path.dirname(__file__), config.packet_definition.hk)
@@ -75,63 +101,195 @@ class HKProcessor(FileProcessor):
                 f"XTCE packet definition file not found: {config.packet_definition.hk}"
             )
 
-    def process(self, file: Path) -> Path:
-        """Process HK with XTCE tools and create CSV file."""
+    def process(self, file: Path) -> list[Path]:
+        """Process HK with XTCE tools and create one file per ApID, in the work folder."""
 
         # Extract data from binary file.
-        dataDict: dict[int, dict] = dict()
-
-        packetDefinition = xtcedef.XtcePacketDefinition(self.xtcePacketDefinition)
-        packetParser = parser.PacketParser(packetDefinition)
-
-        with open(file, "rb") as binaryData:
-            packetGenerator = packetParser.generator(binaryData)
+        packetDefinition = xtceCache.loadPacketDefinition(
+            self.xtcePacketDefinition, self.cacheFolder
+        )
 
-            for packet in packetGenerator:
-                apid = packet.header["PKT_APID"].raw_value
-                dataDict.setdefault(apid, collections.defaultdict(list))
+        # never write next to the input, as it may be used in place from the source folder
+        outputFolder = self.workFolder / OUTPUT_FOLDER_NAME / file.stem
+        outputFolder.mkdir(parents=True, exist_ok=True)
 
-                packetContent = packet.data | packet.header
+        if self.chunkSize is not None:
+            return self.__processInChunks(file, outputFolder, packetDefinition)
 
-                for key, value in packetContent.items():
-                    dataDict[apid][key].append(value.derived_value or value.raw_value)
+        with open(file, "rb") as binaryData:
+            dataDict = self.__decode(binaryData, packetDefinition)
 
         # Convert data to xarray datasets.
         datasetDict = {}
 
         for apid, data in dataDict.items():
-            time_key = next(iter(data.keys()))
-            time_data = appUtils.convertMETToJ2000ns(data[time_key])
-
-            ds = xr.Dataset(
-                {
-                    re.sub(r"^mag_hsk_[a-zA-Z]+_", "", key.lower()): ("epoch", val)
-                    for key, val in data.items()
-                },
-                coords={"epoch": time_data},
+            datasetDict[apid] = self.__createDataset(data).sortby("epoch")
+
+        # No data found.
+        if not datasetDict:
+            return [file]
+
+        # Write output files, one per ApID.
+        with ThreadPoolExecutor(
+            max_workers=min(len(datasetDict), os.cpu_count() or 1)
+        ) as executor:
+            return list(
+                executor.map(
+                    lambda item: self.__writeDataset(outputFolder, *item),
+                    datasetDict.items(),
+                )
             )
-            ds = ds.sortby("epoch")
 
-            datasetDict[apid] = ds
+    def __processInChunks(
+        self,
+        file: Path,
+        outputFolder: Path,
+        packetDefinition: xtcedef.XtcePacketDefinition,
+    ) -> list[Path]:
+        """Decode a chunk of packets at a time, and merge the chunks sorted by epoch at the end."""
+
+        sorters: dict[int, externalSort.ExternalSorter] = dict()
+        columns: dict[int, list[str]] = dict()
+        layouts: dict[tuple[int, int], packetDecoder.PacketLayout | None] = dict()
+
+        with (
+            tempfile.TemporaryDirectory(dir=outputFolder) as runFolder,
+            open(file, "rb") as binaryData,
+        ):
+            for chunk in packetDecoder.readPacketChunks(binaryData, self.chunkSize):
+                dataDict = self.__decode(io.BytesIO(chunk), packetDefinition, layouts)
+
+                for apid, data in dataDict.items():
+                    dataset = self.__createDataset(data)
+
+                    if apid not in sorters:
+                        sorters[apid] = externalSort.ExternalSorter(
+                            Path(runFolder, str(apid))
+                        )
+                        columns[apid] = list(dataset.data_vars)
+
+                    sorters[apid].addRun(self.__createRecords(dataset))
+
+            # No data found.
+            if not sorters:
+                return [file]
+
+            # Write output files, one per ApID.
+            with ThreadPoolExecutor(
+                max_workers=min(len(sorters), os.cpu_count() or 1)
+            ) as executor:
+                return list(
+                    executor.map(
+                        lambda apid: self.__writeSortedRecords(
+                            outputFolder, apid, sorters[apid], columns[apid]
+                        ),
+                        sorters.keys(),
+                    )
+                )
+
+    def __createDataset(self, data: dict) -> xr.Dataset:
+        time_key = next(iter(data.keys()))
+        time_data = appUtils.convertMETToJ2000ns(data[time_key])
+
+        return xr.Dataset(
+            {
+                re.sub(r"^mag_hsk_[a-zA-Z]+_", "", key.lower()): ("epoch", val)
+                for key, val in data.items()
+            },
+            coords={"epoch": time_data},
+        )
+
+    def __createRecords(self, dataset: xr.Dataset) -> np.ndarray:
+        names = ["epoch", *dataset.data_vars]
+        records = np.empty(
+            dataset.sizes["epoch"],
+            dtype=[(name, dataset[name].dtype) for name in names],
+        )
 
-        # Write CSV files.
-        for apid, dataset in datasetDict.items():
-            csvFile = file.with_suffix(".csv")
-            dataset.to_dataframe().to_csv(csvFile)
+        for name in names:
+            records[name] = dataset[name].values
+
+        return records
+
+    def __writeDataset(
+        self, outputFolder: Path, apid: int, dataset: xr.Dataset
+    ) -> Path:
+        packet = appUtils.APID_TO_PACKET.get(apid, f"APID_{apid}")
+        logging.debug(f"Writing {len(dataset.epoch)} {packet} packets.")
+
+        return datasetWriter.writeDataset(dataset, outputFolder / packet, self.format)
+
+    def __writeSortedRecords(
+        self,
+        outputFolder: Path,
+        apid: int,
+        sorter: externalSort.ExternalSorter,
+        columns: list[str],
+    ) -> Path:
+        packet = appUtils.APID_TO_PACKET.get(apid, f"APID_{apid}")
+        logging.debug(f"Merging and writing {sorter.count} {packet} packets.")
+
+        return datasetWriter.writeRecordBlocks(
+            sorter.merge(self.chunkSize),
+            outputFolder / packet,
+            self.format,
+            columns,
+            sorter.count,
+        )
 
-            # TODO: What about the other ApIDs?
-            return csvFile
+    def __decode(
+        self,
+        binaryData: BinaryIO,
+        packetDefinition: xtcedef.XtcePacketDefinition,
+        layouts: dict | None = None,
+    ) -> dict[int, dict]:
+        if self.decoding == "packet":
+            return self.__decodePacketByPacket(binaryData, packetDefinition)
+        else:
+            return self.__decodeColumnar(binaryData, packetDefinition, layouts)
 
-        # No data found.
-        return file
+    def __decodePacketByPacket(
+        self, binaryData: BinaryIO, packetDefinition: xtcedef.XtcePacketDefinition
+    ) -> dict[int, dict]:
+        dataDict: dict[int, dict] = dict()
+        packetParser = parser.PacketParser(packetDefinition)
+
+        packetGenerator = packetParser.generator(binaryData)
+
+        for packet in packetGenerator:
+            apid = packet.header["PKT_APID"].raw_value
+            dataDict.setdefault(apid, collections.defaultdict(list))
+
+            packetContent = packet.data | packet.header
+
+            for key, value in packetContent.items():
+                dataDict[apid][key].append(value.derived_value or value.raw_value)
+
+        return dataDict
+
+    def __decodeColumnar(
+        self,
+        binaryData: BinaryIO,
+        packetDefinition: xtcedef.XtcePacketDefinition,
+        layouts: dict | None = None,
+    ) -> dict[int, dict]:
+        decoded = packetDecoder.decodePackets(
+            binaryData.read(), packetDefinition, layouts
+        )
+
+        # columns are views on the structured arrays, so no data is copied
+        return {
+            apid: {name: records[name] for name in records.dtype.names}
+            for apid, records in decoded.items()
+        }
 
 
 class UnknownProcessor(FileProcessor):
     def initialize(self, config: appConfig.AppConfig) -> None:
         pass
 
-    def process(self, file: Path) -> Path:
-        return file
+    def process(self, file: Path) -> list[Path]:
+        return [file]
 
 
 def dispatchFile(file: Path) -> FileProcessor:
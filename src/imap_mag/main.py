@@ -1,9 +1,10 @@
 """Main module."""
 
 import logging
+import multiprocessing
 import os
-import shutil
-from datetime import datetime
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
 from enum import Enum
 from pathlib import Path
 from typing import Annotated
@@ -13,26 +14,17 @@ import typer
 
 # config
 import yaml
-from imap_db.model import File
-from mag_toolkit import CDFLoader
-from mag_toolkit.calibration.CalibrationApplicator import CalibrationApplicator
-from mag_toolkit.calibration.calibrationFormatProcessor import (
-    CalibrationFormatProcessor,
-)
-from mag_toolkit.calibration.Calibrator import (
-    Calibrator,
-    CalibratorType,
-    SpinAxisCalibrator,
-    SpinPlaneCalibrator,
-)
-
-from . import DB, appConfig, appLogging, appUtils, imapProcessing
-from .cli.fetchScience import FetchScience
-from .client.sdcDataAccess import SDCDataAccess
-from .client.webPODA import WebPODA
+from mag_toolkit.calibration.Calibrator import CalibratorType
+
+# heavy dependencies, e.g., pandas, sqlalchemy and cdflib, are imported by the commands that use them,
+# so that the CLI starts quickly
+from . import appConfig, appLogging, appUtils, fileStaging
+from .folderIndex import FolderIndex
+from .scheduler import PipelineScheduler
+from .watermarks import Watermarks
 
 app = typer.Typer()
-globalState = {"verbose": False}
+globalState = {"verbose": False, "scheduled": False}
 
 
 def commandInit(config: Path) -> appConfig.AppConfig:
@@ -64,13 +56,23 @@ def commandInit(config: Path) -> appConfig.AppConfig:
         logging.debug(f"Creating work folder {configFile.work_folder}")
         os.makedirs(configFile.work_folder)
 
+    initLogging(configFile.work_folder)
+
+    return configFile
+
+
+def initLogging(workFolder: Path) -> None:
+    # scheduled commands log to the log file of the scheduler, rather than each opening their own
+    if globalState["scheduled"]:
+        return
+
     # initialise all logging into the workfile
     level = "debug" if globalState["verbose"] else "info"
 
     # TODO: the log file loation should be configurable so we can keep the logs on RDS
     # Or maybe just ship them there after the fact? Or log to both?
     logFile = Path(
-        configFile.work_folder,
+        workFolder,
         f"{datetime.now().strftime('%Y_%m_%d-%I_%M_%S_%p')}.log",
     )
     if not appLogging.set_up_logging(
@@ -86,21 +88,61 @@ def commandInit(config: Path) -> appConfig.AppConfig:
         print("Failed to set up logging, aborting.")
         raise typer.Abort()
 
-    return configFile
-
 
 @app.command()
 def hello(name: str):
     print(f"Hello {name}")
 
 
-def prepareWorkFile(file, configFile) -> Path | None:
+def findInCatalogue(file: str) -> Path | None:
+    """Find the latest version of a science file in the database catalogue, from its name or pattern."""
+
+    from . import DB
+
+    details = appUtils.parseScienceFileName(file)
+
+    if details is None:
+        return None
+
+    record = DB.DB().get_latest_file(**details)
+
+    if record is None or not Path(record.path).exists():
+        logging.debug(f"No file matching {file} found in catalogue.")
+        return None
+
+    logging.info(f"Found {record.path} in catalogue.")
+    return Path(record.path)
+
+
+def findSourceFiles(file: str, configFile: appConfig.AppConfig) -> list[Path]:
+    """Find files matching a name or pattern in the source folder, most recent first."""
+
     logging.debug(f"Grabbing file matching {file} in {configFile.source.folder}")
 
     # get all files in \\RDS.IMPERIAL.AC.UK\rds\project\solarorbitermagnetometer\live\SO-MAG-Web\quicklooks_py\
     files = []
     folder = configFile.source.folder
 
+    if not folder.exists():
+        logging.warning(f"Folder {folder} does not exist")
+        return []
+
+    if configFile.source.catalogue:
+        cataloguedFile: Path | None = findInCatalogue(file)
+
+        if cataloguedFile is not None:
+            files.append(cataloguedFile)
+
+    # look up matching files in the folder index, unless the catalogue found one
+    if not files:
+        files = FolderIndex(folder, configFile.work_folder).find(file)
+
+    return files
+
+
+def prepareWorkFile(file, configFile) -> Path | None:
+    folder = configFile.source.folder
+
     if not folder.exists():
         logging.warning(f"Folder {folder} does not exist")
         return None
@@ -111,14 +153,7 @@ def prepareWorkFile(file, configFile) -> Path | None:
         logging.info(f"Pattern contains a %, replacing '{file} with {updatedFile}")
         file = updatedFile
 
-    # list all files in the share
-    for matchedFile in folder.iterdir():
-        if matchedFile.is_file():
-            if matchedFile.match(file):
-                files.append(matchedFile)
-
-    # get the most recently modified matching file
-    files.sort(key=lambda f: f.stat().st_mtime, reverse=True)
+    files = findSourceFiles(file, configFile)
 
     if len(files) == 0:
         logging.critical(f"No files matching {file} found in {folder}")
@@ -129,29 +164,52 @@ def prepareWorkFile(file, configFile) -> Path | None:
         f"{files[0].absolute().as_posix()}"
     )
 
-    # copy the file to configFile.work_folder
-    workFile = Path(configFile.work_folder, files[0].name)
-    logging.debug(f"Copying {files[0]} to {workFile}")
-    workFile = Path(shutil.copy2(files[0], configFile.work_folder))
-
-    return workFile
+    # make the file available in configFile.work_folder, avoiding a copy where possible
+    return fileStaging.stageFile(
+        files[0], configFile.work_folder, configFile.source.staging
+    )
 
 
 # E.g  imap-mag process --config config.yaml solo_L2_mag-rtn-ll-internal_20240210_V00.cdf
+# or   imap-mag process --config config.yaml --batch --start-date 2025-05-01 --end-date 2025-05-31 "MAG_HSK_PW_%Y%m%d*.pkts"
 @app.command()
 def process(
     config: Annotated[Path, typer.Option()] = Path("config.yaml"),
     file: str = typer.Argument(
         help="The file name or pattern to match for the input file"
     ),
+    batch: Annotated[
+        bool,
+        typer.Option(
+            help="Process every matching file, rather than only the most recent one"
+        ),
+    ] = False,
+    start_date: Annotated[
+        str | None,
+        typer.Option(help="In batch mode, first date to fill into a % pattern"),
+    ] = None,
+    end_date: Annotated[
+        str | None,
+        typer.Option(help="In batch mode, last date to fill into a % pattern"),
+    ] = None,
+    workers: Annotated[
+        int | None,
+        typer.Option(help="In batch mode, number of processes (default: all cores)"),
+    ] = None,
 ):
     """Sample processing job."""
+    from . import imapProcessing
+
     # TODO: semantic logging
     # TODO: handle file system/cloud files - abstraction layer needed for files
     # TODO: move shared logic to a library
 
     configFile: appConfig.AppConfig = commandInit(config)
 
+    if batch:
+        processBatch(file, configFile, start_date, end_date, workers)
+        return
+
     workFile = prepareWorkFile(file, configFile)
 
     if workFile is None:
@@ -162,12 +220,89 @@ def process(
 
     fileProcessor = imapProcessing.dispatchFile(workFile)
     fileProcessor.initialize(configFile)
-    result = fileProcessor.process(workFile)
+    results = fileProcessor.process(workFile)
+    destination = configFile.destination
+
+    # outputs are written in the configured format, so keep their extension rather than the configured one
+    if len(results) == 1 and destination.filename:
+        destination = destination.model_copy(
+            update={
+                "filename": Path(destination.filename)
+                .with_suffix(results[0].suffix)
+                .name
+            }
+        )
 
-    appUtils.copyFileToDestination(result, configFile.destination)
+    appUtils.copyFilesToDestination(results, destination)
+
+
+def processBatch(
+    file: str,
+    configFile: appConfig.AppConfig,
+    start_date: str | None,
+    end_date: str | None,
+    workers: int | None,
+) -> None:
+    from . import batchProcessing
+
+    files: list[Path] = findBatchFiles(file, configFile, start_date, end_date)
+
+    summary = batchProcessing.processFiles(files, configFile, workers)
+    summaryFile = summary.write(
+        Path(configFile.destination.folder) / batchProcessing.SUMMARY_FILE_NAME
+    )
+
+    logging.info(
+        f"Processed {len(summary.outputs)} files, {len(summary.failures)} failed. "
+        f"Summary written to {summaryFile}."
+    )
+
+    if summary.failures:
+        raise typer.Abort()
+
+
+def findBatchFiles(
+    file: str,
+    configFile: appConfig.AppConfig,
+    start_date: str | None,
+    end_date: str | None,
+) -> list[Path]:
+    """Find all source files matching a glob pattern, with each date of the range filled into % codes."""
+
+    import pandas as pd
 
+    patterns: list[str] = [file]
 
-# E.g., imap-mag fetch-binary --apid 1063 --start-date 2025-05-02 --end-date 2025-05-03
+    # fill each date of the range into the pattern
+    if "%" in file:
+        today = datetime.now().strftime("%Y-%m-%d")
+        dates = pd.date_range(
+            start=appUtils.convertToDatetime(start_date or today),
+            end=appUtils.convertToDatetime(end_date or start_date or today),
+            freq="D",
+            normalize=True,
+        )
+        patterns = list(dict.fromkeys(date.strftime(file) for date in dates))
+
+    files: list[Path] = list(
+        dict.fromkeys(
+            match
+            for pattern in patterns
+            for match in findSourceFiles(pattern, configFile)
+        )
+    )
+
+    if len(files) == 0:
+        logging.critical(
+            f"No files matching {file} found in {configFile.source.folder}"
+        )
+        raise typer.Abort()
+
+    return files
+
+
+# E.g., imap-mag fetch-binary --apid 1063 --apid 1064 --start-date 2025-05-02 --end-date 2025-05-03
+# or imap-mag fetch-binary --apid all --start-date 2025-05-02 --end-date 2025-05-03
 @app.command()
 def fetch_binary(
     auth_code: Annotated[
@@ -177,32 +312,110 @@ def fetch_binary(
             help="WebPODA authentication code",
         ),
     ],
-    apid: Annotated[int, typer.Option(help="ApID to download")],
+    apid: Annotated[
+        list[str],
+        typer.Option(help="ApID to download, repeat for several, or 'all'"),
+    ],
     start_date: Annotated[str, typer.Option(help="Start date for the download")],
     end_date: Annotated[str, typer.Option(help="End date for the download")],
     config: Annotated[Path, typer.Option()] = Path("config.yaml"),
+    incremental: Annotated[
+        bool,
+        typer.Option(help="Only download data newer than downloaded before"),
+    ] = False,
 ):
+    from .client.webPODA import WebPODA
+
     configFile: appConfig.AppConfig = commandInit(config)
 
     if not auth_code:
         logging.critical("No WebPODA authorization code provided")
         raise typer.Abort()
 
-    packet: str = appUtils.getPacketFromApID(apid)
-    logging.info(f"Downloading raw packet {packet} from {start_date} to {end_date}.")
+    packets: dict[int, str] = appUtils.getPacketsFromApIDs(apid)
+    logging.info(
+        f"Downloading raw packets {', '.join(packets.values())} "
+        f"from {start_date} to {end_date}."
+    )
+
+    api: appConfig.API = configFile.api or appConfig.API()
+
+    start: datetime = appUtils.convertToDatetime(start_date)
+    end: datetime = appUtils.convertToDatetime(end_date)
+    starts: dict[str, datetime] = {packet: start for packet in packets.values()}
+
+    watermarks = Watermarks(configFile.work_folder) if incremental else None
+
+    if watermarks:
+        starts = {
+            packet: watermarks.getStart(
+                f"binary/{packet}",
+                start,
+                timedelta(seconds=api.incremental_overlap),
+            )
+            for packet in packets.values()
+        }
+
+        for packet in list(starts):
+            watermark = watermarks.get(f"binary/{packet}")
+
+            if watermark is not None and watermark >= end:
+                logging.info(f"{packet} is up to date to {end_date}.")
+                del starts[packet]
+
+        # data cannot be ingested beyond now, however far the download reaches
+        ingestedUntil = min(end, datetime.now())
 
     poda = WebPODA(
         auth_code,
         configFile.work_folder,
-        configFile.api.webpoda_url if configFile.api else None,
+        api.webpoda_url,
+        pool_size=api.pool_size,
+        max_retries=api.max_retries,
+        retry_backoff=api.retry_backoff,
     )
-    result: str = poda.download(
-        packet=packet,
-        start_date=appUtils.convertToDatetime(start_date),
-        end_date=appUtils.convertToDatetime(end_date),
+
+    failed: list[str] = []
+
+    try:
+        # all packets share the connection pool of one WebPODA client
+        with ThreadPoolExecutor(max_workers=api.max_concurrent_requests) as executor:
+            downloads: dict[Future, str] = {
+                executor.submit(
+                    poda.download,
+                    packet=packet,
+                    start_date=packetStart,
+                    end_date=end,
+                ): packet
+                for packet, packetStart in starts.items()
+            }
+
+            for i, download in enumerate(as_completed(downloads), start=1):
+                packet = downloads[download]
+
+                if download.exception() is None:
+                    logging.info(f"Downloaded {packet} ({i}/{len(downloads)}).")
+                else:
+                    failed.append(packet)
+                    logging.error(
+                        f"Failed to download {packet}: {download.exception()}"
+                    )
+    finally:
+        poda.close()
+
+    if failed:
+        logging.critical(f"Failed to download {', '.join(failed)}.")
+        raise typer.Abort()
+
+    appUtils.copyFilesToDestination(
+        [download.result() for download in downloads],
+        configFile.destination,
     )
 
-    appUtils.copyFileToDestination(result, configFile.destination)
+    # only move the watermarks on once the data is safely at its destination
+    if watermarks:
+        for packet in downloads.values():
+            watermarks.update(f"binary/{packet}", ingestedUntil)
 
 
 class LevelEnum(str, Enum):
@@ -228,7 +441,16 @@ def fetch_science(
         LevelEnum, typer.Option(help="Level to download")
     ] = LevelEnum.level_2,
     config: Annotated[Path, typer.Option()] = Path("config-sci.yaml"),
+    incremental: Annotated[
+        bool,
+        typer.Option(help="Only download files newer than downloaded before"),
+    ] = False,
 ):
+    from . import DB
+    from .cli.fetchScience import FetchScience
+    from .client.sdcDataAccess import SDCDataAccess
+    from .downloadManifest import DatabaseDownloadManifest, FileDownloadManifest
+
     configFile: appConfig.AppConfig = commandInit(config)
 
     if not auth_code:
@@ -242,24 +464,39 @@ def fetch_science(
         sdc_url=configFile.api.sdc_url if configFile.api else None,
     )
 
-    fetch_science = FetchScience(data_access)
-    files = fetch_science.download_latest_science(
+    db = DB.DB() if configFile.destination.export_to_database else None
+
+    api: appConfig.API = configFile.api or appConfig.API()
+    watermarks = Watermarks(configFile.work_folder) if incremental else None
+
+    fetch_science = FetchScience(
+        data_access,
+        max_workers=api.max_concurrent_requests,
+        manifest=(
+            DatabaseDownloadManifest(db)
+            if db
+            else FileDownloadManifest(configFile.work_folder)
+        ),
+        watermarks=watermarks,
+        overlap=timedelta(seconds=api.incremental_overlap),
+    )
+    (files, ingested) = fetch_science.download_latest_science(
         level=level.value, start_date=start_date, end_date=end_date
     )
 
-    records = []
-    for file in files:
-        records.append(File(name=file.name, path=file.absolute().as_posix()))
-
     for file in files:
         appUtils.copyFileToDestination(file, configFile.destination)
 
-    if configFile.destination.export_to_database:
-        db = DB.DB()
-        db.insert_files(records)
+    if db:
+        db.insert_files([DB.create_file_record(file) for file in files])
 
         logging.info(f"Downloaded {len(files)} files and saved to database")
 
+    # only move the watermarks on once the files are safely at their destination
+    if watermarks:
+        for key, time in ingested.items():
+            watermarks.update(key, time)
+
 
 # imap-mag calibrate --config calibration_config.yaml --method SpinAxisCalibrator imap_mag_l1b_norm-mago_20250502_v000.cdf
 @app.command()
@@ -270,6 +507,17 @@ def calibrate(
         help="The file name or pattern to match for the input file"
     ),
 ):
+    from mag_toolkit import CDFLoader
+    from mag_toolkit.calibration.calibrationFormatProcessor import (
+        CalibrationFormatProcessor,
+    )
+    from mag_toolkit.calibration.Calibrator import (
+        Calibrator,
+        SpinAxisCalibrator,
+        SpinPlaneCalibrator,
+    )
+    from mag_toolkit.CDFCache import CDFCache
+
     # TODO: Define specific calibration configuration
     # Using AppConfig for now to piggyback off of configuration
     # verification and work area setup
@@ -291,17 +539,27 @@ def calibrate(
         case CalibratorType.SPINPLANE:
             calibrator = SpinPlaneCalibrator()
 
-    inputData = CDFLoader.load_cdf(workFile)
+    # calibrators only use the vectors and their times
+    inputData = CDFLoader.load_cdf(
+        workFile,
+        ["vectors"],
+        CDFCache(configFile.work_folder, configFile.processing.cdf_cache_size),
+    )
     calibration = calibrator.generateCalibration(inputData)
 
     tempOutputFile = os.path.join(configFile.work_folder, "calibration.json")
 
+    # a calibration staged by apply may link to its source, so replace it rather than write through it
+    if os.path.lexists(tempOutputFile):
+        os.remove(tempOutputFile)
+
     result = CalibrationFormatProcessor.writeToFile(calibration, tempOutputFile)
 
     appUtils.copyFileToDestination(result, configFile.destination)
 
 
 # imap-mag apply --config calibration_application_config.yaml --calibration calibration.json imap_mag_l1a_norm-mago_20250502_v000.cdf
+# or imap-mag apply --config calibration_application_config.yaml --batch --start-date 2025-05-01 --end-date 2025-05-31 "imap_mag_l1b_norm-mago_%Y%m%d_v*.cdf"
 @app.command()
 def apply(
     config: Annotated[Path, typer.Option()] = Path(
@@ -311,20 +569,147 @@ def apply(
     input: str = typer.Argument(
         help="The file name or pattern to match for the input file"
     ),
+    batch: Annotated[
+        bool,
+        typer.Option(
+            help="Calibrate every matching file, rather than only the most recent one"
+        ),
+    ] = False,
+    start_date: Annotated[
+        str | None,
+        typer.Option(help="In batch mode, first date to fill into a % pattern"),
+    ] = None,
+    end_date: Annotated[
+        str | None,
+        typer.Option(help="In batch mode, last date to fill into a % pattern"),
+    ] = None,
+    workers: Annotated[
+        int | None,
+        typer.Option(help="In batch mode, number of processes (default: all cores)"),
+    ] = None,
 ):
+    from mag_toolkit.calibration.CalibrationApplicator import CalibrationApplicator
+    from mag_toolkit.CDFCache import CDFCache
+
+    from . import batchCalibration
+
     configFile: appConfig.AppConfig = commandInit(config)
 
+    if batch:
+        applyBatch(input, calibration, configFile, start_date, end_date, workers)
+        return
+
     workDataFile = prepareWorkFile(input, configFile)
     workCalibrationFile = prepareWorkFile(calibration, configFile)
-    workOutputFile = os.path.join(configFile.work_folder, "l2_data.cdf")
 
-    applier = CalibrationApplicator()
+    if workDataFile is None or workCalibrationFile is None:
+        logging.critical(
+            "Unable to find a file to calibrate in %s", configFile.source.folder
+        )
+        raise typer.Abort()
+
+    # name the output after the input, so runs on different files do not collide
+    outputFolder = (
+        configFile.work_folder / batchCalibration.APPLY_FOLDER_NAME / "outputs"
+    )
+    outputFolder.mkdir(parents=True, exist_ok=True)
+
+    workOutputFile = outputFolder / appUtils.getLevelFileName(
+        workDataFile.name, batchCalibration.OUTPUT_LEVEL
+    )
+
+    applier = CalibrationApplicator(
+        chunkSize=configFile.processing.calibration_chunk_size,
+        cache=CDFCache(configFile.work_folder, configFile.processing.cdf_cache_size),
+    )
 
     L2_file = applier.apply(workCalibrationFile, workDataFile, workOutputFile)
 
     appUtils.copyFileToDestination(L2_file, configFile.destination)
 
 
+def applyBatch(
+    file: str,
+    calibration: str,
+    configFile: appConfig.AppConfig,
+    start_date: str | None,
+    end_date: str | None,
+    workers: int | None,
+) -> None:
+    from mag_toolkit.calibration.calibrationFormatProcessor import (
+        CalibrationFormatProcessor,
+    )
+
+    from . import batchCalibration
+
+    files: list[Path] = findBatchFiles(file, configFile, start_date, end_date)
+
+    workCalibrationFile = prepareWorkFile(calibration, configFile)
+    calibrationCollection = (
+        CalibrationFormatProcessor.loadFromPath(workCalibrationFile)
+        if workCalibrationFile
+        else None
+    )
+
+    if calibrationCollection is None:
+        logging.critical(f"Unable to load calibration {calibration}")
+        raise typer.Abort()
+
+    summary = batchCalibration.applyToFiles(
+        files, calibrationCollection, configFile, workers
+    )
+    summaryFile = summary.write(
+        Path(configFile.destination.folder) / batchCalibration.SUMMARY_FILE_NAME
+    )
+
+    logging.info(
+        f"Calibrated {len(summary.outputs)} files, {len(summary.failures)} failed. "
+        f"Summary written to {summaryFile}."
+    )
+
+    if summary.failures:
+        raise typer.Abort()
+
+
+# E.g., imap-mag schedule --config pipeline.yaml
+@app.command()
+def schedule(
+    config: Annotated[Path, typer.Option()] = Path("pipeline.yaml"),
+    once: Annotated[
+        bool, typer.Option(help="Run the pipeline once, rather than every interval")
+    ] = False,
+):
+    """Run a pipeline of commands in this process, over new data, on a schedule."""
+
+    if not config.is_file():
+        logging.critical("The pipeline config at %s does not exist", config)
+        raise typer.Abort()
+
+    pipelineConfig = appConfig.PipelineConfig(**yaml.safe_load(open(config)))
+
+    os.makedirs(pipelineConfig.work_folder, exist_ok=True)
+    initLogging(pipelineConfig.work_folder)
+
+    from imap_db.main import app as databaseApp
+
+    scheduler = PipelineScheduler(
+        pipelineConfig,
+        typer.main.get_command(app),
+        ["--verbose"] if globalState["verbose"] else [],
+        typer.main.get_command(databaseApp),
+    )
+
+    globalState["scheduled"] = True
+
+    try:
+        succeeded = scheduler.serve(once=once)
+    finally:
+        globalState["scheduled"] = False
+
+    if not succeeded:
+        raise typer.Abort()
+
+
 @app.callback()
 def main(verbose: Annotated[bool, typer.Option("--verbose", "-v")] = False):
     if verbose:
@@ -332,4 +717,6 @@ def main(verbose: Annotated[bool, typer.Option("--verbose", "-v")] = False):
 
 
 if __name__ == "__main__":
+    # worker processes of a frozen executable run the worker, not the command line
+    multiprocessing.freeze_support()  # pragma: no cover
     app()  # pragma: no cover
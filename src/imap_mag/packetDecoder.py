@@ -0,0 +1,422 @@
+"""Columnar decoding of CCSDS packets into NumPy structured arrays."""
+
+import collections
+import io
+import logging
+from collections.abc import Iterator
+from dataclasses import dataclass
+from typing import BinaryIO
+
+import bitstring
+import numpy as np
+from space_packet_parser import parser, xtcedef
+
+CCSDS_HEADER_LENGTH = parser.CCSDS_HEADER_LENGTH_BYTES
+CCSDS_HEADER_FIELDS = len(parser.CCSDS_HEADER_DEFINITION)
+ROOT_CONTAINER = "CCSDSPacket"
+
+
+@dataclass
+class PacketField:
+    """Fixed-width field at a known bit offset in every packet of a layout."""
+
+    name: str
+    bitOffset: int
+    bitSize: int
+    signed: bool
+    isFloat: bool
+    coefficients: list[tuple[float, int]] | None
+
+    @property
+    def dtype(self) -> np.dtype:
+        if self.coefficients is not None or self.isFloat:
+            return np.dtype(np.float64)
+
+        for bits in (8, 16, 32, 64):
+            if self.bitSize <= bits:
+                return np.dtype(f"{'i' if self.signed else 'u'}{bits // 8}")
+
+        raise ValueError(f"Field {self.name} is wider than 64 bits.")
+
+
+@dataclass
+class PacketLayout:
+    """Fixed layout shared by every packet of one ApID.
+
+    The layout only applies to packets with the same values of the parameters the restriction criteria
+    were evaluated on as the packet it was worked out from, so they resolve to the same containers.
+    """
+
+    fields: list[PacketField]
+    criteriaValues: dict[str, int | float]
+
+    @property
+    def dtype(self) -> np.dtype:
+        # match the ordering of space_packet_parser: user data first, then header
+        ordered = self.fields[CCSDS_HEADER_FIELDS:] + self.fields[:CCSDS_HEADER_FIELDS]
+        return np.dtype([(field.name, field.dtype) for field in ordered])
+
+    @property
+    def lengthInBytes(self) -> int:
+        lastField = self.fields[-1]
+        return (lastField.bitOffset + lastField.bitSize + 7) // 8
+
+
+def splitPackets(data: bytes) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Find the ApID, start offset and length of every packet in a buffer."""
+
+    apids = []
+    offsets = []
+    lengths = []
+
+    offset = 0
+    end = len(data)
+
+    while offset + CCSDS_HEADER_LENGTH <= end:
+        length = CCSDS_HEADER_LENGTH + 1 + ((data[offset + 4] << 8) | data[offset + 5])
+
+        if offset + length > end:
+            logging.warning(
+                f"Ignoring truncated packet at byte {offset}: "
+                f"expected {length} bytes, found {end - offset}."
+            )
+            break
+
+        apids.append(((data[offset] & 0x07) << 8) | data[offset + 1])
+        offsets.append(offset)
+        lengths.append(length)
+
+        offset += length
+
+    return (
+        np.array(apids, dtype=np.uint16),
+        np.array(offsets, dtype=np.int64),
+        np.array(lengths, dtype=np.int64),
+    )
+
+
+def readPacketChunks(binaryData: BinaryIO, chunkSize: int) -> Iterator[bytes]:
+    """Read whole packets from a binary stream, in chunks of up to chunkSize packets."""
+
+    chunk = bytearray()
+    count = 0
+
+    while header := binaryData.read(CCSDS_HEADER_LENGTH):
+        if len(header) < CCSDS_HEADER_LENGTH:
+            logging.warning("Ignoring truncated packet header at end of stream.")
+            break
+
+        length = 1 + ((header[4] << 8) | header[5])
+        body = binaryData.read(length)
+
+        if len(body) < length:
+            logging.warning(
+                f"Ignoring truncated packet at end of stream: "
+                f"expected {length} bytes, found {len(body)}."
+            )
+            break
+
+        chunk += header
+        chunk += body
+        count += 1
+
+        if count == chunkSize:
+            yield bytes(chunk)
+
+            chunk.clear()
+            count = 0
+
+    if count > 0:
+        yield bytes(chunk)
+
+
+def getPacketLayout(
+    packetDefinition: xtcedef.XtcePacketDefinition, packet: bytes
+) -> PacketLayout | None:
+    """Work out the fixed bit layout for packets like this one, if it has one."""
+
+    containers = packetDefinition.named_containers
+
+    try:
+        parsed = parser.PacketParser.parse_packet(
+            bitstring.ConstBitStream(packet), containers, ROOT_CONTAINER
+        )
+    except Exception as e:
+        logging.debug(f"Cannot determine packet layout: {e}")
+        return None
+
+    parsedItems = parsed.header | parsed.data
+
+    parameters: list[xtcedef.Parameter] = []
+    criteria: list[xtcedef.MatchCriteria] = []
+    current: xtcedef.SequenceContainer = containers[ROOT_CONTAINER]
+
+    # follow the same inheritance chain as space_packet_parser
+    while True:
+        _flattenContainer(current, parameters)
+
+        # the criteria of every inheritor decide the chain, not only those of the one matched
+        for name in current.inheritors:
+            criteria += containers[name].restriction_criteria
+
+        inheritors = [
+            containers[name]
+            for name in current.inheritors
+            if all(
+                rc.evaluate(parsedItems) for rc in containers[name].restriction_criteria
+            )
+        ]
+
+        if len(inheritors) != 1:
+            break
+
+        current = inheritors[0]
+
+    if any(
+        not isinstance(criterion, xtcedef.Comparison)
+        or criterion.referenced_parameter not in parsedItems
+        for criterion in criteria
+    ):
+        return None
+
+    # the values decoded columns hold, i.e., derived or raw
+    criteriaValues = {
+        criterion.referenced_parameter: (
+            parsedItems[criterion.referenced_parameter].derived_value
+            or parsedItems[criterion.referenced_parameter].raw_value
+        )
+        for criterion in criteria
+    }
+
+    if [parameter.name for parameter in parameters] != list(parsedItems.keys()):
+        return None
+
+    fields: list[PacketField] = []
+    bitOffset = 0
+
+    for parameter in parameters:
+        field = _getPacketField(parameter, bitOffset)
+
+        if field is None:
+            logging.debug(f"Parameter {parameter.name} does not have a fixed width.")
+            return None
+
+        fields.append(field)
+        bitOffset += field.bitSize
+
+    if (bitOffset + 7) // 8 != len(packet):
+        return None
+
+    return PacketLayout(fields=fields, criteriaValues=criteriaValues)
+
+
+def decodeColumns(packets: np.ndarray, layout: PacketLayout) -> np.ndarray | None:
+    """Decode a (packets x bytes) array into a structured array of typed columns."""
+
+    records = np.empty(packets.shape[0], dtype=layout.dtype)
+
+    for field in layout.fields:
+        raw = _extractField(packets, field)
+
+        if field.coefficients is not None:
+            derived = _evaluatePolynomial(raw, field.coefficients)
+
+            # "derived or raw", as a zero derived value falls back to the raw one
+            records[field.name] = np.where(derived != 0, derived, raw)
+        else:
+            records[field.name] = raw
+
+    # all packets must resolve to the same containers as the packet the layout was worked out from
+    for name, value in layout.criteriaValues.items():
+        if np.any(records[name] != value):
+            return None
+
+    return records
+
+
+def decodePackets(
+    data: bytes,
+    packetDefinition: xtcedef.XtcePacketDefinition,
+    layouts: dict[tuple[int, int], PacketLayout | None] | None = None,
+) -> dict[int, np.ndarray]:
+    """Decode all packets in a buffer into one structured array per ApID.
+
+    Pass the same layouts dictionary when decoding several buffers with the same packet definition, to
+    avoid working out the layout of each ApID again.
+    """
+
+    if layouts is None:
+        layouts = dict()
+
+    (apids, offsets, lengths) = splitPackets(data)
+    buffer = np.frombuffer(data, dtype=np.uint8)
+
+    decoded: dict[int, np.ndarray] = dict()
+
+    for apid in dict.fromkeys(apids.tolist()):
+        selected = apids == apid
+        apidOffsets = offsets[selected]
+        apidLengths = lengths[selected]
+
+        firstPacket = data[apidOffsets[0] : apidOffsets[0] + apidLengths[0]]
+        layout: PacketLayout | None = None
+        records: np.ndarray | None = None
+
+        if np.all(apidLengths == apidLengths[0]):
+            key = (apid, int(apidLengths[0]))
+
+            if key not in layouts:
+                layouts[key] = getPacketLayout(packetDefinition, firstPacket)
+
+            layout = layouts[key]
+
+        if layout is not None:
+            packets = buffer[apidOffsets[:, None] + np.arange(layout.lengthInBytes)]
+            records = decodeColumns(packets, layout)
+
+        if records is None:
+            logging.debug(
+                f"ApID {apid} has no fixed layout, decoding packet by packet."
+            )
+            records = _decodePacketByPacket(
+                b"".join(
+                    data[offset : offset + length]
+                    for (offset, length) in zip(apidOffsets, apidLengths)
+                ),
+                packetDefinition,
+            )
+
+        logging.debug(f"Decoded {len(records)} packets for ApID {apid}.")
+        decoded[apid] = records
+
+    return decoded
+
+
+def _flattenContainer(
+    container: xtcedef.SequenceContainer, parameters: list[xtcedef.Parameter]
+) -> None:
+    for entry in container.entry_list:
+        if isinstance(entry, xtcedef.SequenceContainer):
+            _flattenContainer(entry, parameters)
+        else:
+            parameters.append(entry)
+
+
+def _getPacketField(parameter: xtcedef.Parameter, bitOffset: int) -> PacketField | None:
+    parameterType = parameter.parameter_type
+    encoding = parameterType.encoding
+
+    if not isinstance(
+        parameterType, xtcedef.IntegerParameterType | xtcedef.FloatParameterType
+    ):
+        return None
+
+    if not isinstance(
+        encoding, xtcedef.IntegerDataEncoding | xtcedef.FloatDataEncoding
+    ):
+        return None
+
+    if encoding.context_calibrators:
+        return None
+
+    coefficients: list[tuple[float, int]] | None = None
+
+    if encoding.default_calibrator is not None:
+        if not isinstance(encoding.default_calibrator, xtcedef.PolynomialCalibrator):
+            return None
+
+        coefficients = [
+            (coefficient.coefficient, coefficient.exponent)
+            for coefficient in encoding.default_calibrator.coefficients
+        ]
+
+    isFloat = isinstance(encoding, xtcedef.FloatDataEncoding)
+
+    if isFloat and (encoding.size_in_bits not in (32, 64) or bitOffset % 8 != 0):
+        return None
+
+    # every field is unpacked through a single 64-bit word
+    if (bitOffset % 8 + encoding.size_in_bits + 7) // 8 > 8:
+        return None
+
+    return PacketField(
+        name=parameter.name,
+        bitOffset=bitOffset,
+        bitSize=encoding.size_in_bits,
+        signed=encoding.encoding in ("signed", "twosCompliment", "twosComplement"),
+        isFloat=isFloat,
+        coefficients=coefficients,
+    )
+
+
+def _extractField(packets: np.ndarray, field: PacketField) -> np.ndarray:
+    startByte = field.bitOffset // 8
+    endByte = (field.bitOffset + field.bitSize + 7) // 8
+    fieldBytes = packets[:, startByte:endByte]
+
+    if field.isFloat:
+        return np.ascontiguousarray(fieldBytes).view(f">f{field.bitSize // 8}")[:, 0]
+
+    value = np.zeros(packets.shape[0], dtype=np.uint64)
+
+    for column in range(endByte - startByte):
+        value = (value << np.uint64(8)) | fieldBytes[:, column].astype(np.uint64)
+
+    value >>= np.uint64((endByte - startByte) * 8 - field.bitOffset % 8 - field.bitSize)
+
+    if field.bitSize < 64:
+        value &= np.uint64((1 << field.bitSize) - 1)
+
+    if not field.signed:
+        return value
+
+    signed = value.astype(np.int64)
+
+    if field.bitSize < 64:
+        signed[signed >= (1 << (field.bitSize - 1))] -= 1 << field.bitSize
+
+    return signed
+
+
+def _evaluatePolynomial(
+    raw: np.ndarray, coefficients: list[tuple[float, int]]
+) -> np.ndarray:
+    # powers are computed exactly on integers, as in space_packet_parser, before converting to float
+    maxMagnitude = max(abs(int(raw.max(initial=0))), abs(int(raw.min(initial=0))))
+    derived = np.zeros(raw.shape, dtype=np.float64)
+
+    for coefficient, exponent in coefficients:
+        if raw.dtype.kind == "f":
+            power = raw**exponent
+        elif exponent >= 0 and maxMagnitude ** max(exponent, 1) < 2**63:
+            power = raw.astype(np.int64) ** exponent
+        else:
+            power = np.array(
+                [int(value) ** exponent for value in raw.tolist()], dtype=np.float64
+            )
+
+        derived += coefficient * power.astype(np.float64)
+
+    return derived
+
+
+def _decodePacketByPacket(
+    data: bytes, packetDefinition: xtcedef.XtcePacketDefinition
+) -> np.ndarray:
+    columns: dict[str, list] = collections.defaultdict(list)
+    packetParser = parser.PacketParser(packetDefinition)
+
+    for packet in packetParser.generator(io.BytesIO(data)):
+        for key, value in (packet.data | packet.header).items():
+            columns[key].append(value.derived_value or value.raw_value)
+
+    arrays = {key: np.asarray(values) for key, values in columns.items()}
+    records = np.empty(
+        len(next(iter(arrays.values()), [])),
+        dtype=[(key, array.dtype) for key, array in arrays.items()],
+    )
+
+    for key, array in arrays.items():
+        records[key] = array
+
+    return records
@@ -0,0 +1,142 @@
+"""Run the pipeline of imap-mag commands in one long-lived process, on a schedule."""
+
+import json
+import logging
+import time
+from collections.abc import Callable
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import click
+
+from . import appConfig, appUtils
+
+STATE_FILE_NAME = "pipeline-state.json"
+DATE_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+
+class PipelineScheduler:
+    """Run the steps of a pipeline in turn, every interval, over the data since the last successful run.
+
+    Commands run in this process, so caches and connection pools stay warm from one run to the next. Fetch steps
+    with window set are given the time range of the run as --start-date and --end-date, unless set in
+    their arguments. The end of a run is only recorded once all its steps succeed, so failed runs are retried.
+    Database steps, e.g., query-db, run imap-db commands instead.
+    """
+
+    __config: appConfig.PipelineConfig
+    __commands: click.Group
+    __databaseCommands: click.Group | None
+    __options: list[str]
+    __stateFile: Path
+
+    def __init__(
+        self,
+        config: appConfig.PipelineConfig,
+        commands: click.Group,
+        options: list[str] | None = None,
+        databaseCommands: click.Group | None = None,
+    ) -> None:
+        self.__config = config
+        self.__commands = commands
+        self.__databaseCommands = databaseCommands
+        self.__options = options or []
+        self.__stateFile = config.work_folder / STATE_FILE_NAME
+
+    @property
+    def lastSuccess(self) -> datetime | None:
+        """End of the time range of the last successful run."""
+
+        state = appUtils.readJsonFile(self.__stateFile)
+
+        if state is None:
+            return None
+
+        return datetime.fromisoformat(state["last_success"])
+
+    def serve(
+        self, once: bool = False, sleep: Callable[[float], None] = time.sleep
+    ) -> bool:
+        """Run the pipeline every interval, or only once. Return whether the last run succeeded."""
+
+        while True:
+            started = time.monotonic()
+            succeeded = self.runOnce()
+
+            if once:
+                return succeeded
+
+            wait = max(0.0, self.__config.interval - (time.monotonic() - started))
+            logging.info(f"Next run in {wait:.0f} seconds.")
+
+            sleep(wait)
+
+    def runOnce(self, now: datetime | None = None) -> bool:
+        """Run every step over the data since the last successful run. Return whether all succeeded."""
+
+        end = self.__config.end_date or now or datetime.now()
+        start = (
+            self.lastSuccess
+            or self.__config.start_date
+            or end - timedelta(seconds=self.__config.interval)
+        )
+
+        if start >= end:
+            logging.info(f"No new data to process since {start:{DATE_FORMAT}}.")
+            return True
+
+        logging.info(
+            f"Running pipeline from {start:{DATE_FORMAT}} to {end:{DATE_FORMAT}}."
+        )
+
+        for i, step in enumerate(self.__config.steps, start=1):
+            arguments = self.__getArguments(step, start, end)
+            logging.info(
+                f"Running step {i}/{len(self.__config.steps)}: {' '.join(arguments)}"
+            )
+
+            try:
+                if step.command in appConfig.DATABASE_COMMANDS:
+                    exitCode = self.__databaseCommands.main(
+                        args=arguments, prog_name="imap-db", standalone_mode=False
+                    )
+                else:
+                    exitCode = self.__commands.main(
+                        args=self.__options + arguments,
+                        prog_name="imap-mag",
+                        standalone_mode=False,
+                    )
+            except Exception as e:
+                logging.error(f"Step {step.command} failed, abandoning run: {e!r}")
+                return False
+
+            if exitCode:
+                logging.error(
+                    f"Step {step.command} exited with code {exitCode}, abandoning run."
+                )
+                return False
+
+        self.__saveLastSuccess(end)
+        logging.info(f"Pipeline run up to {end:{DATE_FORMAT}} complete.")
+
+        return True
+
+    def __getArguments(
+        self, step: appConfig.PipelineStep, start: datetime, end: datetime
+    ) -> list[str]:
+        arguments = [step.command]
+
+        if step.config is not None:
+            arguments += ["--config", str(step.config)]
+
+        if step.window:
+            for option, date in (("--start-date", start), ("--end-date", end)):
+                if option not in step.args:
+                    arguments += [option, f"{date:{DATE_FORMAT}}"]
+
+        return arguments + step.args
+
+    def __saveLastSuccess(self, end: datetime) -> None:
+        appUtils.writeFileAtomically(
+            self.__stateFile, json.dumps({"last_success": end.isoformat()})
+        )
@@ -0,0 +1,69 @@
+"""Keep track of the time up to which data has been ingested, so only newer data is fetched."""
+
+import json
+import logging
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from . import appUtils
+
+WATERMARKS_FILE_NAME = "watermarks.json"
+
+
+class Watermarks:
+    """Last ingested time of each data source, e.g., a packet or a science descriptor, saved in the work folder.
+
+    Watermarks only ever move forward. Fetches start a little before the watermark, so data arriving late at
+    the boundary is not missed.
+    """
+
+    __file: Path
+    __times: dict[str, datetime]
+    __lock: threading.Lock
+
+    def __init__(self, folder: Path) -> None:
+        self.__file = folder / WATERMARKS_FILE_NAME
+        self.__times = {
+            key: datetime.fromisoformat(time)
+            for key, time in (appUtils.readJsonFile(self.__file) or dict()).items()
+        }
+        self.__lock = threading.Lock()
+
+    def get(self, key: str) -> datetime | None:
+        with self.__lock:
+            return self.__times.get(key)
+
+    def getStart(
+        self, key: str, start: datetime, overlap: timedelta = timedelta()
+    ) -> datetime:
+        """Get the time to fetch data from, no earlier than the given start."""
+
+        watermark = self.get(key)
+
+        if watermark is None or watermark - overlap <= start:
+            return start
+
+        logging.debug(f"Fetching {key} from watermark {watermark}.")
+
+        return watermark - overlap
+
+    def update(self, key: str, time: datetime) -> None:
+        """Record that data has been ingested up to a time, unless later data already was."""
+
+        # data may be ingested concurrently
+        with self.__lock:
+            if key in self.__times and self.__times[key] >= time:
+                return
+
+            self.__times[key] = time
+            self.__save()
+
+    def __save(self) -> None:
+        appUtils.writeFileAtomically(
+            self.__file,
+            json.dumps(
+                {key: time.isoformat() for key, time in self.__times.items()},
+                indent=2,
+            ),
+        )
@@ -0,0 +1,123 @@
+"""Cache parsed XTCE packet definitions in memory and on disk."""
+
+import hashlib
+import logging
+import pickle
+from importlib import metadata
+from pathlib import Path
+
+from space_packet_parser import xtcedef
+
+from . import appUtils
+
+CACHE_FOLDER_NAME = "xtce_cache"
+
+_packetDefinitions: dict[str, xtcedef.XtcePacketDefinition] = dict()
+
+
+class LinearAdjuster:
+    """Picklable replacement for the linear adjuster closures built by space_packet_parser."""
+
+    def __init__(self, slope: int, intercept: int) -> None:
+        self.slope = slope
+        self.intercept = intercept
+
+    def __call__(self, x: int) -> int:
+        adjusted = (self.slope * float(x)) + self.intercept
+        if not adjusted.is_integer():
+            raise ValueError(
+                f"Error when adjusting a value with a LinearAdjustment. Got y=mx + b as "
+                f"{adjusted}={self.slope}*{x}+{self.intercept} returned a float. "
+                f"Should have been an int."
+            )
+        return int(adjusted)
+
+
+class _PacketDefinitionPickler(pickle.Pickler):
+    """Pickler that swaps local adjuster functions for LinearAdjuster instances."""
+
+    def reducer_override(self, obj):
+        if callable(obj) and getattr(obj, "__qualname__", "").endswith(
+            "_get_linear_adjuster.<locals>.adjuster"
+        ):
+            closure = dict(
+                zip(
+                    obj.__code__.co_freevars,
+                    (cell.cell_contents for cell in obj.__closure__),
+                )
+            )
+            return (LinearAdjuster, (closure["slope"], closure["intercept"]))
+
+        return NotImplemented
+
+
+def getPacketDefinitionKey(xtceFile: Path) -> str:
+    """Hash the XTCE file content and parser version into a cache key."""
+
+    hash = hashlib.sha256()
+    hash.update(metadata.version("space_packet_parser").encode())
+
+    with open(xtceFile, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            hash.update(chunk)
+
+    return hash.hexdigest()
+
+
+def loadPacketDefinition(
+    xtceFile: Path, cacheFolder: Path | None = None
+) -> xtcedef.XtcePacketDefinition:
+    """Load XTCE packet definition, using the in-memory or on-disk cache if possible."""
+
+    key = getPacketDefinitionKey(xtceFile)
+
+    if key in _packetDefinitions:
+        logging.debug("Using in-memory XTCE packet definition for %s", xtceFile)
+        return _packetDefinitions[key]
+
+    cacheFile: Path | None = None
+
+    if cacheFolder is not None:
+        cacheFile = Path(
+            cacheFolder, CACHE_FOLDER_NAME, f"{Path(xtceFile).stem}-{key}.pkl"
+        )
+
+        if cacheFile.exists():
+            try:
+                with open(cacheFile, "rb") as f:
+                    packetDefinition = pickle.load(f)
+
+                logging.debug("Loaded XTCE packet definition from cache %s", cacheFile)
+                _packetDefinitions[key] = packetDefinition
+                return packetDefinition
+            except Exception as e:
+                logging.warning(f"Ignoring unreadable XTCE cache {cacheFile}: {e}")
+
+    logging.debug("Parsing XTCE packet definition from %s", xtceFile)
+    packetDefinition = xtcedef.XtcePacketDefinition(xtceFile)
+    _packetDefinitions[key] = packetDefinition
+
+    if cacheFile is not None:
+        _writeCacheFile(packetDefinition, cacheFile)
+
+    return packetDefinition
+
+
+def clearCache() -> None:
+    """Clear the in-memory cache. The on-disk cache is left in place."""
+    _packetDefinitions.clear()
+
+
+def _writeCacheFile(
+    packetDefinition: xtcedef.XtcePacketDefinition, cacheFile: Path
+) -> None:
+    try:
+        appUtils.writeFileAtomically(
+            cacheFile,
+            lambda f: _PacketDefinitionPickler(
+                f, protocol=pickle.HIGHEST_PROTOCOL
+            ).dump(packetDefinition),
+        )
+        logging.debug("Saved XTCE packet definition to cache %s", cacheFile)
+    except Exception as e:
+        logging.warning(f"Failed to cache XTCE packet definition in {cacheFile}: {e}")
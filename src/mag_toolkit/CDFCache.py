@@ -0,0 +1,209 @@
+import hashlib
+import logging
+import os
+import pickle
+import shutil
+from pathlib import Path
+
+import cdflib
+import numpy as np
+import xarray as xr
+from imap_mag.appUtils import writeFileAtomically
+
+CACHE_FOLDER_NAME = "cdf_cache"
+METADATA_FILE_NAME = "metadata.pkl"
+
+# change to invalidate cache entries, e.g., when datasets are loaded differently
+CACHE_VERSION = 1
+
+# bytes at the start and end of a file hashed into its cache key
+SAMPLE_SIZE = 64 * 1024
+
+
+class CDFCache:
+    """Cache of the variables of loaded CDF files, saved in the work folder as memory-mapped arrays.
+
+    Entries are keyed by file name, size, modification time and a hash of the start and end of the file,
+    so copies of a file staged into different folders share an entry. Variables loaded from a file are
+    added to its entry, unless loaded lazily, and loads of those variables are then read from the entry
+    instead. Beyond the maximum size, the least recently used entries are removed.
+    """
+
+    __folder: Path
+    __maxSize: int
+
+    def __init__(self, workFolder: Path, maxSize: int) -> None:
+        self.__folder = workFolder / CACHE_FOLDER_NAME
+        self.__maxSize = maxSize
+
+    def getKey(self, inputPath: Path) -> str:
+        """Hash the identity of a file, and the versions it is decoded with, into a cache key."""
+
+        stat = inputPath.stat()
+
+        hash = hashlib.sha256()
+        hash.update(
+            f"{inputPath.name}:{stat.st_size}:{stat.st_mtime_ns}:"
+            f"{cdflib.__version__}:{CACHE_VERSION}".encode()
+        )
+
+        with open(inputPath, "rb") as f:
+            hash.update(f.read(SAMPLE_SIZE))
+
+            if stat.st_size > SAMPLE_SIZE:
+                f.seek(-SAMPLE_SIZE, os.SEEK_END)
+                hash.update(f.read(SAMPLE_SIZE))
+
+        return hash.hexdigest()
+
+    def get(self, inputPath: Path, variables: list[str] | None) -> xr.Dataset | None:
+        """Get the cached dataset of a file, or only the given variables of it, if cached."""
+
+        entryFolder = self.__folder / self.getKey(inputPath)
+        metadataFile = entryFolder / METADATA_FILE_NAME
+
+        if not metadataFile.exists():
+            return None
+
+        try:
+            with open(metadataFile, "rb") as f:
+                metadata = pickle.load(f)
+
+            stored: dict = metadata["variables"]
+
+            if variables is None and not metadata["complete"]:
+                return None
+
+            if variables is not None and not all(
+                name in stored and not stored[name]["coordinate"] for name in variables
+            ):
+                return None
+
+            dataset = xr.Dataset(
+                {
+                    name: self.__loadVariable(entryFolder, info)
+                    for (name, info) in stored.items()
+                    if not info["coordinate"]
+                },
+                coords={
+                    name: self.__loadVariable(entryFolder, info)
+                    for (name, info) in stored.items()
+                    if info["coordinate"]
+                },
+                attrs=metadata["attrs"],
+            )
+
+            # the metadata file modification time records when the entry was last used
+            os.utime(metadataFile)
+        except Exception as e:
+            logging.warning(f"Ignoring unreadable CDF cache {entryFolder}: {e}")
+            return None
+
+        logging.debug(f"Loaded {inputPath} from CDF cache {entryFolder}.")
+
+        return dataset if variables is None else dataset[variables]
+
+    def put(
+        self, inputPath: Path, variables: list[str] | None, dataset: xr.Dataset
+    ) -> None:
+        """Add the variables of a dataset loaded from a file to its entry, then evict old entries."""
+
+        if self.__maxSize == 0:
+            return
+
+        # variables loaded lazily are not cached, as writing them would read all their records
+        inMemory = {
+            name: variable
+            for (name, variable) in dataset.variables.items()
+            if variable._in_memory
+        }
+
+        if not any(name in dataset.data_vars for name in inMemory):
+            return
+
+        entryFolder = self.__folder / self.getKey(inputPath)
+        metadataFile = entryFolder / METADATA_FILE_NAME
+
+        os.makedirs(entryFolder, exist_ok=True)
+
+        metadata = {"complete": False, "attrs": dataset.attrs, "variables": dict()}
+
+        # a complete dataset replaces the entry, and variables only add to it
+        if variables is not None and metadataFile.exists():
+            try:
+                with open(metadataFile, "rb") as f:
+                    metadata = pickle.load(f)
+            except Exception as e:
+                logging.warning(f"Replacing unreadable CDF cache {entryFolder}: {e}")
+
+        try:
+            for name, variable in inMemory.items():
+                if variables is not None and name in metadata["variables"]:
+                    continue
+
+                # name files by a hash, as variable names need not be valid file names
+                fileName = f"{hashlib.sha256(str(name).encode()).hexdigest()[:16]}.npy"
+                values = variable.values
+
+                writeFileAtomically(
+                    entryFolder / fileName,
+                    lambda f: np.save(f, values, allow_pickle=False),
+                )
+
+                metadata["variables"][name] = {
+                    "file": fileName,
+                    "dims": variable.dims,
+                    "attrs": variable.attrs,
+                    "coordinate": name in dataset.coords,
+                }
+
+            metadata["complete"] = metadata["complete"] or (
+                variables is None and len(inMemory) == len(dataset.variables)
+            )
+
+            # write the metadata last, so entries are only read once all their variables are written
+            writeFileAtomically(metadataFile, lambda f: pickle.dump(metadata, f))
+        except Exception as e:
+            logging.warning(f"Failed to cache {inputPath} in {entryFolder}: {e}")
+            return
+
+        logging.debug(f"Saved {inputPath} to CDF cache {entryFolder}.")
+
+        self.evict()
+
+    def evict(self) -> None:
+        """Remove the least recently used entries, until the cache is within its maximum size."""
+
+        entries: list[tuple[int, int, Path]] = []
+
+        for entryFolder in self.__folder.iterdir():
+            try:
+                size = sum(file.stat().st_size for file in entryFolder.iterdir())
+                metadataFile = entryFolder / METADATA_FILE_NAME
+
+                # entries without metadata are incomplete, so are removed first
+                used = metadataFile.stat().st_mtime_ns if metadataFile.exists() else 0
+            except FileNotFoundError:
+                # removed by another process
+                continue
+
+            entries.append((used, size, entryFolder))
+
+        total = sum(size for (_, size, _) in entries)
+
+        for used, size, entryFolder in sorted(entries):
+            if total <= self.__maxSize:
+                break
+
+            logging.debug(f"Removing least recently used CDF cache {entryFolder}.")
+
+            shutil.rmtree(entryFolder, ignore_errors=True)
+            total -= size
+
+    def __loadVariable(self, entryFolder: Path, info: dict) -> xr.Variable:
+        # map copy-on-write, so datasets can be updated in place without changing the cache
+        return xr.Variable(
+            info["dims"],
+            np.load(entryFolder / info["file"], mmap_mode="c", allow_pickle=False),
+            info["attrs"],
+        )
@@ -1,16 +1,340 @@
+import logging
+import threading
+from collections.abc import Callable
 from pathlib import Path
 
-from cdflib import xarray
+import cdflib
+import numpy as np
+import xarray as xr
+from cdflib import cdfwrite, xarray
+from xarray.backends import BackendArray
+from xarray.core import indexing
 
+from .CDFCache import CDFCache
 
-def load_cdf(inputPath: Path):
-    """Wraps cdlibs xarray reader."""
-    if inputPath.is_file():
-        return xarray.cdf_to_xarray(inputPath)
-    else:
+DEFAULT_CHUNK_SIZE = 100_000
+
+# CDF_EPOCH, CDF_EPOCH16 and CDF_TIME_TT2000
+TIME_DATA_TYPES = [31, 32, 33]
+
+# attributes holding values of their variable, so of its data type
+VALUE_ATTRIBUTES = ["FILLVAL", "VALIDMIN", "VALIDMAX"]
+
+# cdflib versions whose writer internals appending records relies on
+APPEND_RECORDS_CDFLIB_VERSIONS = [(1, 3)]
+
+
+class CDFVariableArray(BackendArray):
+    """Array of the records of a CDF variable, only reading the records indexed."""
+
+    def __init__(self, source: cdflib.CDF, lock: threading.Lock, name: str) -> None:
+        self.source = source
+        self.lock = lock
+        self.name = name
+
+        info = source.varinq(name)
+        first = self.__read(0, 0)
+
+        self.shape = (info.Last_Rec + 1, *first.shape[1:])
+        self.dtype = first.dtype
+
+    def __getitem__(self, key: indexing.ExplicitIndexer) -> np.ndarray:
+        return indexing.explicit_indexing_adapter(
+            key, self.shape, indexing.IndexingSupport.BASIC, self.__getRecords
+        )
+
+    def __getRecords(self, key: tuple) -> np.ndarray:
+        records = key[0]
+
+        if isinstance(records, slice):
+            indices = range(*records.indices(self.shape[0]))
+
+            if len(indices) == 0:
+                return np.empty((0, *self.shape[1:]), dtype=self.dtype)[
+                    (slice(None), *key[1:])
+                ]
+
+            # read the records from the first to the last indexed, and step through them in memory
+            return self.__read(indices[0], indices[-1])[
+                (slice(None, None, indices.step), *key[1:])
+            ]
+
+        record = int(records) % self.shape[0]
+
+        return self.__read(record, record)[(0, *key[1:])]
+
+    def __read(self, start: int, end: int) -> np.ndarray:
+        with self.lock:
+            data = self.source.varget(self.name, startrec=start, endrec=end)
+
+        return np.asarray(data).reshape((end - start + 1, *np.shape(data)[1:]))
+
+
+def load_cdf(
+    inputPath: Path, variables: list[str] | None = None, cache: CDFCache | None = None
+):
+    """Wraps cdlibs xarray reader.
+
+    Given variables, only those and the variables they depend on are read, and the records of those
+    varying by record are only read when used, e.g., when sliced. Given a cache, the variables are read
+    from it if already cached, and cached otherwise, unless loaded lazily.
+    """
+    if not inputPath.is_file():
         raise FileExistsError()
 
+    if cache is not None:
+        dataset = cache.get(inputPath, variables)
+
+        if dataset is not None:
+            return dataset
+
+    if variables is None:
+        dataset = xarray.cdf_to_xarray(inputPath)
+    else:
+        dataset = _load_lazily(inputPath, variables)
+
+    if cache is not None:
+        cache.put(inputPath, variables, dataset)
+
+    return dataset
+
 
 def write_cdf(dataset, outputPath: Path):
     """Wraps cdflib xarray writer."""
     xarray.xarray_to_cdf(dataset, outputPath)
+
+
+def get_time_range(
+    inputPath: Path, variable: str
+) -> tuple[np.datetime64, np.datetime64] | None:
+    """Get the first and last times of a variable, from its DEPEND_0 variable, without reading all records.
+
+    Returns None if the variable has no times.
+    """
+    source = cdflib.CDF(inputPath)
+    epoch = source.varattsget(variable).get("DEPEND_0")
+
+    if epoch is None:
+        return None
+
+    lastRecord = source.varinq(epoch).Last_Rec
+
+    if lastRecord < 0:
+        return None
+
+    (first, last) = (
+        source.varget(epoch, startrec=record, endrec=record)
+        for record in (0, lastRecord)
+    )
+
+    return (
+        cdflib.cdfepoch.to_datetime(first)[0],
+        cdflib.cdfepoch.to_datetime(last)[0],
+    )
+
+
+def can_stream_records(inputPath: Path) -> bool:
+    """Check whether map_cdf_records can copy a CDF file.
+
+    Records are only appended to variables with this version of cdflib, and only to zVariables without
+    compressed or sparse records. Otherwise, load and write the file whole instead.
+    """
+    if not _can_append_records():
+        logging.debug(f"Cannot append records with cdflib {cdflib.__version__}.")
+        return False
+
+    source = cdflib.CDF(inputPath)
+    info = source.cdf_info()
+
+    if info.rVariables:
+        logging.debug(f"Cannot stream rVariables of {inputPath}.")
+        return False
+
+    for name in info.zVariables:
+        spec = source.varinq(name)
+
+        if (
+            spec.Rec_Vary
+            and spec.Last_Rec >= 0
+            and (spec.Compress or spec.Sparse.lower() != "no_sparse")
+        ):
+            logging.debug(f"Cannot stream compressed or sparse {name} of {inputPath}.")
+            return False
+
+    return True
+
+
+def map_cdf_records(
+    inputPath: Path,
+    outputPath: Path,
+    variable: str,
+    function: Callable[[np.ndarray, np.ndarray], np.ndarray],
+    chunkSize: int = DEFAULT_CHUNK_SIZE,
+    dataType: str | None = None,
+) -> Path:
+    """Copy a CDF file a chunk of records at a time, passing the records of one variable through a function.
+
+    The function is given each chunk of records and their times, from the DEPEND_0 variable, and returns
+    the records to write. Only one chunk of each variable is in memory at once. Give the CDF data type of
+    the records returned, e.g., "CDF_DOUBLE", if it differs from that of the variable.
+
+    The file and the variables written whole keep their compression. Files that cannot be streamed, as
+    checked by can_stream_records, raise a ValueError.
+    """
+    if not can_stream_records(inputPath):
+        raise ValueError(f"{inputPath} cannot be streamed.")
+
+    source = cdflib.CDF(inputPath)
+    info = source.cdf_info()
+    epoch = source.varattsget(variable).get("DEPEND_0")
+
+    with cdfwrite.CDF(
+        outputPath,
+        cdf_spec={
+            "Majority": info.Majority,
+            "Encoding": info.Encoding,
+            "Checksum": info.Checksum,
+            "Compressed": info.Compressed,
+        },
+        delete=True,
+    ) as output:
+        output.write_globalattrs(
+            {
+                name: dict(enumerate(values))
+                for name, values in source.globalattsget().items()
+            }
+        )
+
+        for name in info.zVariables:
+            spec = source.varinq(name)
+            attributes = _get_variable_attributes(source, name)
+            newType = dataType if name == variable else None
+
+            if newType is not None:
+                for attribute in VALUE_ATTRIBUTES:
+                    if attribute in attributes:
+                        attributes[attribute] = [attributes[attribute][0], newType]
+
+            varSpec = {
+                "Variable": name,
+                "Data_Type": getattr(cdfwrite.CDF, newType)
+                if newType
+                else spec.Data_Type,
+                "Num_Elements": spec.Num_Elements,
+                "Rec_Vary": spec.Rec_Vary,
+                "Dim_Sizes": spec.Dim_Sizes,
+                "Var_Type": "zVariable",
+                "Sparse": "no_sparse",
+                "Compress": spec.Compress,
+            }
+
+            if newType is None:
+                varSpec["Pad"] = spec.Pad
+
+            if not spec.Rec_Vary or spec.Last_Rec < 0:
+                output.write_var(
+                    varSpec,
+                    attributes,
+                    source.varget(name) if spec.Last_Rec >= 0 else None,
+                )
+                continue
+
+            output.write_var(varSpec, attributes)
+
+            for start in range(0, spec.Last_Rec + 1, chunkSize):
+                end = min(start + chunkSize, spec.Last_Rec + 1) - 1
+                records = source.varget(name, startrec=start, endrec=end)
+
+                if name == variable:
+                    times = cdflib.cdfepoch.to_datetime(
+                        source.varget(epoch, startrec=start, endrec=end)
+                    )
+                    records = function(records, np.asarray(times))
+
+                _append_records(output, varSpec, start, end, records)
+
+    return outputPath
+
+
+def _load_lazily(inputPath: Path, variables: list[str]) -> xr.Dataset:
+    source = cdflib.CDF(inputPath)
+    lock = threading.Lock()
+    names = source.cdf_info().zVariables
+
+    dataVariables = dict()
+    coordinates = dict()
+
+    for name in variables:
+        info = source.varinq(name)
+        attributes = source.varattsget(name)
+
+        # dimensions are named after the variables they depend on, as by cdf_to_xarray
+        dimensions = [attributes.get("DEPEND_0", f"{name}_record")] + [
+            attributes.get(f"DEPEND_{i + 1}", f"{name}_dim{i}")
+            for i in range(info.Num_Dims)
+        ]
+
+        if info.Last_Rec >= 0:
+            data = indexing.LazilyIndexedArray(CDFVariableArray(source, lock, name))
+        else:
+            data = np.empty((0, *info.Dim_Sizes))
+
+        dataVariables[name] = xr.Variable(dimensions, data, attributes)
+
+        # coordinates are loaded whole, as xarray indexes them
+        for dependency in dimensions:
+            if dependency in coordinates or dependency not in names:
+                continue
+
+            values = np.atleast_1d(source.varget(dependency))
+
+            if source.varinq(dependency).Data_Type in TIME_DATA_TYPES:
+                values = np.asarray(cdflib.cdfepoch.to_datetime(values))
+
+            coordinates[dependency] = xr.Variable(
+                [dependency], values, source.varattsget(dependency)
+            )
+
+    return xr.Dataset(dataVariables, coords=coordinates, attrs=source.globalattsget())
+
+
+def _get_variable_attributes(source: cdflib.CDF, name: str) -> dict:
+    attributes = dict()
+
+    for attribute in source.varattsget(name):
+        entry = source.attget(attribute, name)
+
+        # keep the data type of numeric attributes, e.g., TT2000 fill values
+        attributes[attribute] = (
+            entry.Data if isinstance(entry.Data, str) else [entry.Data, entry.Data_Type]
+        )
+
+    return attributes
+
+
+def _can_append_records() -> bool:
+    try:
+        version = tuple(int(part) for part in cdflib.__version__.split(".")[:2])
+    except ValueError:
+        return False
+
+    return version in APPEND_RECORDS_CDFLIB_VERSIONS and hasattr(
+        cdfwrite.CDF, "_write_var_data_sparse"
+    )
+
+
+def _append_records(
+    output: cdfwrite.CDF, varSpec: dict, start: int, end: int, records: np.ndarray
+) -> None:
+    # cdflib only writes whole variables at once, except for blocks of sparse records, and a variable
+    # written as contiguous blocks is the same as one written at once
+    with output.path.open("rb+") as f:
+        output._write_var_data_sparse(
+            f,
+            True,
+            output.zvars.index(varSpec["Variable"]),
+            varSpec["Data_Type"],
+            varSpec["Num_Elements"],
+            True,
+            (start, end, records),
+        )
@@ -1,24 +1,75 @@
 import logging
+from datetime import timezone
 from pathlib import Path
+from typing import Literal
 
 import numpy as np
 
-from ..CDFLoader import load_cdf, write_cdf
+from ..CDFCache import CDFCache
+from ..CDFLoader import (
+    can_stream_records,
+    get_time_range,
+    load_cdf,
+    map_cdf_records,
+    write_cdf,
+)
 from .CalibrationExceptions import CalibrationValidityError
-from .calibrationFormat import CalibrationFormat
+from .calibrationFormat import CalibrationFormat, SingleCalibration
 from .calibrationFormatProcessor import (
     CalibrationFormatProcessor,
 )
 
+Interpolation = Literal["step", "linear"]
+
 
 class CalibrationApplicator:
+    """Apply the offsets of a calibration file to the vectors of a data file.
+
+    Offsets are resolved at every sample time, either stepping from one calibration timestamp to the next
+    or interpolating linearly between them. Before the first and after the last timestamp, the first and
+    last offsets apply. The offsets of all calibrations are added together, then to the vectors at once.
+
+    With a chunk size, files are streamed that many records at a time, rather than loaded whole, so large
+    burst files are calibrated in bounded memory. Otherwise, files are loaded through the cache, if given.
+    """
+
+    interpolation: Interpolation
+    chunkSize: int | None
+    cache: CDFCache | None
+
+    def __init__(
+        self,
+        interpolation: Interpolation = "step",
+        chunkSize: int | None = None,
+        cache: CDFCache | None = None,
+    ) -> None:
+        self.interpolation = interpolation
+        self.chunkSize = chunkSize
+        self.cache = cache
+
     def apply(self, calibrationFile, dataFile, outputFile) -> Path:
         """Currently operating on unprocessed data."""
-        data = load_cdf(dataFile)
         calibrationCollection: CalibrationFormat = (
             CalibrationFormatProcessor.loadFromPath(calibrationFile)
         )
 
+        return self.applyCalibration(calibrationCollection, dataFile, outputFile)
+
+    def applyCalibration(
+        self, calibrationCollection: CalibrationFormat, dataFile, outputFile
+    ) -> Path:
+        """Apply a calibration already loaded, e.g., to apply it to many files."""
+        if self.chunkSize is not None:
+            if can_stream_records(dataFile):
+                return self.__applyInChunks(calibrationCollection, dataFile, outputFile)
+
+            logging.warning(
+                f"Cannot stream {dataFile} {self.chunkSize} records at a time, "
+                "so loading it whole to apply the calibration in memory instead."
+            )
+
+        data = load_cdf(dataFile, cache=self.cache)
+
         logging.info("Loaded calibration file and data file")
 
         try:
@@ -28,19 +79,115 @@ class CalibrationApplicator:
 
         logging.info("Dataset and calibration file deemed compatible")
 
-        for eachCal in calibrationCollection.calibrations:
-            data.vectors[0] = data.vectors[0] + eachCal.offsets.X
-            data.vectors[1] = data.vectors[1] + eachCal.offsets.Y
-            data.vectors[2] = data.vectors[2] + eachCal.offsets.Z
+        self.applyToDataset(data, calibrationCollection)
 
         write_cdf(data, outputFile)
 
         return outputFile
 
+    def __applyInChunks(
+        self, calibrationCollection: CalibrationFormat, dataFile, outputFile
+    ) -> Path:
+        timeRange = get_time_range(dataFile, "vectors")
+
+        try:
+            if timeRange is not None:
+                self.checkTimeValidity(*timeRange, calibrationCollection)
+        except CalibrationValidityError as e:
+            logging.info(f"{e} -> continuing application of calibration regardless")
+
+        def calibrate(vectors: np.ndarray, epoch: np.ndarray) -> np.ndarray:
+            vectors = vectors.astype(np.float64)
+            vectors[:, :3] += self.getOffsets(epoch, calibrationCollection)
+
+            return vectors
+
+        logging.info(f"Applying calibration {self.chunkSize} records at a time")
+
+        map_cdf_records(
+            dataFile, outputFile, "vectors", calibrate, self.chunkSize, "CDF_DOUBLE"
+        )
+
+        return outputFile
+
+    def applyToDataset(self, data, calibrationCollection: CalibrationFormat) -> None:
+        """Add the calibration offsets to the x, y and z components of the dataset vectors, in place."""
+
+        offsets = self.getOffsets(data.epoch.values, calibrationCollection)
+
+        # offsets are fractional, so integer vectors are converted once, then updated in place
+        if not np.issubdtype(data.vectors.dtype, np.floating):
+            data["vectors"] = data.vectors.astype(np.float64)
+
+        # vectors loaded lazily are read on every access, so read them once to update them in place
+        data.vectors.load()
+
+        data.vectors.values[:, :3] += offsets
+
+    def getOffsets(
+        self, epoch: np.ndarray, calibrationCollection: CalibrationFormat
+    ) -> np.ndarray:
+        """Get the total x, y and z offsets at every sample time, as an (N, 3) array."""
+
+        epoch = epoch.astype("datetime64[ns]").astype(np.int64)
+        offsets = np.zeros((len(epoch), 3))
+
+        for calibration in calibrationCollection.calibrations:
+            if len(calibration.timestamps) == 0:
+                continue
+
+            offsets += self.__resolveOffsets(epoch, calibration)
+
+        return offsets
+
+    def __resolveOffsets(
+        self, epoch: np.ndarray, calibration: SingleCalibration
+    ) -> np.ndarray:
+        timestamps = np.array(
+            [
+                # numpy has no time zones, so compare in UTC
+                t.astimezone(timezone.utc).replace(tzinfo=None) if t.tzinfo else t
+                for t in calibration.timestamps
+            ],
+            dtype="datetime64[ns]",
+        ).astype(np.int64)
+        values = np.column_stack(
+            [calibration.offsets.X, calibration.offsets.Y, calibration.offsets.Z]
+        )
+
+        order = np.argsort(timestamps, kind="stable")
+        timestamps = timestamps[order]
+        values = values[order]
+
+        # index of the last calibration timestamp at or before each sample
+        after = np.searchsorted(timestamps, epoch, side="right")
+        before = np.clip(after - 1, 0, len(timestamps) - 1)
+
+        if self.interpolation == "step" or len(timestamps) == 1:
+            return values[before]
+
+        after = np.clip(after, 0, len(timestamps) - 1)
+        span = timestamps[after] - timestamps[before]
+
+        # samples outside the calibration timestamps have no span, and take the nearest offset
+        weight = np.divide(
+            epoch - timestamps[before],
+            span,
+            out=np.zeros(len(epoch)),
+            where=span > 0,
+        )
+
+        return values[before] + weight[:, np.newaxis] * (values[after] - values[before])
+
     def checkValidity(self, data, calibrationCollection):
+        self.checkTimeValidity(
+            data.epoch.values[0], data.epoch.values[-1], calibrationCollection
+        )
+
+    def checkTimeValidity(self, start, end, calibrationCollection):
         # check for time validity
-        if data.epoch[0] < np.datetime64(
+        if start < np.datetime64(
             calibrationCollection.valid_start
-        ) or data.epoch[1] > np.datetime64(calibrationCollection.valid_end):
+        ) or end > np.datetime64(calibrationCollection.valid_end):
             logging.debug("Data outside of calibration validity range")
             raise CalibrationValidityError("Data outside of calibration validity range")
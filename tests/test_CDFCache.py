@@ -0,0 +1,136 @@
+"""Tests for `CDFCache` class."""
+
+import os
+import shutil
+from pathlib import Path
+
+import cdflib
+import numpy as np
+import pytest
+from cdflib import xarray
+from mag_toolkit.CDFCache import CACHE_FOLDER_NAME, CDFCache
+from mag_toolkit.CDFLoader import load_cdf
+
+DATA_FILE = Path("tests/data/2025/imap_mag_l1b_norm-mago_20250502_v000.cdf")
+
+
+@pytest.fixture
+def count_decodes(monkeypatch):
+    """Count the CDF files decoded in full."""
+
+    decodes = []
+    cdf_to_xarray = xarray.cdf_to_xarray
+
+    def countingCdfToXarray(*args, **kwargs):
+        decodes.append(args[0])
+        return cdf_to_xarray(*args, **kwargs)
+
+    monkeypatch.setattr(xarray, "cdf_to_xarray", countingCdfToXarray)
+
+    return decodes
+
+
+def copy_data_file(folder: Path, name: str) -> Path:
+    folder.mkdir(parents=True, exist_ok=True)
+
+    return Path(shutil.copy2(DATA_FILE, folder / name))
+
+
+def test_repeat_load_is_read_from_cache(tmp_path, count_decodes):
+    cache = CDFCache(tmp_path, 1024**3)
+
+    expected = load_cdf(DATA_FILE, cache=cache)
+    actual = load_cdf(DATA_FILE, cache=cache)
+
+    assert len(count_decodes) == 1
+    assert actual.identical(expected)
+    assert isinstance(actual.vectors.values.base, np.memmap)
+
+
+def test_variables_are_read_from_cache_of_whole_file(tmp_path, count_decodes):
+    cache = CDFCache(tmp_path, 1024**3)
+
+    expected = load_cdf(DATA_FILE, cache=cache)
+    actual = load_cdf(DATA_FILE, ["vectors"], cache)
+
+    assert len(count_decodes) == 1
+    assert actual.identical(expected[["vectors"]])
+
+
+def test_copy_of_file_shares_cache_and_modified_file_does_not(tmp_path, count_decodes):
+    cache = CDFCache(tmp_path / "work", 1024**3)
+
+    load_cdf(copy_data_file(tmp_path / "first", DATA_FILE.name), cache=cache)
+    load_cdf(copy_data_file(tmp_path / "second", DATA_FILE.name), cache=cache)
+
+    assert len(count_decodes) == 1
+
+    modified = tmp_path / "second" / DATA_FILE.name
+    os.utime(modified, ns=(0, 0))
+
+    load_cdf(modified, cache=cache)
+
+    assert len(count_decodes) == 2
+
+
+def test_updating_dataset_in_place_does_not_change_cache(tmp_path):
+    cache = CDFCache(tmp_path, 1024**3)
+    expected = load_cdf(DATA_FILE, cache=cache).vectors.values.copy()
+
+    load_cdf(DATA_FILE, cache=cache).vectors.values[:] += 1
+
+    assert np.array_equal(load_cdf(DATA_FILE, cache=cache).vectors.values, expected)
+
+
+def test_least_recently_used_files_are_evicted(tmp_path, count_decodes):
+    files = [copy_data_file(tmp_path / "data", f"{name}.cdf") for name in "abc"]
+
+    # room for two files
+    cache = CDFCache(tmp_path / "work", 1_300_000)
+
+    load_cdf(files[0], cache=cache)
+    load_cdf(files[1], cache=cache)
+    load_cdf(files[0], cache=cache)
+    load_cdf(files[2], cache=cache)
+
+    assert len(count_decodes) == 3
+    assert len(list((tmp_path / "work" / CACHE_FOLDER_NAME).iterdir())) == 2
+
+    # the second file was used least recently, so evicted
+    load_cdf(files[0], cache=cache)
+    load_cdf(files[2], cache=cache)
+    assert len(count_decodes) == 3
+
+    load_cdf(files[1], cache=cache)
+    assert len(count_decodes) == 4
+
+
+def test_cache_of_no_size_caches_nothing(tmp_path, count_decodes):
+    cache = CDFCache(tmp_path, 0)
+
+    load_cdf(DATA_FILE, cache=cache)
+    load_cdf(DATA_FILE, cache=cache)
+
+    assert len(count_decodes) == 2
+    assert not (tmp_path / CACHE_FOLDER_NAME).exists()
+
+
+def test_variables_loaded_lazily_are_not_read_into_cache(tmp_path, monkeypatch):
+    reads = []
+    varget = cdflib.CDF.varget
+
+    def recordingVarget(self, variable=None, *args, **kwargs):
+        if variable == "vectors":
+            reads.append((kwargs.get("startrec"), kwargs.get("endrec")))
+
+        return varget(self, variable, *args, **kwargs)
+
+    monkeypatch.setattr(cdflib.CDF, "varget", recordingVarget)
+    cache = CDFCache(tmp_path, 1024**3)
+
+    load_cdf(DATA_FILE, ["vectors"], cache)
+    load_cdf(DATA_FILE, ["vectors"], cache)
+
+    # only the first record is read each time, to find the shape of the records
+    assert reads == [(0, 0), (0, 0)]
+    assert not (tmp_path / CACHE_FOLDER_NAME).exists()
@@ -0,0 +1,88 @@
+"""Tests for `CDFLoader` module."""
+
+from datetime import datetime
+from pathlib import Path
+
+import cdflib
+import numpy as np
+import pytest
+from mag_toolkit.calibration.CalibrationApplicator import CalibrationApplicator
+from mag_toolkit.calibration.calibrationFormat import CalibrationFormat
+from mag_toolkit.CDFLoader import load_cdf
+
+DATA_FILE = Path("tests/data/2025/imap_mag_l1b_norm-mago_20250502_v000.cdf")
+
+
+@pytest.fixture
+def record_reads(monkeypatch):
+    """Record the range of records of every read of the vectors."""
+
+    reads = []
+    varget = cdflib.CDF.varget
+
+    def recordingVarget(self, variable=None, *args, **kwargs):
+        if variable == "vectors":
+            reads.append((kwargs.get("startrec"), kwargs.get("endrec")))
+
+        return varget(self, variable, *args, **kwargs)
+
+    monkeypatch.setattr(cdflib.CDF, "varget", recordingVarget)
+
+    return reads
+
+
+def test_load_variables_matches_load_all():
+    expected = load_cdf(DATA_FILE)
+    actual = load_cdf(DATA_FILE, ["vectors"])
+
+    assert list(actual.data_vars) == ["vectors"]
+    assert actual.vectors.dims == expected.vectors.dims
+    assert actual.vectors.attrs.items() <= expected.vectors.attrs.items()
+    assert np.array_equal(actual.epoch.values, expected.epoch.values)
+    assert np.array_equal(actual.vectors.values, expected.vectors.values)
+
+
+def test_load_variables_only_reads_records_sliced(record_reads):
+    expected = load_cdf(DATA_FILE).vectors.values
+    record_reads.clear()
+
+    data = load_cdf(DATA_FILE, ["vectors"])
+
+    # only the first record is read, to find the shape of the records
+    assert record_reads == [(0, 0)]
+
+    assert np.array_equal(data.vectors[100:200:10, :3].values, expected[100:200:10, :3])
+    assert np.array_equal(data.vectors.isel(epoch=-1).values, expected[-1])
+
+    assert record_reads[1:] == [(100, 190), (15647, 15647)]
+
+
+def test_load_missing_file_fails(tmp_path):
+    with pytest.raises(FileExistsError):
+        load_cdf(tmp_path / "missing.cdf", ["vectors"])
+
+
+def test_calibration_is_applied_to_vectors_loaded_lazily():
+    expected = load_cdf(DATA_FILE)
+    data = load_cdf(DATA_FILE, ["vectors"])
+    calibration = CalibrationFormat(
+        valid_start=datetime(2025, 5, 2),
+        valid_end=datetime(2025, 5, 3),
+        calibrations=[
+            {
+                "timestamps": [datetime(2025, 5, 2)],
+                "offsets": {"X": [1], "Y": [2], "Z": [3]},
+                "units": "nT",
+                "instrument": "MAGO",
+                "creation_timestamp": datetime(2025, 5, 1),
+                "method": "test",
+            }
+        ],
+    )
+
+    CalibrationApplicator().applyToDataset(data, calibration)
+
+    assert np.array_equal(
+        data.vectors.values[:, :3], expected.vectors.values[:, :3] + [1, 2, 3]
+    )
+    assert np.array_equal(data.vectors.values[:, 3], expected.vectors.values[:, 3])
@@ -0,0 +1,109 @@
+"""Tests for `DB` class."""
+
+from datetime import date
+
+from imap_db.model import Base, File
+from imap_mag import DB, appConfig
+from imap_mag.main import prepareWorkFile
+
+
+def createDB(tmp_path) -> DB.DB:
+    db = DB.DB(f"sqlite:///{tmp_path / 'imap.db'}")
+    Base.metadata.create_all(db.engine)
+
+    return db
+
+
+def test_insert_files_skips_existing_and_duplicate_files(tmp_path):
+    db = createDB(tmp_path)
+
+    db.insert_files([File(name="a.cdf", path="/data/a.cdf")])
+    db.insert_files(
+        [
+            File(name="a.cdf", path="/data/a.cdf"),
+            File(name="b.cdf", path="/data/b.cdf"),
+            File(name="b.cdf", path="/data/b.cdf"),
+            File(name="a.cdf", path="/other/a.cdf"),
+        ]
+    )
+
+    assert sorted((file.name, file.path) for file in db.get_files()) == [
+        ("a.cdf", "/data/a.cdf"),
+        ("a.cdf", "/other/a.cdf"),
+        ("b.cdf", "/data/b.cdf"),
+    ]
+
+
+def test_insert_files_in_batches(tmp_path, monkeypatch):
+    monkeypatch.setattr(DB, "INSERT_BATCH_SIZE", 7)
+    db = createDB(tmp_path)
+
+    db.insert_files([File(name=f"{i}.cdf", path=f"/data/{i}.cdf") for i in range(50)])
+
+    assert len(db.get_files()) == 50
+
+
+def test_get_latest_file_finds_newest_version_in_catalogue(tmp_path):
+    db = createDB(tmp_path)
+
+    files = []
+
+    for name in [
+        "imap_mag_l1b_norm-mago_20250502_v000.cdf",
+        "imap_mag_l1b_norm-mago_20250502_v002.cdf",
+        "imap_mag_l1b_norm-mago_20250503_v003.cdf",
+        "imap_mag_l1b_norm-magi_20250502_v004.cdf",
+        "imap_mag_l1a_norm-mago_20250502_v005.cdf",
+    ]:
+        file = tmp_path / name
+        file.write_text(name)
+        files.append(DB.create_file_record(file))
+
+    db.insert_files(files)
+
+    latest = db.get_latest_file("mag", "l1b", "norm-mago", date(2025, 5, 2))
+    specific = db.get_latest_file("mag", "l1b", "norm-mago", date(2025, 5, 2), 0)
+
+    assert latest.name == "imap_mag_l1b_norm-mago_20250502_v002.cdf"
+    assert latest.size == len(latest.name)
+    assert len(latest.checksum) == 64
+    assert specific.name == "imap_mag_l1b_norm-mago_20250502_v000.cdf"
+    assert db.get_latest_file("mag", "l1b", "norm-mago", date(2025, 5, 4)) is None
+
+
+def test_prepare_work_file_finds_file_in_catalogue(tmp_path, monkeypatch):
+    db = createDB(tmp_path)
+    monkeypatch.setenv("SQLALCHEMY_URL", str(db.engine.url))
+
+    archive = tmp_path / "archive"
+    archive.mkdir()
+
+    for version in range(2):
+        file = archive / f"imap_mag_l1b_norm-mago_20250502_v00{version}.cdf"
+        file.write_text(file.name)
+        db.insert_files([DB.create_file_record(file)])
+
+    config = appConfig.AppConfig(
+        source=appConfig.Source(folder=tmp_path / "empty", catalogue=True),
+        work_folder=tmp_path / "work",
+        destination=appConfig.Destination(filename="result.cdf"),
+    )
+    config.source.folder.mkdir()
+    config.work_folder.mkdir()
+
+    workFile = prepareWorkFile("imap_mag_l1b_norm-mago_20250502_v*.cdf", config)
+
+    assert workFile.name == "imap_mag_l1b_norm-mago_20250502_v001.cdf"
+    assert workFile.parent == config.work_folder
+
+
+def test_db_instances_share_engine(tmp_path, monkeypatch):
+    monkeypatch.setenv("SQLALCHEMY_POOL_SIZE", "3")
+    url = f"sqlite:///{tmp_path / 'imap.db'}"
+
+    first = DB.DB(url)
+    second = DB.DB(url)
+
+    assert first.engine is second.engine
+    assert first.engine.pool.size() == 3
+    assert not first.engine.echo
@@ -0,0 +1,25 @@
+"""Tests for `appConfig` module."""
+
+import importlib.util
+
+import pytest
+from imap_mag import appConfig
+from pydantic import ValidationError
+
+
+def test_destination_format_without_its_dependency_fails_to_load(monkeypatch):
+    findSpec = importlib.util.find_spec
+
+    monkeypatch.setattr(
+        importlib.util,
+        "find_spec",
+        lambda name, *args: None if name == "pyarrow" else findSpec(name, *args),
+    )
+
+    with pytest.raises(ValidationError, match=r"pip install imap-mag\[parquet\]"):
+        appConfig.Destination(filename="result", format="parquet")
+
+
+@pytest.mark.parametrize("format", ["csv", "cdf"])
+def test_destination_format_without_dependencies_loads(format):
+    assert appConfig.Destination(filename="result", format=format).format == format
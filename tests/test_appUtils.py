@@ -0,0 +1,37 @@
+"""Tests for `appUtils` module."""
+
+import pytest
+from imap_mag.appUtils import readJsonFile, writeFileAtomically
+
+
+def test_write_file_atomically_replaces_file(tmp_path):
+    file = tmp_path / "state" / "state.json"
+
+    writeFileAtomically(file, '{"a": 1}')
+    writeFileAtomically(file, b'{"a": 2}')
+
+    assert readJsonFile(file) == {"a": 2}
+    assert list(file.parent.iterdir()) == [file]
+
+
+def test_interrupted_write_keeps_old_file(tmp_path):
+    file = tmp_path / "state.json"
+    writeFileAtomically(file, '{"a": 1}')
+
+    def interruptedWrite(f):
+        f.write(b'{"a"')
+        raise KeyboardInterrupt()
+
+    with pytest.raises(KeyboardInterrupt):
+        writeFileAtomically(file, interruptedWrite)
+
+    assert readJsonFile(file) == {"a": 1}
+    assert list(tmp_path.iterdir()) == [file]
+
+
+def test_read_missing_or_unreadable_json_file_is_none(tmp_path):
+    file = tmp_path / "state.json"
+    assert readJsonFile(file) is None
+
+    file.write_text("{")
+    assert readJsonFile(file) is None
@@ -0,0 +1,188 @@
+"""Tests for `CalibrationApplicator` class."""
+
+import logging
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pytest
+import xarray as xr
+from cdflib import cdfwrite
+from cdflib import xarray as cdfxarray
+from mag_toolkit import CDFLoader
+from mag_toolkit.calibration.CalibrationApplicator import CalibrationApplicator
+from mag_toolkit.calibration.calibrationFormat import CalibrationFormat
+from mag_toolkit.CDFLoader import (
+    can_stream_records,
+    get_time_range,
+    load_cdf,
+    map_cdf_records,
+)
+
+
+def create_dataset(dtype=np.int64) -> xr.Dataset:
+    epoch = np.array(
+        [
+            "2025-05-02T00:00",
+            "2025-05-02T06:00",
+            "2025-05-02T12:00",
+            "2025-05-02T18:00",
+        ],
+        dtype="datetime64[ns]",
+    )
+
+    return xr.Dataset(
+        {"vectors": (("epoch", "direction"), np.ones((4, 4), dtype=dtype))},
+        coords={"epoch": epoch, "direction": [0, 1, 2, 3]},
+    )
+
+
+def create_calibration(*offsets: tuple[list[datetime], list[float]]):
+    return CalibrationFormat(
+        valid_start=datetime(2025, 5, 2),
+        valid_end=datetime(2025, 5, 3),
+        calibrations=[
+            {
+                "timestamps": timestamps,
+                "offsets": {"X": x, "Y": [0] * len(x), "Z": [1] * len(x)},
+                "units": "nT",
+                "instrument": "MAGO",
+                "creation_timestamp": datetime(2025, 5, 1),
+                "method": "test",
+            }
+            for (timestamps, x) in offsets
+        ],
+    )
+
+
+@pytest.mark.parametrize(
+    "interpolation,expected",
+    [
+        ("step", [0, 0, 0, 12]),
+        ("linear", [0, 0, 6, 12]),
+    ],
+)
+def test_offsets_are_resolved_at_every_sample(interpolation, expected):
+    data = create_dataset()
+    calibration = create_calibration(
+        ([datetime(2025, 5, 2, 18), datetime(2025, 5, 2, 6)], [12, 0])
+    )
+
+    CalibrationApplicator(interpolation).applyToDataset(data, calibration)
+
+    # only x, y and z are calibrated, and samples before the first timestamp take its offset
+    assert data.vectors.dtype == np.float64
+    assert data.vectors.values[:, 0].tolist() == [1 + x for x in expected]
+    assert data.vectors.values[:, 1:].tolist() == [[1, 2, 1]] * 4
+
+
+def test_offsets_of_all_calibrations_are_added_together():
+    data = create_dataset(np.float64)
+    vectors = data.vectors.values
+    calibration = create_calibration(
+        ([datetime(2022, 3, 3)], [1]),
+        ([datetime(2025, 5, 2, 12)], [2]),
+    )
+
+    CalibrationApplicator().applyToDataset(data, calibration)
+
+    # floating point vectors are updated in place
+    assert data.vectors.values is vectors
+    assert vectors[:, 0].tolist() == [4, 4, 4, 4]
+    assert vectors[:, 2].tolist() == [3, 3, 3, 3]
+
+
+@pytest.mark.parametrize("chunkSize", [1000, 15647, 100_000])
+def test_apply_in_chunks_matches_apply_in_memory(tmp_path, chunkSize):
+    dataFile = Path("tests/data/2025/imap_mag_l1b_norm-mago_20250502_v000.cdf")
+    calibrationFile = tmp_path / "calibration.json"
+    calibrationFile.write_text(
+        create_calibration(
+            ([datetime(2025, 5, 2, 4), datetime(2025, 5, 2, 5)], [1, 3])
+        ).model_dump_json()
+    )
+
+    CalibrationApplicator("linear").apply(
+        calibrationFile, dataFile, tmp_path / "memory.cdf"
+    )
+    CalibrationApplicator("linear", chunkSize).apply(
+        calibrationFile, dataFile, tmp_path / "chunks.cdf"
+    )
+
+    expected = load_cdf(tmp_path / "memory.cdf")
+    actual = load_cdf(tmp_path / "chunks.cdf")
+
+    assert np.array_equal(actual.epoch.values, expected.epoch.values)
+    assert np.allclose(actual.vectors.values, expected.vectors.values)
+    assert actual.vectors.attrs["DEPEND_0"] == "epoch"
+
+
+@pytest.mark.parametrize("unsupported", ["compressed", "cdflib"])
+def test_apply_in_chunks_falls_back_to_apply_in_memory(
+    tmp_path, monkeypatch, caplog, unsupported
+):
+    dataFile = Path("tests/data/2025/imap_mag_l1b_norm-mago_20250502_v000.cdf")
+    calibrationFile = tmp_path / "calibration.json"
+    calibrationFile.write_text(
+        create_calibration(([datetime(2025, 5, 2, 4)], [1])).model_dump_json()
+    )
+
+    if unsupported == "compressed":
+        compressedFile = tmp_path / dataFile.name
+        cdfxarray.xarray_to_cdf(load_cdf(dataFile), str(compressedFile), compression=6)
+        dataFile = compressedFile
+    else:
+        monkeypatch.setattr(CDFLoader, "APPEND_RECORDS_CDFLIB_VERSIONS", [])
+
+    assert not can_stream_records(dataFile)
+
+    with pytest.raises(ValueError):
+        map_cdf_records(
+            dataFile, tmp_path / "mapped.cdf", "vectors", lambda records, _: records
+        )
+
+    CalibrationApplicator("step", 1000).apply(
+        calibrationFile, dataFile, tmp_path / "chunks.cdf"
+    )
+
+    # callers relying on bounded memory are warned
+    assert any(
+        record.levelno == logging.WARNING and "Cannot stream" in record.message
+        for record in caplog.records
+    )
+
+    CalibrationApplicator("step").apply(
+        calibrationFile, dataFile, tmp_path / "memory.cdf"
+    )
+
+    expected = load_cdf(tmp_path / "memory.cdf")
+    actual = load_cdf(tmp_path / "chunks.cdf")
+
+    assert np.allclose(actual.vectors.values, expected.vectors.values)
+
+
+def test_time_range_of_variable_without_records_is_none(tmp_path):
+    emptyFile = tmp_path / "empty.cdf"
+
+    with cdfwrite.CDF(emptyFile) as output:
+        output.write_var(
+            {
+                "Variable": "epoch",
+                "Data_Type": cdfwrite.CDF.CDF_TIME_TT2000,
+                "Num_Elements": 1,
+                "Rec_Vary": True,
+                "Dim_Sizes": [],
+            }
+        )
+        output.write_var(
+            {
+                "Variable": "vectors",
+                "Data_Type": cdfwrite.CDF.CDF_INT8,
+                "Num_Elements": 1,
+                "Rec_Vary": True,
+                "Dim_Sizes": [4],
+            },
+            {"DEPEND_0": "epoch"},
+        )
+
+    assert get_time_range(emptyFile, "vectors") is None
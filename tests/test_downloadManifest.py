@@ -0,0 +1,62 @@
+"""Tests for `downloadManifest` module."""
+
+import os
+
+from imap_mag import downloadManifest
+from imap_mag.downloadManifest import FileDownloadManifest
+
+REMOTE_PATH = "imap/mag/l1b/2025/05/imap_mag_l1b_norm-magi_20250502_v001.cdf"
+
+
+def test_manifest_finds_recorded_file_after_reload(tmp_path):
+    localFile = tmp_path / "imap_mag_l1b_norm-magi_20250502_v001.cdf"
+    localFile.write_bytes(b"science")
+
+    FileDownloadManifest(tmp_path).record(REMOTE_PATH, "v001", localFile)
+    manifest = FileDownloadManifest(tmp_path)
+
+    assert manifest.find(REMOTE_PATH, "v001") == localFile.absolute()
+    assert manifest.find(REMOTE_PATH, "v002") is None
+
+
+def test_manifest_ignores_missing_or_changed_files(tmp_path):
+    localFile = tmp_path / "imap_mag_l1b_norm-magi_20250502_v001.cdf"
+    localFile.write_bytes(b"science")
+
+    manifest = FileDownloadManifest(tmp_path)
+    manifest.record(REMOTE_PATH, "v001", localFile)
+
+    localFile.write_bytes(b"changed")
+    assert manifest.find(REMOTE_PATH, "v001") is None
+
+    localFile.unlink()
+    assert manifest.find(REMOTE_PATH, "v001") is None
+
+
+def test_manifest_only_hashes_files_whose_modification_time_changed(
+    tmp_path, monkeypatch
+):
+    localFile = tmp_path / "imap_mag_l1b_norm-magi_20250502_v001.cdf"
+    localFile.write_bytes(b"science")
+
+    manifest = FileDownloadManifest(tmp_path)
+    manifest.record(REMOTE_PATH, "v001", localFile)
+
+    hashed = []
+    getFileChecksum = downloadManifest.getFileChecksum
+
+    def countingGetFileChecksum(file):
+        hashed.append(file)
+        return getFileChecksum(file)
+
+    monkeypatch.setattr(downloadManifest, "getFileChecksum", countingGetFileChecksum)
+
+    assert manifest.find(REMOTE_PATH, "v001") == localFile.absolute()
+    assert hashed == []
+
+    # a file touched but not changed is hashed once, and its new time recorded
+    os.utime(localFile, ns=(0, 0))
+
+    assert FileDownloadManifest(tmp_path).find(REMOTE_PATH, "v001") is not None
+    assert FileDownloadManifest(tmp_path).find(REMOTE_PATH, "v001") is not None
+    assert len(hashed) == 1
@@ -0,0 +1,57 @@
+"""Tests for `externalSort` module."""
+
+import numpy as np
+import pytest
+from imap_mag.externalSort import ExternalSorter
+
+
+def test_merged_runs_match_stable_in_memory_sort(tmp_path):
+    rng = np.random.default_rng(42)
+
+    records = np.empty(5000, dtype=[("epoch", np.int64), ("value", np.int32)])
+    records["epoch"] = rng.integers(0, 50, len(records))
+    records["value"] = np.arange(len(records))
+
+    sorter = ExternalSorter(tmp_path)
+
+    # runs longer than a merge block, so they are read in several parts
+    for start in range(0, len(records), 1500):
+        sorter.addRun(records[start : start + 1500])
+
+    merged = np.concatenate(list(sorter.merge(blockSize=64)))
+    expected = records[np.argsort(records["epoch"], kind="stable")]
+
+    assert sorter.count == len(records)
+    assert np.array_equal(merged["epoch"], expected["epoch"])
+    assert np.array_equal(merged["value"], expected["value"])
+
+
+def test_merge_promotes_column_types_across_runs(tmp_path):
+    sorter = ExternalSorter(tmp_path)
+
+    sorter.addRun(np.array([(2, 1)], dtype=[("epoch", np.int64), ("value", np.int64)]))
+    sorter.addRun(
+        np.array([(1, 0.5)], dtype=[("epoch", np.int64), ("value", np.float64)])
+    )
+
+    (merged,) = list(sorter.merge(blockSize=10))
+
+    assert merged["value"].dtype == np.float64
+    assert merged["value"].tolist() == [0.5, 1.0]
+
+
+@pytest.mark.parametrize(
+    "second",
+    [
+        np.array([(1, 0)], dtype=[("epoch", np.int64), ("other", np.int64)]),
+        np.array([(1, "a")], dtype=[("epoch", np.int64), ("value", "U1")]),
+    ],
+)
+def test_merge_of_incompatible_runs_fails(tmp_path, second):
+    sorter = ExternalSorter(tmp_path)
+
+    sorter.addRun(np.array([(2, 1)], dtype=[("epoch", np.int64), ("value", np.int64)]))
+    sorter.addRun(second)
+
+    with pytest.raises(ValueError, match="run|types"):
+        list(sorter.merge(blockSize=10))
@@ -0,0 +1,256 @@
+"""Tests for `FetchScience` class."""
+
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from imap_mag.cli.fetchScience import FetchScience
+from imap_mag.client.sdcDataAccess import ISDCDataAccess
+from imap_mag.downloadManifest import FileDownloadManifest
+from imap_mag.watermarks import Watermarks
+
+
+class FakeSDCDataAccess(ISDCDataAccess):
+    """Fake SDC access that is slow, to check requests overlap."""
+
+    def __init__(
+        self, delay: float = 0.05, versions: int = 2, folder: Path | None = None
+    ) -> None:
+        self.delay = delay
+        self.versions = versions
+        self.folder = folder
+        self.queries: list[dict] = []
+        self.downloads: list[str] = []
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+    def __enter(self) -> None:
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+
+        time.sleep(self.delay)
+
+        with self.lock:
+            self.active -= 1
+
+    @staticmethod
+    def get_file_path(**options):
+        raise NotImplementedError
+
+    def upload(self, file_name: str) -> None:
+        raise NotImplementedError
+
+    def query(self, **options):
+        self.__enter()
+        self.queries.append(options)
+
+        files = []
+        date = options["start_date"]
+
+        # return files for every day up to and including the (exclusive) end date
+        while date <= options["end_date"]:
+            for version in reversed(range(self.versions)):
+                start_date = date.strftime("%Y%m%d")
+                files.append(
+                    {
+                        "file_path": f"imap_mag_{options['level']}_{options['descriptor']}_{start_date}_v00{version}.cdf",
+                        "descriptor": options["descriptor"],
+                        "start_date": start_date,
+                        "version": f"v00{version}",
+                    }
+                )
+
+            date += timedelta(days=1)
+
+        return files
+
+    def get_filename(self, **options):
+        raise NotImplementedError
+
+    def download(self, file_name: str) -> Path:
+        self.__enter()
+
+        with self.lock:
+            self.downloads.append(file_name)
+
+        if self.folder is None:
+            return Path(file_name)
+
+        file = self.folder / file_name
+        file.write_text(file_name)
+
+        return file
+
+
+def test_download_latest_science_runs_concurrently_in_order():
+    data_access = FakeSDCDataAccess()
+    fetch_science = FetchScience(data_access, max_workers=8)
+
+    (files, _) = fetch_science.download_latest_science(
+        level="l1b", start_date="2025-05-02", end_date="2025-05-04"
+    )
+
+    expected = [
+        Path(f"imap_mag_l1b_{mode}-{sensor}_{date}_v001.cdf")
+        for mode in ["norm", "burst"]
+        for date in ["20250502", "20250503", "20250504"]
+        for sensor in ["magi", "mago"]
+    ]
+
+    assert files == expected
+    assert 1 < data_access.max_active <= 8
+
+
+def test_download_latest_science_queries_each_descriptor_once():
+    data_access = FakeSDCDataAccess(delay=0)
+    fetch_science = FetchScience(data_access)
+
+    fetch_science.download_latest_science(
+        level="l1b", start_date="2025-05-02", end_date="2025-05-31"
+    )
+
+    assert sorted(query["descriptor"] for query in data_access.queries) == [
+        "burst-magi",
+        "burst-mago",
+        "norm-magi",
+        "norm-mago",
+    ]
+    assert all(query["version"] is None for query in data_access.queries)
+
+
+def test_download_latest_science_respects_concurrency_limit():
+    data_access = FakeSDCDataAccess(delay=0.01)
+    fetch_science = FetchScience(data_access, max_workers=1)
+
+    (files, _) = fetch_science.download_latest_science(
+        level="l1b", start_date="2025-05-02", end_date="2025-05-02"
+    )
+
+    assert len(files) == 4
+    assert data_access.max_active == 1
+
+
+def test_download_latest_science_skips_files_in_manifest(tmp_path):
+    manifest = FileDownloadManifest(tmp_path)
+
+    data_access = FakeSDCDataAccess(delay=0, folder=tmp_path)
+    FetchScience(data_access, manifest=manifest).download_latest_science(
+        level="l1b", start_date="2025-05-02", end_date="2025-05-02"
+    )
+
+    assert len(data_access.downloads) == 4
+
+    # only the file whose local copy was deleted needs downloading again
+    data_access = FakeSDCDataAccess(delay=0, folder=tmp_path)
+    (tmp_path / "imap_mag_l1b_burst-mago_20250502_v001.cdf").unlink()
+
+    (files, _) = FetchScience(
+        data_access, manifest=FileDownloadManifest(tmp_path)
+    ).download_latest_science(
+        level="l1b", start_date="2025-05-02", end_date="2025-05-02"
+    )
+
+    assert data_access.downloads == ["imap_mag_l1b_burst-mago_20250502_v001.cdf"]
+    assert len(files) == 4
+
+
+def fetch_and_record(
+    fetch_science: FetchScience, watermarks: Watermarks, end_date: str
+) -> list[Path]:
+    (files, ingested) = fetch_science.download_latest_science(
+        level="l1b", start_date="2025-05-02", end_date=end_date
+    )
+
+    for key, ingestedUntil in ingested.items():
+        watermarks.update(key, ingestedUntil)
+
+    return files
+
+
+def test_download_latest_science_does_not_update_watermarks(tmp_path):
+    watermarks = Watermarks(tmp_path)
+
+    (files, ingested) = FetchScience(
+        FakeSDCDataAccess(delay=0), watermarks=watermarks
+    ).download_latest_science(
+        level="l1b", start_date="2025-05-02", end_date="2025-05-04"
+    )
+
+    # the caller records the watermarks once the files are stored
+    assert len(files) == 12
+    assert ingested["science/l1b/norm-magi"] == datetime(2025, 5, 5)
+    assert watermarks.get("science/l1b/norm-magi") is None
+
+
+def test_download_latest_science_with_watermarks_only_queries_new_days(tmp_path):
+    watermarks = Watermarks(tmp_path)
+
+    fetch_and_record(
+        FetchScience(FakeSDCDataAccess(delay=0), watermarks=watermarks),
+        watermarks,
+        end_date="2025-05-04",
+    )
+
+    # the last day is queried again, as the overlap reaches back into it
+    data_access = FakeSDCDataAccess(delay=0)
+    files = fetch_and_record(
+        FetchScience(data_access, watermarks=watermarks, overlap=timedelta(hours=1)),
+        watermarks,
+        end_date="2025-05-05",
+    )
+
+    assert all(
+        query["start_date"] == datetime(2025, 5, 4) for query in data_access.queries
+    )
+    assert sorted(file.name for file in files) == sorted(
+        f"imap_mag_l1b_{mode}-{sensor}_{date}_v001.cdf"
+        for mode in ["norm", "burst"]
+        for date in ["20250504", "20250505"]
+        for sensor in ["magi", "mago"]
+    )
+    assert watermarks.get("science/l1b/norm-magi") == datetime(2025, 5, 6)
+
+    # nothing is queried once all days are ingested
+    data_access = FakeSDCDataAccess(delay=0)
+    fetch_and_record(
+        FetchScience(data_access, watermarks=watermarks),
+        watermarks,
+        end_date="2025-05-05",
+    )
+
+    assert data_access.queries == []
+
+
+def test_download_latest_science_with_watermarks_fetches_new_versions_in_overlap(
+    tmp_path,
+):
+    watermarks = Watermarks(tmp_path)
+    overlap = timedelta(hours=1)
+
+    fetch_and_record(
+        FetchScience(
+            FakeSDCDataAccess(delay=0), watermarks=watermarks, overlap=overlap
+        ),
+        watermarks,
+        end_date="2025-05-04",
+    )
+
+    # a new version of the last day is published after it was ingested
+    data_access = FakeSDCDataAccess(delay=0, versions=3)
+    files = fetch_and_record(
+        FetchScience(data_access, watermarks=watermarks, overlap=overlap),
+        watermarks,
+        end_date="2025-05-04",
+    )
+
+    assert all(
+        query["start_date"] == datetime(2025, 5, 4) for query in data_access.queries
+    )
+    assert sorted(file.name for file in files) == sorted(
+        f"imap_mag_l1b_{mode}-{sensor}_20250504_v002.cdf"
+        for mode in ["norm", "burst"]
+        for sensor in ["magi", "mago"]
+    )
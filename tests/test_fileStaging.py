@@ -0,0 +1,69 @@
+"""Tests for `fileStaging` module."""
+
+import os
+
+import pytest
+from imap_mag import fileStaging
+
+
+@pytest.fixture
+def source(tmp_path):
+    folder = tmp_path / "source"
+    folder.mkdir()
+
+    file = folder / "imap_mag_l1b_norm-mago_20250502_v000.cdf"
+    file.write_bytes(b"science data")
+
+    return file
+
+
+@pytest.fixture
+def work(tmp_path):
+    folder = tmp_path / "work"
+    folder.mkdir()
+
+    return folder
+
+
+@pytest.mark.parametrize("strategy", ["copy", "hardlink", "symlink", "reflink"])
+def test_stage_file_makes_file_available_in_work_folder(source, work, strategy):
+    workFile = fileStaging.stageFile(source, work, strategy)
+
+    assert workFile == work / source.name
+    assert workFile.read_bytes() == source.read_bytes()
+    assert workFile.is_symlink() == (strategy == "symlink")
+
+
+def test_stage_file_in_place_uses_source(source, work):
+    assert fileStaging.stageFile(source, work, "in-place") == source
+    assert not list(work.iterdir())
+
+
+def test_stage_file_avoids_copy_on_local_file_system(source, work, monkeypatch):
+    monkeypatch.setattr(fileStaging, "isRemoteFileSystem", lambda path: False)
+
+    workFile = fileStaging.stageFile(source, work)
+
+    assert workFile.read_bytes() == source.read_bytes()
+
+    # hard links would let writes to the work file change the source
+    assert source.stat().st_nlink == 1
+
+
+def test_stage_file_copies_from_remote_file_system_once(source, work, monkeypatch):
+    monkeypatch.setattr(fileStaging, "isRemoteFileSystem", lambda path: True)
+
+    workFile = fileStaging.stageFile(source, work)
+    assert not os.path.samefile(workFile, source)
+
+    # an unchanged file is not copied again
+    def failCopy(*args):
+        raise AssertionError("File should not be copied again")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(fileStaging.shutil, "copy2", failCopy)
+        assert fileStaging.stageFile(source, work) == workFile
+
+    # a changed file is copied again
+    source.write_bytes(b"new science data")
+    assert fileStaging.stageFile(source, work).read_bytes() == b"new science data"
@@ -0,0 +1,107 @@
+"""Tests for `folderIndex` module."""
+
+import os
+
+from imap_mag.folderIndex import FolderIndex
+
+
+def createFile(folder, name: str, mtime: int):
+    file = folder / name
+    file.write_text(name)
+    os.utime(file, ns=(mtime, mtime))
+
+    return file
+
+
+def test_find_returns_matches_most_recent_first(tmp_path):
+    source = tmp_path / "source"
+    source.mkdir()
+
+    createFile(source, "imap_mag_l1b_norm-mago_20250502_v000.cdf", 1_000)
+    createFile(source, "imap_mag_l1b_norm-mago_20250502_v001.cdf", 3_000)
+    createFile(source, "imap_mag_l1b_norm-magi_20250502_v000.cdf", 2_000)
+    (source / "imap_mag_l1b_norm-mago_folder").mkdir()
+
+    index = FolderIndex(source, tmp_path / "work")
+
+    assert [file.name for file in index.find("imap_mag_l1b_norm-mago_*.cdf")] == [
+        "imap_mag_l1b_norm-mago_20250502_v001.cdf",
+        "imap_mag_l1b_norm-mago_20250502_v000.cdf",
+    ]
+    assert [file.name for file in index.find("*magi*")] == [
+        "imap_mag_l1b_norm-magi_20250502_v000.cdf"
+    ]
+    assert index.find("imap_mag_l1b_norm-mago_folder") == []
+    assert index.find("missing.cdf") == []
+
+
+def test_find_ignores_case_where_file_system_does(tmp_path, monkeypatch):
+    # as on Windows, where the source folder is a network share
+    monkeypatch.setattr(os.path, "normcase", str.lower)
+
+    source = tmp_path / "source"
+    source.mkdir()
+
+    createFile(source, "IMAP_MAG_L1B_NORM-MAGO_20250502_V000.CDF", 1_000)
+    createFile(source, "imap_mag_l1b_norm-mago_20250503_v000.cdf", 2_000)
+    createFile(source, "imap_mag_l1c_norm-mago_20250502_v000.cdf", 3_000)
+
+    index = FolderIndex(source, tmp_path / "work")
+
+    assert [file.name for file in index.find("imap_mag_l1b_norm-mago_*.cdf")] == [
+        "imap_mag_l1b_norm-mago_20250503_v000.cdf",
+        "IMAP_MAG_L1B_NORM-MAGO_20250502_V000.CDF",
+    ]
+
+
+def test_index_is_reused_until_folder_changes(tmp_path, monkeypatch):
+    source = tmp_path / "source"
+    source.mkdir()
+    work = tmp_path / "work"
+
+    createFile(source, "a.cdf", 1_000)
+    FolderIndex(source, work).refresh()
+
+    # a new index loads the saved one and does not list the unchanged folder
+    def failScandir(path):
+        raise AssertionError("Folder should not be listed")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(os, "scandir", failScandir)
+        assert [file.name for file in FolderIndex(source, work).find("*.cdf")] == [
+            "a.cdf"
+        ]
+
+    # adding and removing files changes the folder, so the index is refreshed
+    createFile(source, "b.cdf", 2_000)
+    (source / "a.cdf").unlink()
+    os.utime(source, ns=(5_000, 5_000))
+
+    assert [file.name for file in FolderIndex(source, work).find("*.cdf")] == ["b.cdf"]
+
+
+def test_find_orders_files_modified_in_place_by_new_time(tmp_path):
+    source = tmp_path / "source"
+    source.mkdir()
+    work = tmp_path / "work"
+
+    createFile(source, "a.cdf", 1_000)
+    createFile(source, "b.cdf", 2_000)
+    createFile(source, "c.cdf", 3_000)
+    os.utime(source, ns=(5_000, 5_000))
+
+    assert [file.name for file in FolderIndex(source, work).find("*.cdf")] == [
+        "c.cdf",
+        "b.cdf",
+        "a.cdf",
+    ]
+
+    # modifying or removing files in place does not change the folder
+    createFile(source, "a.cdf", 4_000)
+    (source / "c.cdf").unlink()
+    os.utime(source, ns=(5_000, 5_000))
+
+    assert [file.name for file in FolderIndex(source, work).find("*.cdf")] == [
+        "a.cdf",
+        "b.cdf",
+    ]
@@ -0,0 +1,153 @@
+"""Tests for `imapProcessing` module."""
+
+import shutil
+import struct
+from pathlib import Path
+
+import imap_mag.appConfig as appConfig
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+from cdflib import xarray as cdfxarray
+from imap_mag import datasetWriter
+from imap_mag.imapProcessing import HKProcessor
+
+PACKET_FILE = Path("tests/data/2025/MAG_HSK_PW.pkts")
+
+
+def createStatusPacket(sequenceCount: int, met: int) -> bytes:
+    # MAG_HSK_STATUS (ApID 1064) packets are 18 bytes long
+    header = struct.pack(">HHH", 0x0800 | 1064, 0xC000 | sequenceCount, 18 - 7)
+    return header + struct.pack(">I", met) + bytes(8)
+
+
+def createProcessor(tmp_path: Path, hk_decoding: str = "columnar") -> HKProcessor:
+    config = appConfig.AppConfig(
+        source=appConfig.Source(folder=tmp_path),
+        work_folder=tmp_path,
+        destination=appConfig.Destination(filename="result.csv"),
+        packet_definition=appConfig.PacketDefinition(
+            hk=Path("src/imap_mag/xtce/tlm_20240724.xml")
+        ),
+        processing=appConfig.Processing(hk_decoding=hk_decoding),
+    )
+
+    processor = HKProcessor()
+    processor.initialize(config)
+
+    return processor
+
+
+def test_hk_processor_writes_one_file_per_apid(tmp_path):
+    mixedFile = tmp_path / "mixed.pkts"
+
+    with open(mixedFile, "wb") as f:
+        f.write(PACKET_FILE.read_bytes())
+
+        for i in range(3):
+            f.write(createStatusPacket(i, 483848304 + i))
+
+    results = createProcessor(tmp_path).process(mixedFile)
+
+    assert sorted(result.name for result in results) == [
+        "MAG_HSK_PW.csv",
+        "MAG_HSK_STATUS.csv",
+    ]
+
+    with open(next(r for r in results if r.name == "MAG_HSK_STATUS.csv")) as f:
+        assert len(f.readlines()) == 4
+
+
+def test_hk_processor_decoding_modes_give_same_output(tmp_path):
+    packetFile = tmp_path / PACKET_FILE.name
+    shutil.copy(PACKET_FILE, packetFile)
+
+    (columnar,) = createProcessor(tmp_path, "columnar").process(packetFile)
+    columnarOutput = columnar.read_text()
+
+    (packet,) = createProcessor(tmp_path, "packet").process(packetFile)
+
+    assert packet.read_text() == columnarOutput
+
+
+@pytest.mark.parametrize(
+    "format,module,reader",
+    [
+        ("cdf", "cdflib", lambda file: cdfxarray.cdf_to_xarray(str(file))),
+        ("netcdf", "netCDF4", lambda file: xr.load_dataset(file)),
+        ("parquet", "pyarrow", lambda file: pd.read_parquet(file)),
+    ],
+)
+def test_hk_processor_writes_binary_formats_with_typed_columns(
+    tmp_path, format, module, reader
+):
+    pytest.importorskip(module)
+
+    packetFile = tmp_path / PACKET_FILE.name
+    shutil.copy(PACKET_FILE, packetFile)
+
+    processor = createProcessor(tmp_path)
+    processor.format = format
+
+    (result,) = processor.process(packetFile)
+    data = reader(result)
+
+    assert result.suffix == datasetWriter.FILE_EXTENSIONS[format]
+    assert len(data["shcoarse"]) == 1334
+    assert data["shcoarse"].dtype == np.uint32
+    assert data["p1v5v"].dtype == np.float64
+
+
+@pytest.mark.parametrize("hk_decoding", ["columnar", "packet"])
+@pytest.mark.parametrize("chunkSize", [7, 97, 10000])
+def test_hk_processor_in_chunks_matches_in_memory_processing(
+    tmp_path, hk_decoding, chunkSize
+):
+    packetFile = tmp_path / PACKET_FILE.name
+    shutil.copy(PACKET_FILE, packetFile)
+
+    processor = createProcessor(tmp_path, hk_decoding)
+
+    (inMemory,) = processor.process(packetFile)
+    expected = inMemory.read_text()
+
+    processor.chunkSize = chunkSize
+    (inChunks,) = processor.process(packetFile)
+
+    assert inChunks.read_text() == expected
+    assert [path.name for path in inChunks.parent.iterdir()] == ["MAG_HSK_PW.csv"]
+
+
+@pytest.mark.parametrize("format,module", [("cdf", "cdflib"), ("parquet", "pyarrow")])
+def test_hk_processor_in_chunks_writes_binary_formats(tmp_path, format, module):
+    pytest.importorskip(module)
+
+    packetFile = tmp_path / PACKET_FILE.name
+    shutil.copy(PACKET_FILE, packetFile)
+
+    processor = createProcessor(tmp_path)
+    processor.format = format
+    processor.chunkSize = 100
+
+    (result,) = processor.process(packetFile)
+
+    assert result.suffix == datasetWriter.FILE_EXTENSIONS[format]
+    assert not list(tmp_path.rglob("*.npy"))
+
+
+@pytest.mark.parametrize("chunkSize", [None, 100])
+def test_hk_processor_does_not_write_to_input_folder(tmp_path, chunkSize):
+    sourceFolder = tmp_path / "source"
+    sourceFolder.mkdir()
+
+    packetFile = sourceFolder / PACKET_FILE.name
+    shutil.copy(PACKET_FILE, packetFile)
+
+    processor = createProcessor(tmp_path / "work")
+    processor.chunkSize = chunkSize
+
+    (result,) = processor.process(packetFile)
+
+    assert result == tmp_path / "work" / "process" / "MAG_HSK_PW" / "MAG_HSK_PW.csv"
+    assert [path.name for path in sourceFolder.iterdir()] == ["MAG_HSK_PW.pkts"]
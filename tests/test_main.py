@@ -5,10 +5,17 @@
 import json
 import os
 import re
+import shutil
+from datetime import datetime
 from pathlib import Path
+from typing import ClassVar
 
+import imap_mag.client.webPODA
+import imap_mag.main
 import pytest
+from imap_mag.appUtils import APID_TO_PACKET
 from imap_mag.main import app
+from imap_mag.watermarks import Watermarks
 from typer.testing import CliRunner
 
 from .testUtils import create_serialize_config
@@ -80,6 +87,84 @@ def test_process_with_binary_hk_converts_to_csv():
         assert expectedNumRows == len(lines)
 
 
+def test_process_names_output_with_extension_of_format(tmp_path):
+    # Set up.
+    pytest.importorskip("pyarrow")
+
+    config_file = tmp_path / "hk_process.yaml"
+    config_file.write_text(
+        Path("tests/config/hk_process.yaml")
+        .read_text()
+        .replace("filename: result.csv", "filename: result.csv\n  format: parquet")
+    )
+
+    # Exercise.
+    result = runner.invoke(
+        app, ["process", "--config", str(config_file), "MAG_HSK_PW.pkts"]
+    )
+
+    # Verify.
+    assert result.exit_code == 0
+    assert Path("output/result.parquet").exists()
+    assert not Path("output/result.csv").exists()
+
+
+def test_process_batch_processes_every_file_in_date_range(tmp_path):
+    # Set up.
+    source = tmp_path / "source"
+    source.mkdir()
+
+    for day in ["20250502", "20250503", "20250504", "20250601"]:
+        shutil.copy("tests/data/2025/MAG_HSK_PW.pkts", source / f"power_{day}.pkts")
+
+    config_file = tmp_path / "hk_process.yaml"
+    config_file.write_text(
+        Path("tests/config/hk_process.yaml")
+        .read_text()
+        .replace("tests/data/2025", str(source))
+    )
+
+    # Exercise.
+    result = runner.invoke(
+        app,
+        [
+            "process",
+            "--config",
+            str(config_file),
+            "--batch",
+            "--start-date",
+            "2025-05-01",
+            "--end-date",
+            "2025-05-31",
+            "--workers",
+            "2",
+            "power_%Y%m%d.pkts",
+        ],
+    )
+
+    print("\n" + str(result.stdout))
+
+    # Verify.
+    assert result.exit_code == 0
+
+    summary = json.loads(Path("output/process-summary.json").read_text())
+
+    assert summary["failures"] == {}
+    assert sorted(summary["outputs"]) == [
+        "power_20250502.pkts",
+        "power_20250503.pkts",
+        "power_20250504.pkts",
+    ]
+
+    for day in ["20250502", "20250503", "20250504"]:
+        with open(f"output/power_{day}/MAG_HSK_PW.csv") as f:
+            assert len(f.readlines()) == 1335
+
+    # workers log to the log file of the run
+    (logFile,) = Path(".work").glob("*.log")
+    assert "Staged" in logFile.read_text()
+
+
 def test_fetch_binary_downloads_hk_from_webpoda(wiremock_manager):  # noqa: F811
     # Set up.
     binary_file = os.path.abspath("tests/data/2025/MAG_HSK_PW.pkts")
@@ -123,6 +208,186 @@ def test_fetch_binary_downloads_hk_from_webpoda(wiremock_manager):  # noqa: F811
         assert output.read() == input.read()
 
 
+class FakeWebPODA:
+    """Fake WebPODA client writing the packet name to the downloaded file."""
+
+    downloaded: ClassVar[list[str]] = []
+    start_dates: ClassVar[list[datetime]] = []
+    closed: ClassVar[int] = 0
+    failing: ClassVar[set[str]] = set()
+
+    def __init__(self, auth_code, output_dir, webpoda_url=None, **kwargs) -> None:
+        self.output_dir = output_dir
+
+    def download(self, **options) -> Path:
+        FakeWebPODA.downloaded.append(options["packet"])
+        FakeWebPODA.start_dates.append(options["start_date"])
+
+        if options["packet"] in FakeWebPODA.failing:
+            raise RuntimeError(f"{options['packet']} is unavailable")
+
+        file_path = self.output_dir / (options["packet"] + ".bin")
+        file_path.write_text(options["packet"])
+
+        return file_path
+
+    def close(self) -> None:
+        FakeWebPODA.closed += 1
+
+
+@pytest.mark.parametrize(
+    "apids,packets",
+    [
+        (["1063", "1064"], ["MAG_HSK_PW", "MAG_HSK_STATUS"]),
+        (["all"], list(APID_TO_PACKET.values())),
+    ],
+)
+def test_fetch_binary_downloads_several_apids(monkeypatch, apids, packets):
+    # Set up.
+    monkeypatch.setattr(imap_mag.client.webPODA, "WebPODA", FakeWebPODA)
+    FakeWebPODA.downloaded = []
+
+    (_, config_file) = create_serialize_config(destination_file="power.pkts")
+
+    # Exercise.
+    result = runner.invoke(
+        app,
+        [
+            "fetch-binary",
+            "--auth-code",
+            "12345",
+            "--config",
+            config_file,
+            *[option for apid in apids for option in ("--apid", apid)],
+            "--start-date",
+            "2025-05-02",
+            "--end-date",
+            "2025-05-03",
+        ],
+    )
+
+    print("\n" + str(result.stdout))
+
+    # Verify.
+    assert result.exit_code == 0
+    assert sorted(FakeWebPODA.downloaded) == sorted(packets)
+
+    for packet in packets:
+        assert Path(f"output/{packet}.bin").read_text() == packet
+
+
+def test_fetch_binary_incremental_only_downloads_new_data(monkeypatch):
+    # Set up.
+    monkeypatch.setattr(imap_mag.client.webPODA, "WebPODA", FakeWebPODA)
+    FakeWebPODA.downloaded = []
+    FakeWebPODA.start_dates = []
+
+    (_, config_file) = create_serialize_config(destination_file="power.pkts")
+
+    def fetch(end_date: str):
+        return runner.invoke(
+            app,
+            [
+                "fetch-binary",
+                "--auth-code",
+                "12345",
+                "--config",
+                config_file,
+                "--apid",
+                "1063",
+                "--start-date",
+                "2025-05-02",
+                "--end-date",
+                end_date,
+                "--incremental",
+            ],
+        )
+
+    # Exercise.
+    results = [fetch("2025-05-03"), fetch("2025-05-03"), fetch("2025-05-04")]
+
+    # Verify.
+    assert all(result.exit_code == 0 for result in results)
+    assert FakeWebPODA.downloaded == ["MAG_HSK_PW", "MAG_HSK_PW"]
+
+    # data from an hour before the previous download ended is downloaded again
+    assert FakeWebPODA.start_dates == [
+        datetime(2025, 5, 2),
+        datetime(2025, 5, 2, 23),
+    ]
+
+
+def test_fetch_binary_only_moves_watermarks_once_all_packets_are_copied(
+    monkeypatch,
+):
+    # Set up.
+    monkeypatch.setattr(imap_mag.client.webPODA, "WebPODA", FakeWebPODA)
+    monkeypatch.setattr(FakeWebPODA, "failing", {"MAG_HSK_STATUS"})
+
+    (_, config_file) = create_serialize_config(destination_file="power.pkts")
+
+    # Exercise.
+    result = runner.invoke(
+        app,
+        [
+            "fetch-binary",
+            "--auth-code",
+            "12345",
+            "--config",
+            config_file,
+            "--apid",
+            "1063",
+            "--apid",
+            "1064",
+            "--start-date",
+            "2025-05-02",
+            "--end-date",
+            "2025-05-03",
+            "--incremental",
+        ],
+    )
+
+    # Verify.
+    assert result.exit_code != 0
+    assert Watermarks(Path(".work")).get("binary/MAG_HSK_PW") is None
+
+
+def test_fetch_binary_closes_client_when_fetching_fails(monkeypatch):
+    # Set up.
+    monkeypatch.setattr(imap_mag.client.webPODA, "WebPODA", FakeWebPODA)
+    FakeWebPODA.closed = 0
+
+    def failingAsCompleted(futures):
+        raise OSError("interrupted")
+
+    monkeypatch.setattr(imap_mag.main, "as_completed", failingAsCompleted)
+
+    (_, config_file) = create_serialize_config(destination_file="power.pkts")
+
+    # Exercise.
+    result = runner.invoke(
+        app,
+        [
+            "fetch-binary",
+            "--auth-code",
+            "12345",
+            "--config",
+            config_file,
+            "--apid",
+            "1063",
+            "--start-date",
+            "2025-05-02",
+            "--end-date",
+            "2025-05-03",
+            "--incremental",
+        ],
+    )
+
+    # Verify.
+    assert isinstance(result.exception, OSError)
+    assert FakeWebPODA.closed == 1
+
+
 def test_fetch_science_downloads_cdf_from_sdc(wiremock_manager):  # noqa: F811
     # Set up.
     query_response: list[dict[str, str]] = [
@@ -143,7 +408,7 @@ def test_fetch_science_downloads_cdf_from_sdc(wiremock_manager):  # noqa: F811
     )
 
     wiremock_manager.add_string_mapping(
-        "/query?instrument=mag&data_level=l1b&descriptor=norm-magi&start_date=20250502&version=latest&extension=cdf",
+        "/query?instrument=mag&data_level=l1b&descriptor=norm-magi&start_date=20250502&end_date=20250503&extension=cdf",
         json.dumps(query_response),
         priority=1,
     )
@@ -154,8 +419,8 @@ def test_fetch_science_downloads_cdf_from_sdc(wiremock_manager):  # noqa: F811
     wiremock_manager.add_string_mapping(
         re.escape("/query?instrument=mag&data_level=l1b&descriptor=")
         + ".*"
-        + re.escape("&start_date=20250502&version=latest&extension=cdf"),
-        json.dumps({}),
+        + re.escape("&start_date=20250502&end_date=20250503&extension=cdf"),
+        json.dumps([]),
         is_pattern=True,
         priority=2,
     )
@@ -212,6 +477,60 @@ def test_calibration_creates_calibration_file():
     assert Path("output/calibration.json").exists()
 
 
+def test_calibration_does_not_write_through_staged_calibration(tmp_path):
+    # Set up.
+    staged = tmp_path / "calibration.json"
+    staged.write_text("staged")
+
+    os.makedirs(".work")
+    os.symlink(staged, ".work/calibration.json")
+
+    # Exercise.
+    result = runner.invoke(
+        app,
+        [
+            "calibrate",
+            "--config",
+            "tests/config/calibration_config.yaml",
+            "--method",
+            "SpinAxisCalibrator",
+            "imap_mag_l1a_norm-mago_20250502_v000.cdf",
+        ],
+    )
+
+    # Verify.
+    assert result.exit_code == 0
+    assert staged.read_text() == "staged"
+    assert Path("output/calibration.json").read_text() != "staged"
+
+
+def test_application_with_missing_source_folder_aborts(tmp_path):
+    # Set up.
+    config_file = tmp_path / "calibration_application_config.yaml"
+    config_file.write_text(
+        Path("tests/config/calibration_application_config.yaml")
+        .read_text()
+        .replace("tests/data/2025", str(tmp_path / "missing"))
+    )
+
+    # Exercise.
+    result = runner.invoke(
+        app,
+        [
+            "apply",
+            "--config",
+            str(config_file),
+            "--calibration",
+            "calibration.json",
+            "imap_mag_l1a_norm-mago_20250502_v000.cdf",
+        ],
+    )
+
+    # Verify.
+    assert result.exit_code != 0
+    assert not isinstance(result.exception, AttributeError)
+
+
 def test_application_creates_L2_file():
     result = runner.invoke(
         app,
@@ -228,3 +547,65 @@ def test_application_creates_L2_file():
     print("\n" + str(result.stdout))
     assert result.exit_code == 0
     assert Path("output/L2.cdf").exists()
+
+
+def test_application_batch_creates_L2_file_for_every_file_in_date_range(tmp_path):
+    # Set up.
+    source = tmp_path / "source"
+    source.mkdir()
+
+    shutil.copy("tests/data/2025/calibration.json", source)
+
+    for day in ["20250502", "20250503", "20250601"]:
+        shutil.copy(
+            "tests/data/2025/imap_mag_l1b_norm-mago_20250502_v000.cdf",
+            source / f"imap_mag_l1b_norm-mago_{day}_v000.cdf",
+        )
+
+    config_file = tmp_path / "calibration_application_config.yaml"
+    config_file.write_text(
+        Path("tests/config/calibration_application_config.yaml")
+        .read_text()
+        .replace("tests/data/2025", str(source))
+    )
+
+    # Exercise.
+    result = runner.invoke(
+        app,
+        [
+            "apply",
+            "--config",
+            str(config_file),
+            "--calibration",
+            "calibration.json",
+            "--batch",
+            "--start-date",
+            "2025-05-01",
+            "--end-date",
+            "2025-05-31",
+            "--workers",
+            "2",
+            "imap_mag_l1b_norm-mago_%Y%m%d_v*.cdf",
+        ],
+    )
+
+    print("\n" + str(result.stdout))
+
+    # Verify.
+    assert result.exit_code == 0
+
+    summary = json.loads(Path("output/apply-summary.json").read_text())
+
+    assert summary["failures"] == {}
+    assert summary["outputs"] == {
+        f"imap_mag_l1b_norm-mago_{day}_v000.cdf": [
+            f"imap_mag_l2_norm-mago_{day}_v000.cdf"
+        ]
+        for day in ["20250502", "20250503"]
+    }
+    assert Path("output/imap_mag_l2_norm-mago_20250502_v000.cdf").exists()
+    assert Path("output/imap_mag_l2_norm-mago_20250503_v000.cdf").exists()
+
+    # workers log to the log file of the run
+    (logFile,) = Path(".work").glob("*.log")
+    assert re.search(r"Staged \S+_20250502_v000.cdf", logFile.read_text())
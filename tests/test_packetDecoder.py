@@ -0,0 +1,79 @@
+"""Tests for `packetDecoder` module."""
+
+from pathlib import Path
+
+import numpy as np
+from imap_mag import packetDecoder, xtceCache
+from space_packet_parser import parser
+
+XTCE_FILE = Path("src/imap_mag/xtce/tlm_20240724.xml")
+PACKET_FILE = Path("tests/data/2025/MAG_HSK_PW.pkts")
+
+
+def test_split_packets_finds_every_packet():
+    data = PACKET_FILE.read_bytes()
+
+    (apids, offsets, lengths) = packetDecoder.splitPackets(data)
+
+    assert len(apids) == 1334
+    assert np.all(apids == 1063)
+    assert offsets[-1] + lengths[-1] == len(data)
+
+
+def test_columnar_decoding_matches_packet_by_packet_decoding():
+    packetDefinition = xtceCache.loadPacketDefinition(XTCE_FILE)
+
+    with open(PACKET_FILE, "rb") as binaryData:
+        expected = [
+            {
+                key: value.derived_value or value.raw_value
+                for key, value in (packet.data | packet.header).items()
+            }
+            for packet in parser.PacketParser(packetDefinition).generator(binaryData)
+        ]
+
+    decoded = packetDecoder.decodePackets(PACKET_FILE.read_bytes(), packetDefinition)
+    records = decoded[1063]
+
+    assert list(decoded.keys()) == [1063]
+    assert list(records.dtype.names) == list(expected[0].keys())
+    assert records["MAG_HSK_PW_SHCOARSE"].dtype == np.uint32
+    assert records["MAG_HSK_PW_P1V5V"].dtype == np.float64
+
+    for name in records.dtype.names:
+        assert records[name].tolist() == [packet[name] for packet in expected]
+
+
+def test_truncated_packet_is_ignored():
+    data = PACKET_FILE.read_bytes()
+
+    (apids, _, _) = packetDecoder.splitPackets(data[:-10])
+
+    assert len(apids) == 1333
+
+
+def test_layout_is_not_used_for_packets_resolving_to_other_containers():
+    packetDefinition = xtceCache.loadPacketDefinition(XTCE_FILE)
+    data = PACKET_FILE.read_bytes()
+    (_, offsets, lengths) = packetDecoder.splitPackets(data)
+
+    layout = packetDecoder.getPacketLayout(
+        packetDefinition, data[offsets[0] : offsets[0] + lengths[0]]
+    )
+
+    assert layout.criteriaValues == {"PKT_APID": 1063}
+
+    # as if worked out from a packet of the same ApID and length, but another container
+    layout.criteriaValues["PKT_APID"] = 1064
+    layouts = {(1063, int(lengths[0])): layout}
+
+    packets = np.frombuffer(data, dtype=np.uint8)[
+        offsets[:, None] + np.arange(layout.lengthInBytes)
+    ]
+    assert packetDecoder.decodeColumns(packets, layout) is None
+
+    decoded = packetDecoder.decodePackets(data, packetDefinition, layouts)
+    expected = packetDecoder.decodePackets(data, packetDefinition)
+
+    assert decoded[1063].dtype.names == expected[1063].dtype.names
+    assert decoded[1063].tolist() == expected[1063].tolist()
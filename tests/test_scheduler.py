@@ -0,0 +1,217 @@
+"""Tests for the pipeline scheduler."""
+
+from datetime import datetime
+from pathlib import Path
+from typing import Annotated
+
+import pytest
+import typer
+import yaml
+from imap_mag import appConfig
+from imap_mag.main import app
+from imap_mag.scheduler import PipelineScheduler
+from typer.testing import CliRunner
+
+runner = CliRunner()
+
+
+def create_fake_commands(calls: list[list], failing: set[str] = set()) -> typer.Typer:
+    commands = typer.Typer()
+
+    @commands.command()
+    def fetch_binary(
+        apid: Annotated[list[str], typer.Option()],
+        start_date: Annotated[str, typer.Option()],
+        end_date: Annotated[str, typer.Option()],
+        config: Annotated[Path, typer.Option()] = Path("config.yaml"),
+    ):
+        calls.append(["fetch-binary", apid, start_date, end_date])
+
+        if "fetch-binary" in failing:
+            raise typer.Abort()
+
+    @commands.command()
+    def process(
+        file: str,
+        config: Annotated[Path, typer.Option()] = Path("config.yaml"),
+        start_date: Annotated[str | None, typer.Option()] = None,
+        end_date: Annotated[str | None, typer.Option()] = None,
+    ):
+        calls.append(["process", file, start_date, end_date])
+
+    return commands
+
+
+def create_scheduler(
+    tmp_path: Path, calls: list[list], failing: set[str] = set(), **kwargs
+) -> PipelineScheduler:
+    config = appConfig.PipelineConfig(
+        work_folder=tmp_path,
+        steps=[
+            appConfig.PipelineStep(
+                command="fetch-binary",
+                config="a.yaml",
+                args=["--apid", "1063"],
+                window=True,
+            ),
+            appConfig.PipelineStep(
+                command="process", config="b.yaml", args=["power.pkts"]
+            ),
+        ],
+        **kwargs,
+    )
+
+    return PipelineScheduler(
+        config, typer.main.get_command(create_fake_commands(calls, failing))
+    )
+
+
+def test_scheduler_runs_steps_from_start_date_and_then_from_last_success(tmp_path):
+    # Set up.
+    calls: list[list] = []
+    scheduler = create_scheduler(
+        tmp_path, calls, start_date=datetime(2025, 5, 2), interval=3600
+    )
+
+    # Exercise.
+    assert scheduler.runOnce(now=datetime(2025, 5, 3))
+    assert scheduler.runOnce(now=datetime(2025, 5, 3, 1))
+
+    # Verify.
+    assert calls == [
+        ["fetch-binary", ["1063"], "2025-05-02T00:00:00", "2025-05-03T00:00:00"],
+        ["process", "power.pkts", None, None],
+        ["fetch-binary", ["1063"], "2025-05-03T00:00:00", "2025-05-03T01:00:00"],
+        ["process", "power.pkts", None, None],
+    ]
+    assert scheduler.lastSuccess == datetime(2025, 5, 3, 1)
+
+
+def test_only_windowed_fetch_steps_can_be_given_time_range():
+    with pytest.raises(ValueError):
+        appConfig.PipelineStep(
+            command="process", config="b.yaml", args=["power.pkts"], window=True
+        )
+
+
+def test_scheduler_runs_database_steps_with_imap_db(tmp_path):
+    # Set up.
+    calls: list[list] = []
+    databaseCommands = typer.Typer()
+
+    @databaseCommands.command()
+    def query_db():
+        calls.append(["query-db"])
+
+    @databaseCommands.command()
+    def drop_db():
+        raise AssertionError("Only query-db should run")
+
+    config = appConfig.PipelineConfig(
+        work_folder=tmp_path,
+        start_date=datetime(2025, 5, 2),
+        steps=[
+            appConfig.PipelineStep(
+                command="process", config="b.yaml", args=["power.pkts"]
+            ),
+            appConfig.PipelineStep(command="query-db"),
+        ],
+    )
+    scheduler = PipelineScheduler(
+        config,
+        typer.main.get_command(create_fake_commands(calls)),
+        databaseCommands=typer.main.get_command(databaseCommands),
+    )
+
+    # Exercise.
+    succeeded = scheduler.runOnce(now=datetime(2025, 5, 3))
+
+    # Verify.
+    assert succeeded
+    assert calls == [["process", "power.pkts", None, None], ["query-db"]]
+
+
+@pytest.mark.parametrize(
+    "step",
+    [
+        {"command": "process", "args": ["power.pkts"]},
+        {"command": "query-db", "config": "a.yaml"},
+    ],
+)
+def test_only_imap_mag_steps_have_config(step):
+    with pytest.raises(ValueError):
+        appConfig.PipelineStep(**step)
+
+
+def test_scheduler_does_not_record_failed_runs(tmp_path):
+    # Set up.
+    calls: list[list] = []
+    scheduler = create_scheduler(
+        tmp_path, calls, {"fetch-binary"}, start_date=datetime(2025, 5, 2)
+    )
+
+    # Exercise.
+    succeeded = scheduler.runOnce(now=datetime(2025, 5, 3))
+
+    # Verify.
+    assert not succeeded
+    assert [call[0] for call in calls] == ["fetch-binary"]
+    assert scheduler.lastSuccess is None
+
+
+def test_scheduler_skips_runs_with_no_new_data(tmp_path):
+    # Set up.
+    calls: list[list] = []
+    scheduler = create_scheduler(
+        tmp_path,
+        calls,
+        start_date=datetime(2025, 5, 2),
+        end_date=datetime(2025, 5, 3),
+    )
+    sleeps: list[float] = []
+
+    def sleep(seconds: float) -> None:
+        sleeps.append(seconds)
+
+        if len(sleeps) == 2:
+            raise KeyboardInterrupt()
+
+    # Exercise.
+    with pytest.raises(KeyboardInterrupt):
+        scheduler.serve(sleep=sleep)
+
+    # Verify.
+    assert [call[0] for call in calls] == ["fetch-binary", "process"]
+    assert len(sleeps) == 2
+
+
+def test_schedule_runs_pipeline_once(tmp_path):
+    # Set up.
+    pipelineFile = tmp_path / "pipeline.yaml"
+    pipelineFile.write_text(
+        yaml.safe_dump(
+            {
+                "work-folder": str(tmp_path / "work"),
+                "steps": [
+                    {
+                        "command": "process",
+                        "config": "tests/config/hk_process.yaml",
+                        "args": ["MAG_HSK_PW.pkts"],
+                    }
+                ],
+            }
+        )
+    )
+
+    # Exercise.
+    result = runner.invoke(app, ["schedule", "--config", str(pipelineFile), "--once"])
+
+    print("\n" + str(result.stdout))
+
+    # Verify.
+    assert result.exit_code == 0
+    assert (tmp_path / "work" / "pipeline-state.json").exists()
+
+    # steps log to the log file of the scheduler
+    (logFile,) = (tmp_path / "work").glob("*.log")
+    assert "Staged" in logFile.read_text()
@@ -0,0 +1,59 @@
+"""Tests for the start-up time of the CLI."""
+
+import json
+import os
+import subprocess
+import sys
+
+# seconds to import the CLI, excluding interpreter start-up
+STARTUP_BUDGET = 1.0
+
+HEAVY_MODULES = [
+    "cdflib",
+    "imap_data_access",
+    "pandas",
+    "requests",
+    "space_packet_parser",
+    "sqlalchemy",
+    "xarray",
+]
+
+
+def import_cli() -> dict:
+    """Import the CLI in a fresh interpreter, and return the import time and the heavy modules loaded."""
+
+    script = f"""
+import json, sys, time
+
+start = time.perf_counter()
+import imap_mag.main
+duration = time.perf_counter() - start
+
+print(json.dumps({{
+    "duration": duration,
+    "modules": [module for module in {HEAVY_MODULES!r} if module in sys.modules],
+}}))
+"""
+
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        capture_output=True,
+        check=True,
+        env={**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)},
+        text=True,
+    )
+
+    return json.loads(result.stdout)
+
+
+def test_cli_does_not_import_heavy_dependencies():
+    assert import_cli()["modules"] == []
+
+
+def test_cli_imports_within_budget():
+    # take the best of a few runs, to not fail on a busy machine
+    duration = min(import_cli()["duration"] for _ in range(3))
+
+    assert (
+        duration < STARTUP_BUDGET
+    ), f"Importing the CLI took {duration:.2f}s, over the {STARTUP_BUDGET}s budget."
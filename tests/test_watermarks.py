@@ -0,0 +1,32 @@
+"""Tests for `Watermarks` class."""
+
+from datetime import datetime, timedelta
+
+from imap_mag.watermarks import Watermarks
+
+
+def test_watermarks_only_move_forward_and_persist(tmp_path):
+    watermarks = Watermarks(tmp_path)
+
+    watermarks.update("binary/MAG_HSK_PW", datetime(2025, 5, 3))
+    watermarks.update("binary/MAG_HSK_PW", datetime(2025, 5, 2))
+
+    assert Watermarks(tmp_path).get("binary/MAG_HSK_PW") == datetime(2025, 5, 3)
+    assert Watermarks(tmp_path).get("binary/MAG_HSK_STATUS") is None
+
+
+def test_watermarks_start_before_watermark_by_overlap(tmp_path):
+    watermarks = Watermarks(tmp_path)
+    watermarks.update("binary/MAG_HSK_PW", datetime(2025, 5, 3))
+
+    overlap = timedelta(hours=1)
+
+    assert watermarks.getStart(
+        "binary/MAG_HSK_PW", datetime(2025, 5, 2), overlap
+    ) == datetime(2025, 5, 2, 23)
+    assert watermarks.getStart(
+        "binary/MAG_HSK_PW", datetime(2025, 5, 4), overlap
+    ) == datetime(2025, 5, 4)
+    assert watermarks.getStart(
+        "binary/MAG_HSK_STATUS", datetime(2025, 5, 2), overlap
+    ) == datetime(2025, 5, 2)
@@ -0,0 +1,143 @@
+"""Tests for `WebPODA` class."""
+
+import re
+from datetime import datetime, timedelta
+
+import pytest
+import requests
+from imap_mag.client.httpSession import createSession
+from imap_mag.client.webPODA import WebPODA
+
+
+class FakeResponse:
+    """Streamed response returning the requested start time as content."""
+
+    def __init__(self, url: str, interrupted: bool) -> None:
+        self.content = re.search(r"time%3E=([^&]*)", url).group(1).encode()
+        self.interrupted = interrupted
+
+    def raise_for_status(self) -> None:
+        pass
+
+    def iter_content(self, chunk_size: int):
+        yield self.content[:5]
+
+        if self.interrupted:
+            raise requests.exceptions.ChunkedEncodingError("Connection dropped")
+
+        yield self.content[5:]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        pass
+
+
+class FakeWebPODA:
+    """Record requests made to WebPODA, interrupting the ones asked to fail."""
+
+    def __init__(self, failures: dict[str, int] | None = None) -> None:
+        self.failures = failures or dict()
+        self.urls: list[str] = []
+
+    def get(self, url: str, **kwargs) -> FakeResponse:
+        assert kwargs["stream"]
+
+        self.urls.append(url)
+        interrupted = False
+
+        for key, count in self.failures.items():
+            if key in url and count > 0:
+                self.failures[key] -= 1
+                interrupted = True
+
+        return FakeResponse(url, interrupted)
+
+
+def download(
+    tmp_path,
+    fake: FakeWebPODA,
+    monkeypatch,
+    start_date: datetime = datetime(2025, 5, 2),
+    end_date: datetime = datetime(2025, 5, 4, 12),
+):
+    monkeypatch.setattr(
+        requests.Session, "get", lambda session, url, **kwargs: fake.get(url, **kwargs)
+    )
+
+    poda = WebPODA("auth", tmp_path, window=timedelta(days=1), retry_backoff=0)
+
+    return poda.download(
+        packet="MAG_HSK_PW",
+        start_date=start_date,
+        end_date=end_date,
+    )
+
+
+def test_download_joins_time_windows(tmp_path, monkeypatch):
+    fake = FakeWebPODA()
+
+    result = download(tmp_path, fake, monkeypatch)
+
+    assert len(fake.urls) == 3
+    assert result.read_bytes() == (
+        b"2025-05-02T00:00:00" b"2025-05-03T00:00:00" b"2025-05-04T00:00:00"
+    )
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["MAG_HSK_PW.bin"]
+
+
+def test_download_retries_interrupted_window(tmp_path, monkeypatch):
+    fake = FakeWebPODA(failures={"time%3E=2025-05-03": 2})
+
+    download(tmp_path, fake, monkeypatch)
+
+    assert len(fake.urls) == 5
+
+
+def test_interrupted_download_resumes_from_last_complete_window(tmp_path, monkeypatch):
+    with pytest.raises(requests.exceptions.ChunkedEncodingError):
+        download(tmp_path, FakeWebPODA(failures={"time%3E=2025-05-03": 4}), monkeypatch)
+
+    assert not (tmp_path / "MAG_HSK_PW.bin").exists()
+
+    fake = FakeWebPODA()
+    result = download(tmp_path, fake, monkeypatch)
+
+    assert len(fake.urls) == 2
+    assert result.read_bytes().startswith(b"2025-05-02T00:00:00")
+
+
+def test_interrupted_download_does_not_reuse_windows_ending_after_download(
+    tmp_path, monkeypatch
+):
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    start_date = today - timedelta(days=1)
+    end_date = today + timedelta(days=3)
+    failing = f"time%3E={today + timedelta(days=2):%Y-%m-%dT%H:%M:%S}"
+
+    with pytest.raises(requests.exceptions.ChunkedEncodingError):
+        download(
+            tmp_path,
+            FakeWebPODA(failures={failing: 4}),
+            monkeypatch,
+            start_date,
+            end_date,
+        )
+
+    fake = FakeWebPODA()
+    download(tmp_path, fake, monkeypatch, start_date, end_date)
+
+    # only the window that ended before the first download is reused
+    assert len(fake.urls) == 3
+    assert f"time%3E={start_date:%Y-%m-%dT%H:%M:%S}" not in "".join(fake.urls)
+
+
+def test_session_retries_server_errors_with_backoff():
+    session = createSession(pool_size=2, max_retries=5, retry_backoff=0.5)
+    adapter = session.get_adapter("https://lasp.colorado.edu")
+
+    assert adapter.max_retries.total == 5
+    assert adapter.max_retries.backoff_factor == 0.5
+    assert 503 in adapter.max_retries.status_forcelist
+    assert adapter._pool_maxsize == 2
@@ -0,0 +1,51 @@
+"""Tests for `xtceCache` module."""
+
+import shutil
+from pathlib import Path
+
+from imap_mag import xtceCache
+from space_packet_parser import parser
+
+XTCE_FILE = Path("src/imap_mag/xtce/tlm_20240724.xml")
+PACKET_FILE = Path("tests/data/2025/MAG_HSK_PW.pkts")
+
+
+def decodeFirstPacket(packetDefinition) -> dict:
+    with open(PACKET_FILE, "rb") as binaryData:
+        packet = next(parser.PacketParser(packetDefinition).generator(binaryData))
+        return {
+            key: value.derived_value or value.raw_value
+            for key, value in (packet.data | packet.header).items()
+        }
+
+
+def test_packet_definition_is_cached_on_disk_and_reused(tmp_path):
+    xtceCache.clearCache()
+
+    original = xtceCache.loadPacketDefinition(XTCE_FILE, tmp_path)
+    cacheFiles = list((tmp_path / xtceCache.CACHE_FOLDER_NAME).glob("*.pkl"))
+
+    assert len(cacheFiles) == 1
+    assert xtceCache.loadPacketDefinition(XTCE_FILE, tmp_path) is original
+
+    xtceCache.clearCache()
+    cached = xtceCache.loadPacketDefinition(XTCE_FILE, tmp_path)
+
+    assert cached is not original
+    assert decodeFirstPacket(cached) == decodeFirstPacket(original)
+
+
+def test_packet_definition_cache_is_invalidated_when_xml_changes(tmp_path):
+    xtceCache.clearCache()
+
+    xtceFile = tmp_path / "tlm.xml"
+    shutil.copy(XTCE_FILE, xtceFile)
+    xtceCache.loadPacketDefinition(xtceFile, tmp_path)
+
+    with open(xtceFile, "a") as f:
+        f.write("\n<!-- updated -->\n")
+
+    xtceCache.loadPacketDefinition(xtceFile, tmp_path)
+    cacheFiles = list((tmp_path / xtceCache.CACHE_FOLDER_NAME).glob("*.pkl"))
+
+    assert len(cacheFiles) == 2